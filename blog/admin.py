@@ -1,7 +1,8 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.utils import timezone
-from .models import Category, BlogPost
+from .models import Category, BlogPost, Tag
+from .tags import refresh_tag_counts, tags_of_posts
 
 
 @admin.register(Category)
@@ -17,6 +18,15 @@ class CategoryAdmin(admin.ModelAdmin):
     post_count.short_description = 'Nombre d\'articles'
 
 
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    """Administration des tags (créés depuis la saisie des articles)"""
+    list_display = ['name', 'slug', 'post_count']
+    search_fields = ['name', 'slug']
+    readonly_fields = ['post_count']
+    ordering = ['-post_count', 'name']
+
+
 @admin.register(BlogPost)
 class BlogPostAdmin(admin.ModelAdmin):
     """Administration des articles de blog"""
@@ -99,6 +109,8 @@ class BlogPostAdmin(admin.ModelAdmin):
     
     def make_draft(self, request, queryset):
         """Mark selected posts as draft"""
+        tag_ids = tags_of_posts(queryset.values('pk'))
         updated = queryset.update(status='draft')
+        refresh_tag_counts(tag_ids)
         self.message_user(request, f'{updated} article(s) mis en brouillon.')
     make_draft.short_description = 'Mettre en brouillon les articles sélectionnés'
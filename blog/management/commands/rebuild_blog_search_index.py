@@ -0,0 +1,18 @@
+"""
+Commande de gestion Django pour reconstruire l'index de recherche du blog.
+Inutile en temps normal (l'index suit les enregistrements d'articles) ; à lancer
+après une importation en masse ou pour préparer le fichier avant un déploiement.
+Usage: python manage.py rebuild_blog_search_index
+"""
+from django.core.management.base import BaseCommand
+from blog.search import search_index
+
+
+class Command(BaseCommand):
+    help = 'Reconstruit l\'index de recherche BM25 des articles du blog'
+
+    def handle(self, *args, **options):
+        count = search_index.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'{count} article(s) indexé(s) dans {search_index.path}.'
+        ))
@@ -55,7 +55,7 @@ class Migration(migrations.Migration):
 
     dependencies = [
         ("blog", "0001_initial"),
-        ("core", "__latest__"),
+        ("core", "0003_contactmessage"),
     ]
 
     operations = [
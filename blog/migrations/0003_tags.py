@@ -0,0 +1,54 @@
+# Generated by Django 5.2.5 on 2026-10-18 06:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_copy_data_from_core'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, verbose_name='Nom')),
+                ('slug', models.SlugField(max_length=60, unique=True)),
+                ('post_count', models.PositiveIntegerField(default=0, verbose_name='Articles publiés')),
+            ],
+            options={
+                'verbose_name': 'Tag',
+                'verbose_name_plural': 'Tags',
+                'ordering': ['name'],
+                'indexes': [models.Index(fields=['-post_count', 'name'], name='blog_tag_post_co_98a14a_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='BlogPostTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='blog.blogpost')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_links', to='blog.tag')),
+            ],
+            options={
+                'verbose_name': "Tag d'article",
+                'verbose_name_plural': "Tags d'articles",
+            },
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='tag_set',
+            field=models.ManyToManyField(blank=True, related_name='posts', through='blog.BlogPostTag', to='blog.tag', verbose_name='Tags normalisés'),
+        ),
+        migrations.AddIndex(
+            model_name='blogposttag',
+            index=models.Index(fields=['tag', 'post'], name='blog_tag_post_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='blogposttag',
+            constraint=models.UniqueConstraint(fields=('post', 'tag'), name='blog_post_tag_unique'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:10
+
+from django.db import migrations
+from django.db.models import Count, Q
+from django.utils.text import slugify
+
+
+def split_post_tags(apps, schema_editor):
+    """Crée les tags et les liaisons à partir du champ texte de chaque article"""
+    BlogPost = apps.get_model('blog', 'BlogPost')
+    BlogPostTag = apps.get_model('blog', 'BlogPostTag')
+    Tag = apps.get_model('blog', 'Tag')
+
+    tags = {}
+    links = []
+    for post_id, text in BlogPost.objects.exclude(tags='').values_list('pk', 'tags').iterator():
+        slugs = set()
+        for name in text.split(','):
+            name = name.strip()[:50]
+            slug = slugify(name)[:60]
+            if not slug or slug in slugs:
+                continue
+            slugs.add(slug)
+            tags.setdefault(slug, name)
+            links.append((post_id, slug))
+
+    Tag.objects.bulk_create([Tag(name=name, slug=slug) for slug, name in tags.items()], batch_size=500)
+    tag_ids = dict(Tag.objects.values_list('slug', 'pk'))
+    BlogPostTag.objects.bulk_create(
+        [BlogPostTag(post_id=post_id, tag_id=tag_ids[slug]) for post_id, slug in links],
+        batch_size=500,
+    )
+    counts = Tag.objects.annotate(
+        published=Count('post_links', filter=Q(post_links__post__status='published'))
+    ).values_list('pk', 'published')
+    for tag_id, published in counts:
+        if published:
+            Tag.objects.filter(pk=tag_id).update(post_count=published)
+
+
+def clear_tags(apps, schema_editor):
+    apps.get_model('blog', 'BlogPostTag').objects.all().delete()
+    apps.get_model('blog', 'Tag').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_tags'),
+    ]
+
+    operations = [
+        migrations.RunPython(split_post_tags, clear_tags),
+    ]
@@ -25,6 +25,27 @@ class Category(models.Model):
         return self.name
 
 
+class Tag(models.Model):
+    """
+    Tag d'article. ``post_count`` (articles publiés portant le tag) est tenu à
+    jour par ``blog.tags`` à chaque enregistrement ou suppression d'article.
+    """
+    name = models.CharField("Nom", max_length=50)
+    slug = models.SlugField(max_length=60, unique=True)
+    post_count = models.PositiveIntegerField("Articles publiés", default=0)
+    
+    class Meta:
+        verbose_name = "Tag"
+        verbose_name_plural = "Tags"
+        ordering = ['name']
+        indexes = [
+            models.Index(fields=['-post_count', 'name']),
+        ]
+    
+    def __str__(self):
+        return self.name
+
+
 class BlogPost(models.Model):
     """Article de blog"""
     STATUS_CHOICES = [
@@ -61,6 +82,9 @@ class BlogPost(models.Model):
     
     tags = models.CharField("Tags", max_length=200, blank=True, 
                            help_text="Séparez les tags par des virgules")
+    # Tags normalisés, synchronisés depuis ``tags`` à l'enregistrement (blog.tags)
+    tag_set = models.ManyToManyField(Tag, through='BlogPostTag', related_name='posts', blank=True,
+                                     verbose_name="Tags normalisés")
     
     meta_description = models.CharField("Meta description", max_length=160, blank=True,
                                        help_text="Pour le référencement SEO")
@@ -91,7 +115,29 @@ class BlogPost(models.Model):
             return [tag.strip() for tag in self.tags.split(',')]
         return []
     
+    def get_tag_links(self):
+        """Retourne ``[(nom, slug)]`` des tags, pour les liens de filtrage"""
+        from .tags import parse_tags
+        return parse_tags(self.tags)
+    
     def increment_views(self):
-        """Incrémente le compteur de vues"""
-        self.views_count += 1
-        self.save(update_fields=['views_count'])
+        """Incrémente le compteur de vues (écriture différée, voir core.counters)"""
+        from core.counters import view_counter
+        view_counter.add(type(self), self.pk)
+
+
+class BlogPostTag(models.Model):
+    """Table de liaison article / tag"""
+    post = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name='tag_links')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='post_links')
+    
+    class Meta:
+        verbose_name = "Tag d'article"
+        verbose_name_plural = "Tags d'articles"
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'tag'], name='blog_post_tag_unique'),
+        ]
+        indexes = [
+            # Filtrage par tag : jointure tag -> articles
+            models.Index(fields=['tag', 'post'], name='blog_tag_post_idx'),
+        ]
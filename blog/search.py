@@ -0,0 +1,411 @@
+"""
+Recherche dans les articles du blog : index inversé en mémoire, classement BM25.
+
+- Analyse du texte en français : minuscules, suppression des accents, mots
+  vides écartés, racinisation légère (pluriels, féminins, suffixes courants).
+- Champs pondérés (BM25F simplifié) : titre > tags > extrait > contenu.
+- Seuls les articles publiés sont indexés. L'index est mis à jour article par
+  article à l'enregistrement ou à la suppression (``blog.signals``) et sauvegardé
+  dans BLOG_SEARCH_INDEX_PATH (JSON compressé) : un worker qui démarre le
+  recharge au lieu de tout réindexer.
+- Toutes les BLOG_SEARCH_RECHECK_INTERVAL secondes, une recherche compare
+  l'index aux dates de mise à jour des articles (une requête légère) et
+  rattrape les écarts : fichier d'un autre worker, modification par
+  ``QuerySet.update``, autre serveur.
+
+Aucune fonctionnalité propre à un moteur de base de données : même
+comportement sous SQLite et PostgreSQL.
+"""
+import gzip
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou entre processus
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+INDEX_FORMAT_VERSION = 1
+
+# Poids de chaque champ dans la fréquence d'un terme
+FIELD_WEIGHTS = {'title': 3.0, 'tags': 2.0, 'excerpt': 1.5, 'content': 1.0}
+
+# Paramètres BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+SEARCH_RESULTS_LIMIT = 200
+
+STOPWORDS = frozenset('''
+    a ai au aux avec c ce ces cet cette d dans de des du elle elles en et eu
+    il ils j je l la le les leur leurs lui m ma mais me meme mes moi mon n ne
+    nos notre nous on ou par pas pour qu que qui s sa se ses son sur t ta te
+    tes toi ton tu un une vos votre vous y est sont ete etre avoir plus tres
+    comme fait faire aussi bien entre leurs sans sous si
+'''.split())
+
+# Suffixes retirés par la racinisation, du plus long au plus court
+SUFFIXES = (
+    'issements', 'issement', 'isseurs', 'isseur', 'issent', 'atrices', 'atrice',
+    'ations', 'ateurs', 'ements', 'ation', 'ateur', 'ement', 'ances', 'ences',
+    'ismes', 'istes', 'ables', 'iques', 'euses', 'ance', 'ence', 'isme',
+    'iste', 'able', 'ique', 'euse', 'ites', 'ives', 'eurs', 'ite', 'ive',
+    'eur', 'ifs', 'if',
+)
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fold(text):
+    """Minuscules sans accents"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def stem(word):
+    """Racinisation légère du français (mot déjà replié par ``fold``)"""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    if word.endswith('aux') and len(word) > 5:
+        word = word[:-3] + 'al'
+    elif word[-1] in 'sx':
+        word = word[:-1]
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            word = word[:-len(suffix)]
+            break
+    if word.endswith('e') and len(word) > 4:
+        word = word[:-1]
+    # Consonne finale doublée : « investiss » -> « invest », « donn » -> « don »
+    if len(word) > 4 and word[-1] == word[-2] and word[-1] not in 'aeiouy':
+        word = word[:-1]
+    return word
+
+
+def analyze(text):
+    """Texte -> liste de termes indexables"""
+    return [
+        stem(word) for word in _WORD_RE.findall(fold(text or ''))
+        if word not in STOPWORDS and (len(word) > 1 or word.isdigit())
+    ]
+
+
+def _document(post):
+    """Fréquences pondérées des termes d'un article et sa longueur pondérée"""
+    frequencies = Counter()
+    length = 0.0
+    for field, weight in FIELD_WEIGHTS.items():
+        terms = analyze(getattr(post, field))
+        for term in terms:
+            frequencies[term] += weight
+        length += weight * len(terms)
+    return frequencies, length
+
+
+def _stamp(post):
+    return post.updated_at.isoformat() if post.updated_at else ''
+
+
+def index_path():
+    return Path(getattr(settings, 'BLOG_SEARCH_INDEX_PATH', settings.BASE_DIR / 'var' / 'blog_search_index.json.gz'))
+
+
+class SearchIndex:
+    """Index inversé des articles publiés ; thread-safe, une instance par processus"""
+
+    def __init__(self, path=None):
+        self._path = Path(path) if path else None
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._last_check = 0.0
+        self._file_mtime = None
+        self._lock_depth = 0
+        self._reset()
+
+    @property
+    def path(self):
+        return self._path or index_path()
+
+    def _reset(self):
+        # terme -> {id article: fréquence pondérée}
+        self.postings = {}
+        # id article -> [longueur pondérée, date de mise à jour, termes]
+        self.documents = {}
+        self.total_length = 0.0
+
+    # -- Modification ---------------------------------------------------
+
+    def _remove(self, post_id):
+        document = self.documents.pop(post_id, None)
+        if document is None:
+            return
+        length, _, terms = document
+        self.total_length -= length
+        for term in terms:
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(post_id, None)
+                if not postings:
+                    del self.postings[term]
+
+    def _add(self, post):
+        self._remove(post.pk)
+        frequencies, length = _document(post)
+        for term, frequency in frequencies.items():
+            self.postings.setdefault(term, {})[post.pk] = frequency
+        self.documents[post.pk] = [length, _stamp(post), sorted(frequencies)]
+        self.total_length += length
+
+    def update_post(self, post):
+        """(Ré)indexe un article, ou le retire s'il n'est plus publié, puis sauvegarde"""
+        with self._locked_file():
+            self._ensure_loaded(reload_if_newer=True)
+            if post.status == 'published':
+                self._add(post)
+            else:
+                self._remove(post.pk)
+            self._save()
+
+    def remove_post(self, post_id):
+        with self._locked_file():
+            self._ensure_loaded(reload_if_newer=True)
+            self._remove(post_id)
+            self._save()
+
+    def rebuild(self):
+        """Réindexe tous les articles publiés ; retourne leur nombre"""
+        from .models import BlogPost
+
+        with self._locked_file():
+            self._reset()
+            for post in BlogPost.objects.filter(status='published').iterator(chunk_size=200):
+                self._add(post)
+            self._loaded = True
+            self._last_check = time.monotonic()
+            self._save()
+            return len(self.documents)
+
+    def synchronize(self):
+        """Rattrape les articles modifiés hors des signaux ; retourne le nombre de corrections"""
+        from .models import BlogPost
+
+        stamps = {
+            pk: updated_at.isoformat() if updated_at else ''
+            for pk, updated_at in BlogPost.objects.filter(status='published').values_list('pk', 'updated_at')
+        }
+        with self._lock:
+            stale = [pk for pk, stamp in stamps.items() if self.documents.get(pk, [None, None])[1] != stamp]
+            removed = [pk for pk in self.documents if pk not in stamps]
+            self._last_check = time.monotonic()
+        if not stale and not removed:
+            return 0
+
+        with self._locked_file():
+            self._ensure_loaded(reload_if_newer=True)
+            for pk in removed:
+                self._remove(pk)
+            for post in BlogPost.objects.filter(pk__in=stale).iterator(chunk_size=200):
+                self._add(post)
+            self._save()
+        return len(stale) + len(removed)
+
+    # -- Recherche ------------------------------------------------------
+
+    def search(self, query, limit=SEARCH_RESULTS_LIMIT):
+        """
+        Identifiants des articles correspondant à ``query``, du plus pertinent au
+        moins pertinent (tous si ``limit`` est None)
+        """
+        terms = set(analyze(query))
+        if not terms:
+            return []
+        self._ensure_loaded(reload_if_newer=True)
+        interval = getattr(settings, 'BLOG_SEARCH_RECHECK_INTERVAL', 60)
+        if time.monotonic() - self._last_check >= interval:
+            try:
+                self.synchronize()
+            except Exception:
+                logger.exception('Échec de la synchronisation de l\'index de recherche du blog')
+
+        with self._lock:
+            count = len(self.documents)
+            if not count:
+                return []
+            average_length = self.total_length / count or 1.0
+            scores = Counter()
+            for term in terms:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for post_id, frequency in postings.items():
+                    length = self.documents[post_id][0]
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                    scores[post_id] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        return [post_id for post_id, _ in ranked[:limit]]
+
+    # -- Fichier --------------------------------------------------------
+
+    @contextmanager
+    def _locked_file(self):
+        """
+        Verrou du processus et, si possible, verrou exclusif sur un fichier partagé
+        par les workers (réentrant : une reconstruction peut survenir sous verrou).
+        """
+        with self._lock:
+            if self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+
+            handle = None
+            if fcntl is not None:
+                try:
+                    lock_path = self.path.with_name(self.path.name + '.lock')
+                    lock_path.parent.mkdir(parents=True, exist_ok=True)
+                    handle = open(lock_path, 'a')
+                    fcntl.flock(handle, fcntl.LOCK_EX)
+                except OSError:
+                    handle = None
+            self._lock_depth = 1
+            try:
+                yield
+            finally:
+                self._lock_depth = 0
+                if handle is not None:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+                    handle.close()
+
+    def _ensure_loaded(self, reload_if_newer=False):
+        with self._lock:
+            if not self._loaded:
+                if not self._load():
+                    self.rebuild()
+                self._loaded = True
+                return
+            if reload_if_newer:
+                try:
+                    mtime = os.stat(self.path).st_mtime_ns
+                except OSError:
+                    return
+                if mtime != self._file_mtime:
+                    self._load()
+
+    def _load(self):
+        """Charge le fichier d'index ; False s'il est absent, illisible ou d'un autre format"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            with gzip.open(self.path, 'rt', encoding='utf-8') as handle:
+                data = json.load(handle)
+            if data.get('version') != INDEX_FORMAT_VERSION:
+                return False
+        except (OSError, ValueError, EOFError):
+            return False
+
+        self._reset()
+        for post_id, (length, stamp) in data['documents'].items():
+            self.documents[int(post_id)] = [length, stamp, []]
+        for term, (post_ids, frequencies) in data['postings'].items():
+            self.postings[term] = dict(zip(post_ids, frequencies))
+            for post_id in post_ids:
+                self.documents[post_id][2].append(term)
+        self.total_length = sum(document[0] for document in self.documents.values())
+        self._file_mtime = mtime
+        return True
+
+    def _save(self):
+        """Écrit l'index (fichier temporaire puis renommage : jamais de fichier à moitié écrit)"""
+        data = {
+            'version': INDEX_FORMAT_VERSION,
+            'documents': {post_id: document[:2] for post_id, document in self.documents.items()},
+            'postings': {
+                term: [list(postings), [round(value, 2) for value in postings.values()]]
+                for term, postings in self.postings.items()
+            },
+        }
+        path = self.path
+        temporary = path.with_name(path.name + '.tmp')
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with gzip.open(temporary, 'wt', encoding='utf-8') as handle:
+                json.dump(data, handle, separators=(',', ':'))
+            os.replace(temporary, path)
+            self._file_mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            # L'index en mémoire reste utilisable ; il sera reconstruit au prochain démarrage
+            logger.exception('Impossible d\'enregistrer l\'index de recherche du blog')
+
+
+search_index = SearchIndex()
+
+
+def search_posts(queryset, query, limit=SEARCH_RESULTS_LIMIT):
+    """
+    Restreint ``queryset`` (filtres déjà appliqués) aux ``limit`` articles
+    correspondant le mieux à ``query``, classés par pertinence. La limite
+    s'applique après les filtres : une catégorie ou un tag peu représentés
+    parmi les premiers résultats de l'index gardent tous leurs articles.
+    """
+    from django.db.models import Case, IntegerField, Value, When
+
+    ranked = search_index.search(query, limit=None)
+    if not ranked:
+        return queryset.none()
+    allowed = set(queryset.values_list('pk', flat=True))
+    post_ids = [post_id for post_id in ranked if post_id in allowed][:limit]
+    if not post_ids:
+        return queryset.none()
+    rank = Case(
+        *[When(pk=post_id, then=Value(position)) for position, post_id in enumerate(post_ids)],
+        output_field=IntegerField(),
+    )
+    return queryset.filter(pk__in=post_ids).order_by(rank)
+
+
+def index_post_on_commit(post):
+    """
+    Met l'index à jour une fois la transaction validée, d'après l'article relu
+    en base : il a pu être modifié ou supprimé depuis dans la même transaction.
+    """
+    from .models import BlogPost
+
+    post_id = post.pk
+
+    def update():
+        try:
+            current = BlogPost.objects.filter(pk=post_id).first()
+            if current is None:
+                search_index.remove_post(post_id)
+            else:
+                search_index.update_post(current)
+        except Exception:
+            logger.exception('Échec de l\'indexation de l\'article %s', post_id)
+    transaction.on_commit(update)
+
+
+def remove_post_on_commit(post_id):
+    def remove():
+        try:
+            search_index.remove_post(post_id)
+        except Exception:
+            logger.exception('Échec de la désindexation de l\'article %s', post_id)
+    transaction.on_commit(remove)
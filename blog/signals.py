@@ -0,0 +1,38 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from .models import BlogPost
+from .search import index_post_on_commit, remove_post_on_commit
+from .tags import refresh_tag_counts, sync_post_tags, tags_of_posts
+
+
+@receiver(post_save, sender=BlogPost)
+def sync_tags_on_save(sender, instance, update_fields=None, **kwargs):
+    """Répercute la saisie des tags (et le statut) dans les tags normalisés"""
+    if update_fields is not None and not {'tags', 'status'} & set(update_fields):
+        return
+    sync_post_tags(instance)
+
+
+@receiver(pre_delete, sender=BlogPost)
+def remember_tags_on_delete(sender, instance, **kwargs):
+    # Les liaisons disparaissent avec l'article : noter ses tags avant
+    instance._tag_ids = tags_of_posts([instance.pk])
+
+
+@receiver(post_delete, sender=BlogPost)
+def refresh_counts_on_delete(sender, instance, **kwargs):
+    refresh_tag_counts(getattr(instance, '_tag_ids', ()))
+
+
+@receiver(post_save, sender=BlogPost)
+def index_post_on_save(sender, instance, update_fields=None, **kwargs):
+    """Met à jour l'index de recherche, sauf pour les sauvegardes limitées à d'autres champs"""
+    indexed = {'title', 'tags', 'excerpt', 'content', 'status'}
+    if update_fields is not None and not indexed & set(update_fields):
+        return
+    index_post_on_commit(instance)
+
+
+@receiver(post_delete, sender=BlogPost)
+def unindex_post_on_delete(sender, instance, **kwargs):
+    remove_post_on_commit(instance.pk)
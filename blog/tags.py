@@ -0,0 +1,102 @@
+"""
+Tags normalisés du blog.
+
+Le champ texte ``BlogPost.tags`` (« tag1, tag2 ») reste la saisie des
+formulaires ; à chaque enregistrement, ``blog.signals`` le répercute dans la
+table de liaison BlogPostTag et recalcule ``Tag.post_count`` pour les seuls
+tags concernés.
+
+Le nuage de tags (les TAG_CLOUD_SIZE tags les plus utilisés) est conservé dans
+le cache et supprimé à chaque recalcul : une page du blog le lit sans requête.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.text import slugify
+
+from .models import BlogPostTag, Tag
+
+
+TAG_CLOUD_CACHE_KEY = 'blog:tag_cloud'
+TAG_CLOUD_SIZE = 10
+
+
+def parse_tags(text):
+    """Découpe une saisie « tag1, tag2 » en ``[(nom, slug)]``, sans doublons ni tags vides"""
+    tags = []
+    seen = set()
+    for name in (text or '').split(','):
+        name = name.strip()[:Tag._meta.get_field('name').max_length]
+        slug = slugify(name)[:Tag._meta.get_field('slug').max_length]
+        if slug and slug not in seen:
+            seen.add(slug)
+            tags.append((name, slug))
+    return tags
+
+
+def refresh_tag_counts(tag_ids):
+    """Recalcule ``post_count`` des tags donnés et invalide le nuage de tags"""
+    tag_ids = list(tag_ids)
+    if not tag_ids:
+        return
+    published = (
+        BlogPostTag.objects.filter(tag=OuterRef('pk'), post__status='published')
+        .order_by().values('tag').annotate(total=Count('pk')).values('total')
+    )
+    Tag.objects.filter(pk__in=tag_ids).update(
+        post_count=Coalesce(Subquery(published, output_field=IntegerField()), 0)
+    )
+    transaction.on_commit(lambda: cache.delete(TAG_CLOUD_CACHE_KEY))
+
+
+def sync_post_tags(post):
+    """Met la table de liaison en accord avec ``post.tags`` puis recalcule les compteurs"""
+    wanted = parse_tags(post.tags)
+    with transaction.atomic():
+        existing = {tag.slug: tag for tag in Tag.objects.filter(slug__in=[slug for _, slug in wanted])}
+        missing = [Tag(name=name, slug=slug) for name, slug in wanted if slug not in existing]
+        if missing:
+            Tag.objects.bulk_create(missing, ignore_conflicts=True)
+            existing.update(
+                (tag.slug, tag) for tag in Tag.objects.filter(slug__in=[tag.slug for tag in missing])
+            )
+
+        wanted_ids = {existing[slug].pk for _, slug in wanted}
+        current_ids = set(BlogPostTag.objects.filter(post=post).values_list('tag_id', flat=True))
+        removed = current_ids - wanted_ids
+        if removed:
+            BlogPostTag.objects.filter(post=post, tag_id__in=removed).delete()
+        BlogPostTag.objects.bulk_create(
+            [BlogPostTag(post=post, tag_id=tag_id) for tag_id in wanted_ids - current_ids],
+            ignore_conflicts=True,
+        )
+        # Le statut de l'article a pu changer : ses tags actuels sont aussi recalculés
+        refresh_tag_counts(current_ids | wanted_ids)
+
+
+def tag_cloud():
+    """Les tags les plus utilisés, ``[{'name', 'slug', 'post_count'}]`` triés par slug"""
+    tags = cache.get(TAG_CLOUD_CACHE_KEY)
+    if tags is None:
+        tags = list(
+            Tag.objects.filter(post_count__gt=0)
+            .order_by('-post_count', 'name')
+            .values('name', 'slug', 'post_count')[:TAG_CLOUD_SIZE]
+        )
+        tags.sort(key=lambda tag: tag['slug'])
+        cache.set(TAG_CLOUD_CACHE_KEY, tags, None)
+    return tags
+
+
+def filter_by_tag(queryset, tag):
+    """Articles portant le tag ``tag`` (nom ou slug), par jointure sur la table de liaison"""
+    slug = slugify(tag or '')
+    if not slug:
+        return queryset
+    return queryset.filter(pk__in=BlogPostTag.objects.filter(tag__slug=slug).values('post_id'))
+
+
+def tags_of_posts(post_ids):
+    """Identifiants des tags portés par les articles donnés"""
+    return set(BlogPostTag.objects.filter(post_id__in=post_ids).values_list('tag_id', flat=True))
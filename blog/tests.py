@@ -1,3 +1,172 @@
+import tempfile
+from importlib import import_module
+from pathlib import Path
+from unittest import mock
+
+from django.apps import apps
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from users.models import User
+
+from .models import BlogPost, BlogPostTag, Category, Tag
+from .search import SearchIndex, analyze, search_posts, stem
+from .tags import filter_by_tag, tag_cloud
+
+
+class AnalyzeTests(TestCase):
+    """Analyse du texte français pour l'index"""
+
+    def test_folds_accents_and_drops_stopwords(self):
+        self.assertEqual(analyze('Les Énergies du Congo'), analyze('energie congo'))
+        self.assertNotIn('les', analyze('Les énergies'))
+
+    def test_stem_merges_word_families(self):
+        self.assertEqual(stem('investissements'), stem('investisseur'))
+        self.assertEqual(stem('investissement'), stem('investisseurs'))
+        self.assertEqual(stem('agricoles'), stem('agricole'))
+        self.assertEqual(stem('locaux'), stem('local'))
+
+    def test_short_words_and_numbers_are_kept(self):
+        self.assertEqual(stem('pme'), 'pme')
+        self.assertEqual(analyze('2025'), ['2025'])
+
+
+class BlogSearchTests(TestCase):
+    """Classement BM25 et mise à jour de l'index par les signaux"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.index = SearchIndex(Path(directory.name) / 'index.json.gz')
+        patcher = mock.patch('blog.search.search_index', self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.author = User.objects.create_user('auteur', 'auteur@example.com', 'pass')
+        self.energy = Category.objects.create(name='Énergie')
+        self.agriculture = Category.objects.create(name='Agriculture')
+
+    def post(self, title, content='Contenu', category=None, status='published'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return BlogPost.objects.create(
+                title=title, author=self.author, category=category, excerpt='Extrait',
+                content=content, status=status,
+            )
+
+    def test_title_match_ranks_first(self):
+        body = self.post('Financer une PME', content='Un projet solaire parmi d\'autres sujets de financement.')
+        title = self.post('Énergie solaire à Goma')
+        self.post('Agriculture urbaine')
+
+        self.assertEqual(self.index.search('solaire'), [title.pk, body.pk])
+        self.assertEqual(self.index.search('le'), [])
+
+    def test_limit_applies_after_filters(self):
+        self.post('Solaire, solaire et solaire', category=self.energy)
+        irrigation = self.post('Irrigation', content='Pompes à énergie solaire', category=self.agriculture)
+
+        results = search_posts(BlogPost.objects.filter(category=self.agriculture), 'solaire', limit=1)
+        self.assertEqual(list(results), [irrigation])
+
+    def test_signals_keep_index_in_sync(self):
+        post = self.post('Énergie solaire')
+        self.post('Brouillon solaire', status='draft')
+        self.assertEqual(self.index.search('solaire'), [post.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post.title = 'Microfinance rurale'
+            post.save()
+        self.assertEqual(self.index.search('solaire'), [])
+        self.assertEqual(self.index.search('microfinance'), [post.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post.status = 'draft'
+            post.save()
+        self.assertEqual(self.index.search('microfinance'), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post.status = 'published'
+            post.save()
+            post.delete()
+        self.assertEqual(self.index.search('microfinance'), [])
+
+    def test_view_counter_save_does_not_reindex(self):
+        post = self.post('Énergie solaire')
+        with mock.patch('blog.signals.index_post_on_commit') as index_post:
+            post.save(update_fields=['views_count'])
+        index_post.assert_not_called()
+
+    def test_index_is_reloaded_from_disk(self):
+        post = self.post('Énergie solaire')
+        reloaded = SearchIndex(self.index.path)
+        self.assertEqual(reloaded.search('solaire'), [post.pk])
+
+
+class TagTests(TestCase):
+    """Tags normalisés : filtrage exact, compteurs, nuage et migration du champ texte"""
+
+    def setUp(self):
+        patcher = mock.patch('blog.search.search_index', mock.Mock())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.delete('blog:tag_cloud')
+        self.addCleanup(cache.delete, 'blog:tag_cloud')
+        self.author = User.objects.create_user('auteur', 'auteur@example.com', 'pass')
+
+    def post(self, title, tags, status='published'):
+        return BlogPost.objects.create(
+            title=title, author=self.author, excerpt='Extrait', content='Contenu', tags=tags, status=status,
+        )
+
+    def counts(self):
+        return dict(Tag.objects.values_list('slug', 'post_count'))
+
+    def test_filter_by_tag_matches_whole_tag(self):
+        water = self.post('Forages', 'Eau, Santé')
+        drinking = self.post('Bornes fontaines', 'Eau potable')
+
+        self.assertEqual(list(filter_by_tag(BlogPost.objects.all(), 'eau')), [water])
+        self.assertEqual(list(filter_by_tag(BlogPost.objects.all(), 'Eau potable')), [drinking])
+        self.assertEqual(list(filter_by_tag(BlogPost.objects.all(), 'eau-pot')), [])
+        self.assertEqual(filter_by_tag(BlogPost.objects.all(), '').count(), 2)
+
+    def test_counts_follow_edits_and_status(self):
+        post = self.post('Forages', 'Eau, Santé')
+        self.post('Brouillon', 'Eau', status='draft')
+        self.assertEqual(self.counts(), {'eau': 1, 'sante': 1})
+
+        post.tags = 'Santé, Énergie'
+        post.save()
+        self.assertEqual(self.counts(), {'eau': 0, 'sante': 1, 'energie': 1})
+
+        post.status = 'draft'
+        post.save()
+        self.assertEqual(self.counts(), {'eau': 0, 'sante': 0, 'energie': 0})
+
+    def test_cloud_is_sorted_by_slug(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post('Un', 'Énergie, Agriculture')
+            self.post('Deux', 'énergie')
+        self.assertEqual(
+            tag_cloud(),
+            [
+                {'name': 'Agriculture', 'slug': 'agriculture', 'post_count': 1},
+                {'name': 'Énergie', 'slug': 'energie', 'post_count': 2},
+            ],
+        )
+
+    def test_migration_splits_existing_tags(self):
+        first = self.post('Forages', 'Eau, Santé, eau,')
+        second = self.post('Bornes', 'Eau potable, Santé')
+        self.post('Brouillon', 'Santé', status='draft')
+        BlogPostTag.objects.all().delete()
+        Tag.objects.all().delete()
+
+        migration = import_module('blog.migrations.0004_split_post_tags')
+        migration.split_post_tags(apps, None)
+
+        self.assertEqual(self.counts(), {'eau': 1, 'sante': 2, 'eau-potable': 1})
+        self.assertEqual(sorted(first.tag_set.values_list('slug', flat=True)), ['eau', 'sante'])
+        self.assertEqual(list(filter_by_tag(BlogPost.objects.all(), 'eau')), [first])
+        self.assertEqual(list(filter_by_tag(BlogPost.objects.all(), 'eau-potable')), [second])
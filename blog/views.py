@@ -4,8 +4,13 @@ from django.contrib import messages
 from django.db.models import Q, Count
 from django.core.paginator import Paginator
 from django.utils import timezone
+from django.utils.text import slugify
 from .models import BlogPost, Category
 from .forms import BlogPostForm, CategoryForm
+from .search import search_posts
+from .tags import filter_by_tag, tag_cloud
+from core.counters import record_view
+from core.page_cache import cache_anonymous_page
 
 
 def is_admin(user):
@@ -13,6 +18,7 @@ def is_admin(user):
     return user.is_authenticated and user.user_type == 'admin'
 
 
+@cache_anonymous_page('blog')
 def blog(request):
     """Page Blog - Liste des articles"""
     # Récupérer les filtres
@@ -27,18 +33,13 @@ def blog(request):
     if category_slug:
         posts = posts.filter(category__slug=category_slug)
     
-    # Filtre par recherche
-    if search_query:
-        posts = posts.filter(
-            Q(title__icontains=search_query) |
-            Q(excerpt__icontains=search_query) |
-            Q(content__icontains=search_query) |
-            Q(tags__icontains=search_query)
-        )
-    
-    # Filtre par tag
+    # Filtre par tag : jointure sur la table de liaison (tag exact, pas une sous-chaîne)
     if tag:
-        posts = posts.filter(tags__icontains=tag)
+        posts = filter_by_tag(posts, tag)
+    
+    # Recherche : index BM25 en mémoire, résultats classés par pertinence (voir blog.search)
+    if search_query:
+        posts = search_posts(posts, search_query)
     
     # Pagination
     paginator = Paginator(posts, 9)  # 9 articles par page
@@ -51,11 +52,8 @@ def blog(request):
     # Articles récents (sidebar)
     recent_posts = BlogPost.objects.filter(status='published')[:5]
     
-    # Tags populaires (tous les tags uniques)
-    all_tags = set()
-    for post in BlogPost.objects.filter(status='published'):
-        all_tags.update(post.get_tags_list())
-    popular_tags = sorted(list(all_tags))[:10]
+    # Tags populaires (nuage en cache, voir blog.tags)
+    popular_tags = tag_cloud()
     
     context = {
         'page_obj': page_obj,
@@ -64,18 +62,19 @@ def blog(request):
         'popular_tags': popular_tags,
         'search_query': search_query,
         'current_category': category_slug,
-        'current_tag': tag,
+        'current_tag': slugify(tag) if tag else None,
     }
     
     return render(request, 'blog/blog.html', context)
 
 
+@cache_anonymous_page('blog')
 def blog_detail(request, slug):
     """Page détail d'un article de blog"""
     post = get_object_or_404(BlogPost, slug=slug, status='published')
     
-    # Incrémenter le compteur de vues
-    post.increment_views()
+    # Compter la vue (dédoublonnée par visiteur, écrite en différé)
+    record_view(request, post)
     
     # Articles similaires (même catégorie)
     related_posts = BlogPost.objects.filter(
@@ -136,6 +136,14 @@ if not DEBUG and 'postgresql' in DATABASES['default']['ENGINE']:
     }
 
 
+# Cache
+# Format: locmemcache://, redis://host:6379/1, memcache://host:11211, dbcache://table_name
+# Un cache partagé (Redis, Memcached, base de données) est recommandé avec plusieurs workers
+CACHES = {
+    'default': env.cache_url('CACHE_URL', default='locmemcache://')
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -239,7 +247,81 @@ EMAIL_HOST_USER = env('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL', default='noreply@investlink.com')
 
+# Adresse publique du site, pour les liens des emails envoyés hors requête (résumés)
+SITE_URL = env('SITE_URL', default='http://localhost:8000')
+
+# File d'attente des emails (core.mail, python manage.py send_queued_mail)
+EMAIL_OUTBOX_BATCH_SIZE = env.int('EMAIL_OUTBOX_BATCH_SIZE', default=100)  # emails par connexion
+EMAIL_OUTBOX_MAX_ATTEMPTS = env.int('EMAIL_OUTBOX_MAX_ATTEMPTS', default=5)
+EMAIL_OUTBOX_RETRY_DELAY = env.int('EMAIL_OUTBOX_RETRY_DELAY', default=60)  # secondes, doublé à chaque échec
+EMAIL_OUTBOX_RETENTION_DAYS = env.int('EMAIL_OUTBOX_RETENTION_DAYS', default=7)  # emails envoyés/abandonnés conservés
+# Sans worker : envoi par le processus web des emails de la requête, après la réponse
+EMAIL_OUTBOX_SEND_INLINE = env.bool('EMAIL_OUTBOX_SEND_INLINE', default=False)
+
 # Login/Logout URLs
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'core:home'
 LOGOUT_REDIRECT_URL = 'core:home'
+
+# Compteurs de vues en écriture différée (core.counters)
+VIEW_COUNTER_FLUSH_INTERVAL = env.int('VIEW_COUNTER_FLUSH_INTERVAL', default=30)  # secondes
+VIEW_COUNTER_DEDUP_WINDOW = env.int('VIEW_COUNTER_DEDUP_WINDOW', default=1800)  # secondes
+
+# Résumé du tableau de bord utilisateur (users.dashboard), invalidé par signaux
+DASHBOARD_SUMMARY_CACHE_TIMEOUT = env.int('DASHBOARD_SUMMARY_CACHE_TIMEOUT', default=300)  # secondes
+
+# Cache des pages publiques pour les visiteurs anonymes (core.page_cache)
+PAGE_CACHE_ENABLED = env.bool('PAGE_CACHE_ENABLED', default=True)
+PAGE_CACHE_TIMEOUT = env.int('PAGE_CACHE_TIMEOUT', default=600)  # secondes
+
+# Journal d'activité écrit par lots (core.audit)
+ACTIVITY_LOG_BUFFERED = env.bool('ACTIVITY_LOG_BUFFERED', default=True)
+ACTIVITY_LOG_BUFFER_SIZE = env.int('ACTIVITY_LOG_BUFFER_SIZE', default=100)  # entrées
+ACTIVITY_LOG_FLUSH_INTERVAL = env.int('ACTIVITY_LOG_FLUSH_INTERVAL', default=5)  # secondes
+
+# Archivage du journal d'activité (commande compact_activity_logs)
+ACTIVITY_LOG_HOT_MONTHS = env.int('ACTIVITY_LOG_HOT_MONTHS', default=6)  # mois conservés en base
+# Dossier des archives, sur un disque persistant (obligatoire pour archiver ; relatif à BASE_DIR)
+ACTIVITY_LOG_ARCHIVE_DIR = env.str('ACTIVITY_LOG_ARCHIVE_DIR', default='')
+
+# Index de recherche du blog (blog.search), sauvegardé sur disque pour les redémarrages
+BLOG_SEARCH_INDEX_PATH = env.str('BLOG_SEARCH_INDEX_PATH', default=str(BASE_DIR / 'var' / 'blog_search_index.json.gz'))
+BLOG_SEARCH_RECHECK_INTERVAL = env.int('BLOG_SEARCH_RECHECK_INTERVAL', default=60)  # secondes
+
+# Instantanés des indicateurs du dashboard administrateur (core.KPISnapshot)
+KPI_SNAPSHOT_MAX_AGE = env.int('KPI_SNAPSHOT_MAX_AGE', default=3600)  # secondes avant d'afficher l'alerte
+KPI_SNAPSHOT_HISTORY_DAYS = env.int('KPI_SNAPSHOT_HISTORY_DAYS', default=365)
+
+# Sessions lues depuis le cache (repli en base) : le polling conditionnel des
+# notifications répond 304 sans requête SQL
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Polling des notifications (notifications_dropdown) : intervalle conseillé, en secondes
+NOTIFICATIONS_POLL_MIN_INTERVAL = env.int('NOTIFICATIONS_POLL_MIN_INTERVAL', default=15)
+NOTIFICATIONS_POLL_MAX_INTERVAL = env.int('NOTIFICATIONS_POLL_MAX_INTERVAL', default=300)
+
+# Notifications groupées (Notification.bulk_notify) : au-delà, lots mis en file d'attente
+NOTIFICATIONS_BULK_SYNC_LIMIT = env.int('NOTIFICATIONS_BULK_SYNC_LIMIT', default=1000)
+# Sans worker : lots de la requête traités par le processus web, après la réponse
+NOTIFICATIONS_BULK_SEND_INLINE = env.bool('NOTIFICATIONS_BULK_SEND_INLINE', default=False)
+
+# Rétention des notifications lues (python manage.py purge_notifications), en jours ;
+# 'default' s'applique aux types non listés, 0 = conserver indéfiniment
+NOTIFICATION_RETENTION_DAYS = {
+    'default': env.int('NOTIFICATION_RETENTION_DEFAULT_DAYS', default=90),
+    'new_message': 30,
+    'project_favorite': 30,
+    'project_published': 30,
+    'investment': 365,
+    'investment_confirmed': 365,
+    'investment_rejected': 365,
+}
+NOTIFICATION_RETENTION_ARCHIVE = env.bool('NOTIFICATION_RETENTION_ARCHIVE', default=False)
+
+# Diffusion temps réel des messages et notifications (core.push, servie en ASGI)
+# CacheBroker partage les événements entre workers via CACHE_URL (ex: Redis)
+PUSH_BROKER_BACKEND = env.str('PUSH_BROKER_BACKEND', default='core.push.LocalBroker')
+PUSH_HEARTBEAT_INTERVAL = env.int('PUSH_HEARTBEAT_INTERVAL', default=15)  # secondes
+PUSH_STREAM_MAX_AGE = env.int('PUSH_STREAM_MAX_AGE', default=300)  # secondes avant reconnexion
+PUSH_CACHE_POLL_INTERVAL = env.float('PUSH_CACHE_POLL_INTERVAL', default=1.0)  # secondes (CacheBroker)
+PUSH_EVENT_TTL = env.int('PUSH_EVENT_TTL', default=60)  # secondes (CacheBroker)
@@ -0,0 +1,62 @@
+"""
+Recherche dans le journal d'activité (sous-chaîne, insensible à la casse).
+
+- PostgreSQL : index GIN trigrammes (extension ``pg_trgm``) sur
+  ``UPPER(entity_name)`` et ``UPPER(description)`` ; la recherche
+  ``UPPER(col) LIKE '%TERME%'`` les utilise directement.
+- SQLite : table virtuelle FTS5 ``core_activitylog_fts`` (tokenizer ``trigram``,
+  rowid = id du log), alimentée par des triggers : les écritures en lot de
+  ``core.audit`` (bulk_create) sont indexées comme les autres.
+- Autres moteurs, FTS5 indisponible ou terme de moins de trois caractères :
+  ``icontains`` classique.
+
+L'email de l'utilisateur est cherché dans la table des utilisateurs, bien plus
+petite, puis appliqué au journal par ``user_id``. Les index sont créés par la
+migration 0009 de ``core``.
+"""
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Upper
+from django.db.models.lookups import Contains
+
+
+FTS_TABLE = 'core_activitylog_fts'
+
+# Longueur minimale d'un terme servi par un index trigrammes
+MIN_INDEXED_LENGTH = 3
+
+# Alias de connexion dont la table FTS5 a déjà été trouvée
+_fts5_aliases = set()
+
+
+def _fts5_ready(using='default'):
+    """Vérifie que la table FTS5 existe (créée par la migration 0009)"""
+    if using not in _fts5_aliases:
+        if FTS_TABLE not in connections[using].introspection.table_names():
+            return False
+        _fts5_aliases.add(using)
+    return True
+
+
+def _text_condition(query, using):
+    vendor = connections[using].vendor
+    if len(query) >= MIN_INDEXED_LENGTH:
+        if vendor == 'postgresql':
+            term = query.upper()
+            return Q(Contains(Upper('entity_name'), term)) | Q(Contains(Upper('description'), term))
+        if vendor == 'sqlite' and _fts5_ready(using):
+            # Chaîne entre guillemets : recherche de la sous-chaîne exacte, sans syntaxe FTS5
+            phrase = '"{}"'.format(query.replace('"', '""'))
+            return Q(pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [phrase]))
+    return Q(entity_name__icontains=query) | Q(description__icontains=query)
+
+
+def search_activity_logs(queryset, query):
+    """Restreint ``queryset`` aux logs dont le nom, la description ou l'email contient ``query``"""
+    query = (query or '').strip()
+    if not query:
+        return queryset
+    users = get_user_model().objects.filter(email__icontains=query).values('pk')
+    return queryset.filter(_text_condition(query, queryset.db) | Q(user_id__in=users))
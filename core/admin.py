@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.utils import timezone
-from .models import BlogPost, BlogCategory, ActivityLog
+from .models import BlogPost, BlogCategory, ActivityLog, KPISnapshot, UnreadCounter, OutboundEmail
 
 
 @admin.register(BlogCategory)
@@ -122,3 +122,52 @@ class ActivityLogAdmin(admin.ModelAdmin):
     def has_change_permission(self, request, obj=None):
         """Empêcher la modification de logs"""
         return False
+
+
+@admin.register(KPISnapshot)
+class KPISnapshotAdmin(admin.ModelAdmin):
+    """Historique des instantanés d'indicateurs (lecture seule)"""
+    list_display = ['created_at', 'updated_at', 'total_users', 'total_projects', 'total_investments', 'total_invested', 'total_messages']
+    date_hierarchy = 'created_at'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(UnreadCounter)
+class UnreadCounterAdmin(admin.ModelAdmin):
+    """Compteurs de non lus ; supprimer une ligne force son recalcul"""
+    list_display = ['user', 'notifications', 'updated_at']
+    search_fields = ['user__username', 'user__email']
+    raw_id_fields = ['user']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    """File d'attente des emails sortants ; le corps (liens sensibles) n'est jamais affiché"""
+    list_display = ['subject', 'recipients', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['subject', 'recipients']
+    fields = [
+        'subject', 'from_email', 'recipients', 'status', 'attempts',
+        'next_attempt_at', 'last_error', 'created_at', 'sent_at',
+    ]
+    readonly_fields = fields
+    actions = ['retry_now']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def retry_now(self, request, queryset):
+        count = queryset.exclude(status='sent').update(status='pending', next_attempt_at=timezone.now())
+        self.message_user(request, f'{count} email(s) remis en file d\'attente.')
+    retry_now.short_description = 'Renvoyer maintenant'
@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        from django.core.signals import request_finished, request_started
+        from . import signals  # noqa: F401
+        from .counters import flush_view_counters_on_request_finished
+        from .kpi import flush_kpi_on_request_finished
+        from .audit import flush_activity_log_on_request_finished
+        from .mail import send_request_emails, start_request_emails
+        request_finished.connect(flush_view_counters_on_request_finished, dispatch_uid='core_flush_view_counters')
+        request_finished.connect(flush_kpi_on_request_finished, dispatch_uid='core_flush_kpi_deltas')
+        request_finished.connect(flush_activity_log_on_request_finished, dispatch_uid='core_flush_activity_log')
+        request_started.connect(start_request_emails, dispatch_uid='core_start_request_emails')
+        request_finished.connect(send_request_emails, dispatch_uid='core_send_request_emails')
@@ -0,0 +1,114 @@
+"""
+Écriture différée du journal d'activité (ActivityLog).
+
+``ActivityLog.log`` ajoute l'entrée à un tampon propre au processus au lieu
+d'un INSERT dans la vue. Le tampon est écrit en un ``bulk_create`` :
+
+- dès qu'il atteint ``ACTIVITY_LOG_BUFFER_SIZE`` entrées ;
+- à la fin de la requête (signal ``request_finished``, après l'envoi de la réponse) ;
+- au plus tard ``ACTIVITY_LOG_FLUSH_INTERVAL`` secondes après la première entrée
+  en attente, pour les commandes et threads hors requête ;
+- à l'arrêt propre du processus (atexit).
+
+Si le ``bulk_create`` échoue, les entrées sont réécrites une à une : seules
+celles que la base refuse sont abandonnées. Quand la base est indisponible,
+les entrées restantes sont remises en attente.
+
+La date de chaque entrée est fixée au moment de l'appel. Pour une trace qui
+doit être validée ou annulée avec la transaction en cours, appeler
+``ActivityLog.log(..., sync=True)`` ; ``ACTIVITY_LOG_BUFFERED = False``
+désactive le tampon partout.
+"""
+import atexit
+import logging
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, transaction
+
+from .buffers import WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+
+def buffering_enabled():
+    return getattr(settings, 'ACTIVITY_LOG_BUFFERED', True)
+
+
+class ActivityLogBuffer(WriteBehindBuffer):
+    """Tampon des entrées de journal pas encore écrites (liste, dans l'ordre des appels)"""
+
+    def flush_interval(self):
+        return getattr(settings, 'ACTIVITY_LOG_FLUSH_INTERVAL', 5)
+
+    def _new_pending(self):
+        return []
+
+    def add(self, entry):
+        """Met en attente une instance ActivityLog non enregistrée"""
+        max_size = getattr(settings, 'ACTIVITY_LOG_BUFFER_SIZE', 100)
+        with self._lock:
+            self._pending.append(entry)
+            full = len(self._pending) >= max_size
+            if not full:
+                self._schedule_flush()
+        if full:
+            self.flush()
+
+    def _write(self, pending):
+        """Écrit les entrées en un bulk_create, ou une à une s'il échoue"""
+        from .models import ActivityLog
+
+        try:
+            with transaction.atomic():
+                ActivityLog.resolve_user_agents(pending)
+                ActivityLog.objects.bulk_create(pending)
+        except Exception:
+            logger.exception('Échec de l\'écriture groupée de %s entrée(s) du journal d\'activité', len(pending))
+            remaining = self._save_one_by_one(pending)
+            if remaining:
+                self._restore(remaining)
+
+    @staticmethod
+    def _save_one_by_one(entries):
+        """
+        Écrit les entrées une à une après l'échec du bulk_create : seules les
+        entrées invalides sont abandonnées. Retourne celles qui restent à écrire
+        si la base est indisponible.
+        """
+        from .models import ActivityLog
+
+        for index, entry in enumerate(entries):
+            try:
+                with transaction.atomic():
+                    ActivityLog.resolve_user_agents([entry])
+                    entry.save()
+            except (OperationalError, InterfaceError):
+                logger.exception('Base indisponible, %s entrée(s) du journal d\'activité remise(s) en attente', len(entries) - index)
+                return entries[index:]
+            except Exception:
+                logger.exception(
+                    'Entrée du journal d\'activité abandonnée : %s %s %s',
+                    entry.action, entry.entity_type, entry.entity_id,
+                )
+        return []
+
+    def _restore(self, entries):
+        """Remet les entrées en tête du tampon pour la prochaine tentative"""
+        with self._lock:
+            self._pending[:0] = entries
+            # Base indisponible durablement : borner la mémoire en écartant les plus anciennes
+            limit = 10 * getattr(settings, 'ACTIVITY_LOG_BUFFER_SIZE', 100)
+            if len(self._pending) > limit:
+                logger.error('%s entrée(s) du journal d\'activité abandonnée(s)', len(self._pending) - limit)
+                del self._pending[:len(self._pending) - limit]
+            self._schedule_flush()
+
+
+activity_log_buffer = ActivityLogBuffer()
+atexit.register(activity_log_buffer.flush)
+
+
+def flush_activity_log_on_request_finished(sender, **kwargs):
+    """Handler de request_finished : écrit les entrées de la requête"""
+    if activity_log_buffer:
+        activity_log_buffer.flush()
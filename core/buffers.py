@@ -0,0 +1,104 @@
+"""
+Base des tampons d'écriture différée (write-behind) propres à chaque processus.
+
+Les sous-classes accumulent des écritures en mémoire (``_pending``) et
+définissent comment les écrire (``_write``) et les remettre en attente après
+un échec (``_restore``). Le tampon est vidé :
+
+- à la fin des requêtes (``maybe_flush``), quand l'intervalle est écoulé ou
+  que ``MAX_PENDING`` entrées distinctes sont en attente ;
+- par un minuteur, au plus tard ``flush_interval()`` secondes après la
+  première entrée en attente : un worker inactif ne garde rien en mémoire ;
+- à l'arrêt propre du processus (``atexit``, à enregistrer par le module).
+"""
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """Tampon thread-safe ; par défaut ``{clé: Counter(incréments)}``"""
+
+    # Au-delà de ce nombre d'entrées distinctes en attente, on vide sans attendre l'intervalle
+    MAX_PENDING = 1000
+
+    def __init__(self):
+        self._pending = self._new_pending()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._timer = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def flush_interval(self):
+        return getattr(settings, 'VIEW_COUNTER_FLUSH_INTERVAL', 30)
+
+    def _new_pending(self):
+        return defaultdict(Counter)
+
+    def _write(self, pending):
+        """Écrit ``pending`` en base ; une exception remet tout en attente"""
+        raise NotImplementedError
+
+    def _restore(self, pending):
+        """Remet en attente des entrées non écrites ; le minuteur retentera l'écriture"""
+        with self._lock:
+            for key, increments in pending.items():
+                self._pending[key].update(increments)
+            self._schedule_flush()
+
+    def add(self, key, **increments):
+        with self._lock:
+            self._pending[key].update(increments)
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        """Arme le minuteur de vidage s'il ne l'est pas (appelé sous ``_lock``)"""
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_interval(), self._flush_from_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # Le thread du minuteur ne resservira pas : libérer sa connexion
+            connections.close_all()
+
+    def should_flush(self):
+        return bool(self._pending) and (
+            time.monotonic() - self._last_flush >= self.flush_interval()
+            or len(self._pending) >= self.MAX_PENDING
+        )
+
+    def maybe_flush(self):
+        """Vide le tampon si l'intervalle est écoulé ou s'il est trop rempli"""
+        if self.should_flush():
+            self.flush()
+
+    def flush(self):
+        """Écrit toutes les entrées en attente"""
+        # Un seul vidage à la fois : les écritures suivent l'ordre des appels
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, self._new_pending()
+                self._last_flush = time.monotonic()
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not pending:
+                return
+            try:
+                self._write(pending)
+            except Exception:
+                logger.exception('Échec de l\'écriture différée (%s)', type(self).__name__)
+                self._restore(pending)
@@ -1,24 +1,24 @@
-from django.db.models import Q, Count
+from core.models import UnreadCounter
+from messaging.models import ConversationParticipant
+
+
+def _unread_counter(request):
+    """Compteur de notifications non lues de l'utilisateur, chargé une fois par requête"""
+    if not hasattr(request, '_unread_counter'):
+        request._unread_counter = UnreadCounter.for_user(request.user)
+    return request._unread_counter
 
 
 def unread_messages_count(request):
-    """Context processor pour le compteur de messages non lus"""
+    """
+    Context processor pour le compteur de messages non lus.
+    
+    La valeur est un callable : le gabarit ne l'évalue (une requête au plus)
+    que s'il affiche le badge.
+    """
     if request.user.is_authenticated:
-        unread_count = 0
-        try:
-            from messaging.models import Message
-            # Compter les messages non lus où l'utilisateur n'est pas l'expéditeur
-            unread_count = Message.objects.filter(
-                conversation__participants=request.user,
-                is_read=False
-            ).exclude(
-                sender=request.user
-            ).count()
-        except:
-            pass
-        
         return {
-            'unread_messages_count': unread_count
+            'unread_messages_count': lambda: ConversationParticipant.unread_total(request.user)
         }
     return {
         'unread_messages_count': 0
@@ -26,20 +26,10 @@ def unread_messages_count(request):
 
 
 def unread_notifications_count(request):
-    """Context processor pour le compteur de notifications non lues"""
+    """Context processor pour le compteur de notifications non lues (évalué à la demande)"""
     if request.user.is_authenticated:
-        unread_count = 0
-        try:
-            from notifications.models import Notification
-            unread_count = Notification.objects.filter(
-                recipient=request.user,
-                is_read=False
-            ).count()
-        except:
-            pass
-        
         return {
-            'unread_notifications_count': unread_count
+            'unread_notifications_count': lambda: _unread_counter(request).notifications
         }
     return {
         'unread_notifications_count': 0
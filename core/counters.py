@@ -0,0 +1,111 @@
+"""
+Compteurs de vues en écriture différée (write-behind).
+
+Au lieu d'un ``UPDATE`` par page vue, les incréments sont accumulés en
+mémoire dans chaque processus puis écrits périodiquement en un seul
+``UPDATE ... SET views_count = views_count + n`` par modèle. Les vues
+répétées d'un même visiteur sont dédoublonnées via le cache pendant
+``VIEW_COUNTER_DEDUP_WINDOW`` secondes.
+
+Le tampon (voir ``core.buffers``) est vidé au plus tard
+``VIEW_COUNTER_FLUSH_INTERVAL`` secondes après la première vue en attente,
+ainsi qu'à l'arrêt propre du processus : en cas de crash, on perd au plus un
+intervalle de vues.
+"""
+import atexit
+import hashlib
+import logging
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .buffers import WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+
+def _dedup_window():
+    return getattr(settings, 'VIEW_COUNTER_DEDUP_WINDOW', 30 * 60)
+
+
+class ViewCounterBuffer(WriteBehindBuffer):
+    """Tampon des incréments de ``views_count`` en attente, par (modèle, pk)"""
+
+    def add(self, model, pk, count=1):
+        """Ajoute ``count`` vues à l'objet ``pk`` du modèle ``model``"""
+        super().add((model._meta.label, pk), views_count=count)
+
+    def pending(self, model, pk):
+        """Nombre de vues de l'objet pas encore écrites en base"""
+        with self._lock:
+            increments = self._pending.get((model._meta.label, pk))
+            return increments['views_count'] if increments else 0
+
+    def _write(self, pending):
+        """Un UPDATE par modèle ; un modèle en échec n'empêche pas les autres"""
+        by_model = defaultdict(dict)
+        for (label, pk), increments in pending.items():
+            by_model[label][pk] = increments['views_count']
+
+        for label, counts in by_model.items():
+            model = apps.get_model(label)
+            try:
+                model._default_manager.filter(pk__in=counts.keys()).update(
+                    views_count=F('views_count') + Case(
+                        *[When(pk=pk, then=Value(count)) for pk, count in counts.items()],
+                        default=Value(0),
+                        output_field=IntegerField(),
+                    )
+                )
+            except Exception:
+                logger.exception('Échec de l\'écriture des compteurs de vues (%s)', label)
+                self._restore({(label, pk): pending[(label, pk)] for pk in counts})
+
+
+view_counter = ViewCounterBuffer()
+atexit.register(view_counter.flush)
+
+
+def viewer_key(request):
+    """Identifiant stable du visiteur pour le dédoublonnage"""
+    if request.user.is_authenticated:
+        return f'u{request.user.pk}'
+    session_key = request.session.session_key if hasattr(request, 'session') else None
+    if session_key:
+        return f's{session_key}'
+    fingerprint = '{}|{}'.format(
+        request.META.get('REMOTE_ADDR', ''),
+        request.META.get('HTTP_USER_AGENT', ''),
+    )
+    return 'a' + hashlib.sha1(fingerprint.encode()).hexdigest()
+
+
+def record_view(request, obj):
+    """
+    Enregistre une vue de ``obj`` (modèle avec un champ ``views_count``).
+
+    Retourne True si la vue est comptée, False si le visiteur a déjà vu
+    l'objet pendant la fenêtre de dédoublonnage.
+    """
+    # Page mise en cache (core.page_cache) : la vue sera rejouée à chaque affichage
+    replay = getattr(request, 'page_cache_views', None)
+    if replay is not None:
+        replay.append((obj._meta.label_lower, obj.pk))
+    return record_view_of(request, type(obj), obj.pk)
+
+
+def record_view_of(request, model, pk):
+    """Comme record_view, à partir du modèle et de la clé primaire"""
+    seen_key = f'views:seen:{model._meta.label_lower}:{pk}:{viewer_key(request)}'
+    if not cache.add(seen_key, 1, _dedup_window()):
+        return False
+    view_counter.add(model, pk)
+    return True
+
+
+def flush_view_counters_on_request_finished(sender, **kwargs):
+    """Handler de request_finished : vide le tampon après l'envoi de la réponse"""
+    view_counter.maybe_flush()
@@ -0,0 +1,107 @@
+"""
+Deltas en quasi temps réel pour l'instantané des indicateurs (KPISnapshot).
+
+Les signaux de ``core.signals`` traduisent chaque création, modification ou
+suppression en variations de compteurs ; elles sont cumulées en mémoire, datées
+avec la même horloge que ``KPISnapshot.created_at``, puis appliquées au dernier instantané en un seul UPDATE, au rythme
+des compteurs de vues (``core.buffers``, ``VIEW_COUNTER_FLUSH_INTERVAL``). Les variations
+antérieures au dernier recalcul complet sont écartées, car déjà comptées.
+
+Les indicateurs glissants (7 / 30 jours) ne font qu'augmenter entre deux
+recalculs : ils sont remis à l'heure par ``refresh_kpi_snapshot``.
+"""
+import atexit
+from collections import Counter
+
+from django.utils import timezone
+
+from .buffers import WriteBehindBuffer
+
+
+PENDING_PROJECT_STATUSES = ('submitted', 'under_review', 'revision_requested')
+
+
+# ============================================================
+# CONTRIBUTION D'UN OBJET AUX COMPTEURS
+# ============================================================
+
+def user_figures(user):
+    figures = {'total_users': 1}
+    if user.user_type == 'porteur':
+        figures['porteurs_count'] = 1
+    elif user.user_type == 'investisseur':
+        figures['investisseurs_count'] = 1
+    return figures
+
+
+def project_figures(project):
+    figures = {'total_projects': 1}
+    if project.status in PENDING_PROJECT_STATUSES:
+        figures['pending_projects'] = 1
+    elif project.status in ('approved', 'rejected'):
+        figures[f'{project.status}_projects'] = 1
+    return figures
+
+
+def investment_figures(investment):
+    figures = {'total_investments': 1}
+    if investment.status in ('pending', 'confirmed', 'rejected'):
+        figures[f'{investment.status}_investments'] = 1
+    if investment.status == 'confirmed':
+        figures['total_invested'] = investment.amount or 0
+        figures['total_current_value'] = investment.current_value or 0
+    return figures
+
+
+def notification_figures(notification):
+    return {
+        'total_notifications': 1,
+        'unread_notifications': 0 if notification.is_read else 1,
+    }
+
+
+def figures_delta(before, after):
+    """Variation des compteurs entre deux contributions"""
+    delta = Counter()
+    for field, value in after.items():
+        delta[field] += value
+    for field, value in before.items():
+        delta[field] -= value
+    return {field: value for field, value in delta.items() if value}
+
+
+# ============================================================
+# TAMPON
+# ============================================================
+
+class KPIDeltaBuffer(WriteBehindBuffer):
+    """
+    Tampon des variations en attente, par instant exact : regrouper par seconde
+    compterait deux fois, ou écarterait, les variations de la seconde d'un
+    instantané selon l'arrondi.
+    """
+
+    def add(self, **deltas):
+        super().add(timezone.now(), **deltas)
+
+    def _write(self, pending):
+        """Applique toutes les variations en attente au dernier instantané"""
+        from .models import KPISnapshot
+
+        KPISnapshot.apply_deltas(list(pending.items()))
+
+
+kpi_buffer = KPIDeltaBuffer()
+atexit.register(kpi_buffer.flush)
+
+
+def record_kpi(**deltas):
+    """Enregistre des variations de compteurs de KPISnapshot (ex: total_messages=1)"""
+    deltas = {field: value for field, value in deltas.items() if value}
+    if deltas:
+        kpi_buffer.add(**deltas)
+
+
+def flush_kpi_on_request_finished(sender, **kwargs):
+    """Handler de request_finished : applique les deltas si l'intervalle est écoulé"""
+    kpi_buffer.maybe_flush()
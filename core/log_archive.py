@@ -0,0 +1,221 @@
+"""
+Archivage du journal d'activité.
+
+Seuls les ACTIVITY_LOG_HOT_MONTHS derniers mois restent dans la table
+``core_activitylog``. ``compact_activity_logs`` déplace les mois plus anciens,
+un mois à la fois, vers des fichiers JSON Lines compressés
+``ACTIVITY_LOG_ARCHIVE_DIR/activity-AAAA-MM.jsonl.gz`` (un log par ligne) :
+
+1. les logs du mois sont écrits dans un fichier temporaire, lu par lots ;
+2. le fichier est synchronisé sur disque puis renommé ;
+3. seulement ensuite, les logs exportés sont supprimés par petits lots,
+   chacun dans sa propre transaction.
+
+Si le processus s'arrête entre le renommage et la fin des suppressions, le
+passage suivant retrouve dans les fichiers du mois le plus grand id archivé :
+les logs jusqu'à cet id sont supprimés sans être exportés une seconde fois.
+
+Un mois déjà archivé qui reçoit de nouveaux logs (import, horloge décalée)
+produit un fichier supplémentaire ``activity-AAAA-MM.2.jsonl.gz``.
+
+L'historique reste consultable avec ``iter_archived_logs``, la commande
+``search_activity_archives`` ou ``zcat`` / ``zgrep``.
+
+ACTIVITY_LOG_ARCHIVE_DIR doit être configuré explicitement, sur un disque
+persistant : les logs sont supprimés de la base dès que leur fichier est écrit.
+"""
+import gzip
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ActivityLog
+
+
+DEFAULT_HOT_MONTHS = 6
+
+
+def archive_dir():
+    """Dossier des archives ; un chemin relatif part de BASE_DIR"""
+    directory = getattr(settings, 'ACTIVITY_LOG_ARCHIVE_DIR', '')
+    if not directory:
+        raise ImproperlyConfigured(
+            'ACTIVITY_LOG_ARCHIVE_DIR doit désigner un dossier persistant pour archiver le journal d\'activité.'
+        )
+    return settings.BASE_DIR / directory
+
+
+def _month_start(value):
+    value = timezone.localtime(value)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def archive_cutoff(months=None, now=None):
+    """Début du plus ancien mois conservé en base"""
+    if months is None:
+        months = getattr(settings, 'ACTIVITY_LOG_HOT_MONTHS', DEFAULT_HOT_MONTHS)
+    return add_months(_month_start(now or timezone.now()), -months)
+
+
+def archivable_months(months=None, now=None):
+    """Début de chaque mois entièrement antérieur à la limite et présent en base"""
+    cutoff = archive_cutoff(months, now)
+    oldest = ActivityLog.objects.filter(created_at__lt=cutoff).order_by('created_at').values_list('created_at', flat=True).first()
+    if oldest is None:
+        return []
+    result = []
+    month = _month_start(oldest)
+    while month < cutoff:
+        result.append(month)
+        month = add_months(month, 1)
+    return result
+
+
+def _archive_path(month):
+    """Premier nom de fichier libre pour le mois"""
+    directory = archive_dir()
+    base = f'activity-{month:%Y-%m}'
+    path = directory / f'{base}.jsonl.gz'
+    part = 2
+    while path.exists():
+        path = directory / f'{base}.{part}.jsonl.gz'
+        part += 1
+    return path
+
+
+def _serialize(log):
+    return {
+        'id': log.pk,
+        'created_at': log.created_at.isoformat(),
+        'user_id': log.user_id,
+        'user_email': log.user.email if log.user else None,
+        'action': log.action,
+        'entity_type': log.entity_type,
+        'entity_id': log.entity_id,
+        'entity_name': log.entity_name,
+        'description': log.description,
+        'ip_address': log.ip_address,
+        'user_agent': log.user_agent.value if log.user_agent else '',
+    }
+
+
+def _export(queryset, path, batch_size):
+    """Écrit les logs de ``queryset`` dans ``path`` ; retourne (nombre, plus grand id)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(path.name + '.tmp')
+    count = 0
+    last_pk = 0
+    logs = queryset.select_related('user', 'user_agent').order_by('pk')
+    with open(temporary, 'wb') as raw:
+        with gzip.GzipFile(filename=path.name[:-3], mode='wb', fileobj=raw) as archive:
+            while True:
+                batch = list(logs.filter(pk__gt=last_pk)[:batch_size])
+                if not batch:
+                    break
+                for log in batch:
+                    archive.write(json.dumps(_serialize(log), ensure_ascii=False).encode() + b'\n')
+                count += len(batch)
+                last_pk = batch[-1].pk
+        raw.flush()
+        os.fsync(raw.fileno())
+    if count:
+        os.replace(temporary, path)
+    else:
+        os.remove(temporary)
+    return count, last_pk
+
+
+def _delete(queryset, batch_size):
+    """Supprime ``queryset`` par lots, une transaction par lot"""
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return
+            ActivityLog.objects.filter(pk__in=ids).delete()
+
+
+def _archived_through(month):
+    """Plus grand id présent dans les fichiers déjà écrits pour le mois (0 sinon)"""
+    last_pk = 0
+    for path in archive_dir().glob(f'activity-{month:%Y-%m}*.jsonl.gz'):
+        with gzip.open(path, 'rt', encoding='utf-8') as archive:
+            for line in archive:
+                last_pk = max(last_pk, json.loads(line)['id'])
+    return last_pk
+
+
+def compact(months=None, batch_size=1000, now=None):
+    """Archive puis supprime les mois antérieurs à la limite ; retourne ``{'AAAA-MM': nombre}``"""
+    archived = {}
+    for month in archivable_months(months, now):
+        logs = ActivityLog.objects.filter(created_at__gte=month, created_at__lt=add_months(month, 1))
+        if not logs.exists():
+            continue
+        archived_through = _archived_through(month)
+        if archived_through:
+            # Suppression interrompue lors d'un passage précédent : ces logs sont déjà dans un fichier
+            _delete(logs.filter(pk__lte=archived_through), batch_size)
+            logs = logs.filter(pk__gt=archived_through)
+        count, last_pk = _export(logs, _archive_path(month), batch_size)
+        if count:
+            # Un log du mois inséré pendant l'export a un id supérieur : il attendra le prochain passage
+            _delete(logs.filter(pk__lte=last_pk), batch_size)
+            archived[f'{month:%Y-%m}'] = count
+    return archived
+
+
+def iter_archived_logs(date_from=None, date_to=None, user_id=None, action=None, entity_type=None, query=None):
+    """
+    Parcourt les logs archivés (dictionnaires, voir ``_serialize``) entre
+    ``date_from`` et ``date_to`` inclus (dates ou datetimes), avec les mêmes
+    filtres que le journal en ligne. Seuls les fichiers des mois concernés sont lus.
+    """
+    query = (query or '').lower()
+    first = f'{date_from:%Y-%m}' if date_from else ''
+    last = f'{date_to:%Y-%m}' if date_to else '9999-12'
+
+    for path in sorted(archive_dir().glob('activity-*.jsonl.gz')):
+        month = path.name[len('activity-'):len('activity-AAAA-MM')]
+        if not first <= month <= last:
+            continue
+        with gzip.open(path, 'rt', encoding='utf-8') as archive:
+            for line in archive:
+                entry = json.loads(line)
+                created_at = parse_datetime(entry['created_at'])
+                if date_from and _compare_value(created_at, date_from) < date_from:
+                    continue
+                if date_to and _compare_value(created_at, date_to) > date_to:
+                    continue
+                if user_id is not None and entry['user_id'] != user_id:
+                    continue
+                if action and entry['action'] != action:
+                    continue
+                if entity_type and entry['entity_type'] != entity_type:
+                    continue
+                if query and not any(
+                    query in (entry[field] or '').lower()
+                    for field in ('entity_name', 'description', 'user_email')
+                ):
+                    continue
+                entry['created_at'] = created_at
+                yield entry
+
+
+def _compare_value(created_at, bound):
+    """Ramène la date du log au type de la borne (date ou datetime)"""
+    if isinstance(bound, datetime):
+        return created_at
+    return timezone.localtime(created_at).date()
@@ -0,0 +1,168 @@
+"""
+File d'attente des emails sortants (OutboundEmail).
+
+``queue_mail`` remplace ``send_mail`` dans les vues : le message est rendu et
+enregistré en base, la réponse n'attend plus le serveur SMTP. La commande
+``send_queued_mail`` (à lancer en worker avec ``--loop`` ou à planifier)
+expédie les messages dus par lots, sur une seule connexion au backend
+configuré (EMAIL_BACKEND : SMTP en production, console ou fichier en local).
+
+Un envoi en échec est retenté après EMAIL_OUTBOX_RETRY_DELAY secondes, délai
+doublé à chaque tentative, puis abandonné après EMAIL_OUTBOX_MAX_ATTEMPTS.
+
+Sans worker (runserver, PythonAnywhere), EMAIL_OUTBOX_SEND_INLINE (désactivé
+par défaut) envoie les seuls messages mis en file par une requête, une fois la
+réponse transmise (signal ``request_finished``) ; les messages en échec restent
+dus pour la commande planifiée suivante.
+
+Les messages contiennent des liens sensibles (réinitialisation du mot de
+passe, vérification d'email) : le corps est effacé dès l'envoi et
+``purge_outbox`` supprime les lignes envoyées ou abandonnées après
+EMAIL_OUTBOX_RETENTION_DAYS jours.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connection as db_connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+# Délai pendant lequel un lot réservé par un worker n'est pas repris par un autre
+CLAIM_LEASE = timedelta(minutes=5)
+
+# Emails mis en file par la requête en cours, envoyés après la réponse
+_request_emails = threading.local()
+
+
+def queue_mail(subject, message, from_email, recipient_list, html_message=None):
+    """Remplace ``send_mail`` (mêmes arguments) : enregistre le message et retourne l'OutboundEmail"""
+    email = OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        html_body=html_message or '',
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipient_list),
+    )
+    pks = getattr(_request_emails, 'pks', None)
+    if pks is not None and getattr(settings, 'EMAIL_OUTBOX_SEND_INLINE', False):
+        transaction.on_commit(lambda: pks.append(email.pk))
+    return email
+
+
+def start_request_emails(sender, **kwargs):
+    """Handler de request_started : ouvre la liste des emails de la requête"""
+    _request_emails.pks = []
+
+
+def send_request_emails(sender, **kwargs):
+    """Handler de request_finished : envoie les emails de la requête, après la réponse"""
+    pks, _request_emails.pks = getattr(_request_emails, 'pks', None), None
+    if not pks:
+        return
+    try:
+        send_queued_mail(pks=pks)
+    except Exception:
+        logger.exception('Envoi immédiat des emails de la requête impossible')
+
+
+def retry_delay(attempts):
+    """Délai avant la tentative suivante : base doublée à chaque échec, plafonnée à un jour"""
+    base = getattr(settings, 'EMAIL_OUTBOX_RETRY_DELAY', 60)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 24 * 3600))
+
+
+def _claim_batch(batch_size, pks=None):
+    """Réserve les prochains emails dus ; un worker concurrent saute les lignes verrouillées"""
+    now = timezone.now()
+    with transaction.atomic():
+        due = OutboundEmail.objects.filter(status='pending', next_attempt_at__lte=now).order_by('next_attempt_at', 'pk')
+        if pks is not None:
+            due = due.filter(pk__in=pks)
+        if db_connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        batch = list(due[:batch_size])
+        if batch:
+            OutboundEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+                next_attempt_at=now + CLAIM_LEASE
+            )
+    return batch
+
+
+def _build_message(email, connection):
+    message = EmailMultiAlternatives(
+        email.subject, email.body, email.from_email, email.recipients, connection=connection
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def send_queued_mail(batch_size=None, pks=None):
+    """
+    Envoie un lot d'emails dus sur une seule connexion (parmi ``pks`` si donné).
+    
+    Retourne ``(envoyés, en échec)`` ; 0 envoyé et 0 échec signifie que la file est vide.
+    """
+    batch_size = batch_size or getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 100)
+    max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    batch = _claim_batch(batch_size, pks)
+    if not batch:
+        return 0, 0
+    
+    sent, failed = [], []
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as exc:
+        # Serveur injoignable : tout le lot est reporté
+        logger.warning('Connexion au serveur d\'emails impossible : %s', exc)
+        failed = [(email, exc) for email in batch]
+    else:
+        try:
+            for email in batch:
+                try:
+                    _build_message(email, connection).send()
+                    sent.append(email)
+                except Exception as exc:
+                    failed.append((email, exc))
+        finally:
+            connection.close()
+    
+    now = timezone.now()
+    for email in sent:
+        email.status = 'sent'
+        email.attempts += 1
+        email.sent_at = now
+        email.last_error = ''
+        email.body = ''
+        email.html_body = ''
+    for email, exc in failed:
+        email.attempts += 1
+        email.last_error = f'{type(exc).__name__}: {exc}'
+        if email.attempts >= max_attempts:
+            email.status = 'failed'
+            logger.error('Abandon de l\'email %s après %s tentatives : %s', email.pk, email.attempts, exc)
+        else:
+            email.next_attempt_at = now + retry_delay(email.attempts)
+    OutboundEmail.objects.bulk_update(
+        batch, ['status', 'attempts', 'sent_at', 'last_error', 'next_attempt_at', 'body', 'html_body']
+    )
+    return len(sent), len(failed)
+
+
+def purge_outbox(now=None):
+    """Supprime les emails envoyés ou abandonnés depuis plus de EMAIL_OUTBOX_RETENTION_DAYS jours"""
+    days = getattr(settings, 'EMAIL_OUTBOX_RETENTION_DAYS', 7)
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    deleted, _ = OutboundEmail.objects.filter(
+        Q(status='sent', sent_at__lt=cutoff) | Q(status='failed', created_at__lt=cutoff)
+    ).delete()
+    return deleted
@@ -0,0 +1,38 @@
+"""
+Commande de gestion Django pour archiver le journal d'activité ancien.
+Déplace les logs antérieurs aux ACTIVITY_LOG_HOT_MONTHS derniers mois vers des
+fichiers JSON Lines compressés (ACTIVITY_LOG_ARCHIVE_DIR). À planifier chaque mois.
+Usage: python manage.py compact_activity_logs [--months 6] [--batch-size 1000] [--dry-run]
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from core.log_archive import add_months, archivable_months, archive_dir, compact
+from core.models import ActivityLog
+
+
+class Command(BaseCommand):
+    help = 'Archive dans des fichiers compressés les logs d\'activité des mois anciens'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=None, help='Mois conservés en base (défaut : ACTIVITY_LOG_HOT_MONTHS)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Logs lus ou supprimés par requête')
+        parser.add_argument('--dry-run', action='store_true', help='Afficher les volumes sans rien archiver')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            for month in archivable_months(options['months']):
+                count = ActivityLog.objects.filter(created_at__gte=month, created_at__lt=add_months(month, 1)).count()
+                self.stdout.write(f'{month:%Y-%m} : {count} log(s) à archiver')
+            return
+        
+        try:
+            directory = archive_dir()
+        except ImproperlyConfigured as exc:
+            raise CommandError(exc)
+        
+        archived = compact(months=options['months'], batch_size=options['batch_size'])
+        for month, count in archived.items():
+            self.stdout.write(f'{month} : {count} log(s)')
+        self.stdout.write(self.style.SUCCESS(
+            f'{sum(archived.values())} log(s) archivé(s) dans {directory}.'
+        ))
@@ -0,0 +1,23 @@
+"""
+Commande de gestion Django pour corriger la dérive des compteurs de non lus.
+Usage: python manage.py reconcile_unread_counters [--batch-size 500]
+"""
+from django.core.management.base import BaseCommand
+from core.models import UnreadCounter
+from messaging.models import ConversationParticipant
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les compteurs de messages et notifications non lus depuis les tables sources'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Utilisateurs traités par lot')
+
+    def handle(self, *args, **options):
+        # Messages : non lus par conversation, depuis les curseurs de lecture
+        memberships_fixed = ConversationParticipant.reconcile(batch_size=options['batch_size'])
+        self.stdout.write(f'{memberships_fixed} participation(s) corrigée(s).')
+        
+        # Notifications : compteur par utilisateur
+        fixed = UnreadCounter.reconcile(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{fixed} compteur(s) corrigé(s).'))
@@ -0,0 +1,42 @@
+"""
+Commande de gestion Django pour recalculer l'instantané des indicateurs
+du dashboard administrateur. À planifier (cron) toutes les heures par exemple.
+Usage: python manage.py refresh_kpi_snapshot [--keep-days 365]
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.kpi import kpi_buffer
+from core.models import KPISnapshot
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les indicateurs du dashboard administrateur et enregistre un nouvel instantané'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-days',
+            type=int,
+            default=getattr(settings, 'KPI_SNAPSHOT_HISTORY_DAYS', 365),
+            help='Supprime les instantanés plus anciens que ce nombre de jours (0 = tout conserver)',
+        )
+
+    def handle(self, *args, **options):
+        # Appliquer d'abord les deltas en attente de ce processus
+        kpi_buffer.flush()
+        snapshot = KPISnapshot.take()
+        self.stdout.write(
+            f'{snapshot.total_users} utilisateur(s), {snapshot.total_projects} projet(s), '
+            f'{snapshot.total_investments} investissement(s), {snapshot.total_messages} message(s)'
+        )
+        
+        keep_days = options['keep_days']
+        if keep_days:
+            cutoff = timezone.now() - timedelta(days=keep_days)
+            deleted, _ = KPISnapshot.objects.filter(created_at__lt=cutoff).delete()
+            if deleted:
+                self.stdout.write(f'{deleted} ancien(s) instantané(s) supprimé(s)')
+        
+        self.stdout.write(self.style.SUCCESS('Indicateurs recalculés avec succès.'))
@@ -0,0 +1,61 @@
+"""
+Commande de gestion Django pour rechercher dans le journal d'activité archivé.
+Lit les fichiers écrits par compact_activity_logs (ACTIVITY_LOG_ARCHIVE_DIR),
+avec les mêmes filtres que le journal en ligne.
+Usage: python manage.py search_activity_archives [--from 2025-01-01] [--to 2025-03-31]
+       [--user 12] [--action login] [--entity-type project] [--search texte] [--limit 100]
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from core.log_archive import iter_archived_logs
+
+
+def _date(value):
+    date = parse_date(value)
+    if date is None:
+        raise ValueError(value)
+    return date
+
+
+class Command(BaseCommand):
+    help = 'Recherche dans les logs d\'activité archivés'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', type=_date, default=None, help='Date de début incluse (AAAA-MM-JJ)')
+        parser.add_argument('--to', dest='date_to', type=_date, default=None, help='Date de fin incluse (AAAA-MM-JJ)')
+        parser.add_argument('--user', dest='user_id', type=int, default=None, help='Identifiant de l\'utilisateur')
+        parser.add_argument('--action', default=None, help='Action (login, create, ...)')
+        parser.add_argument('--entity-type', default=None, help='Type d\'entité')
+        parser.add_argument('--search', default=None, help='Texte cherché dans le nom, la description et l\'email')
+        parser.add_argument('--limit', type=int, default=100, help='Nombre maximum de logs affichés (0 : tous)')
+
+    def handle(self, *args, **options):
+        logs = iter_archived_logs(
+            date_from=options['date_from'],
+            date_to=options['date_to'],
+            user_id=options['user_id'],
+            action=options['action'],
+            entity_type=options['entity_type'],
+            query=options['search'],
+        )
+        count = 0
+        try:
+            for entry in logs:
+                if options['limit'] and count >= options['limit']:
+                    self.stdout.write(f'... limite de {options["limit"]} log(s) atteinte')
+                    break
+                self.stdout.write('{:%Y-%m-%d %H:%M:%S} | {} | {} | {} {} | {}'.format(
+                    timezone.localtime(entry['created_at']),
+                    entry['user_email'] or '-',
+                    entry['action'],
+                    entry['entity_type'],
+                    entry['entity_name'],
+                    entry['description'],
+                ))
+                count += 1
+        except ImproperlyConfigured as exc:
+            raise CommandError(exc)
+        
+        self.stdout.write(self.style.SUCCESS(f'{count} log(s) archivé(s) trouvé(s).'))
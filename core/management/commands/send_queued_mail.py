@@ -0,0 +1,48 @@
+"""
+Commande de gestion Django pour expédier les emails en file d'attente (OutboundEmail).
+Usage: python manage.py send_queued_mail [--batch-size 100] [--loop [--interval 5]]
+
+Sans --loop, vide la file puis s'arrête (cron) ; avec --loop, tourne comme worker.
+Les emails envoyés ou abandonnés depuis EMAIL_OUTBOX_RETENTION_DAYS jours sont
+supprimés à chaque passage (au plus une fois par heure en mode worker).
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from core.mail import purge_outbox, send_queued_mail
+
+
+# Intervalle (secondes) entre deux purges en mode worker
+PURGE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = 'Envoie les emails en attente par lots, sur une connexion réutilisée'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Emails envoyés par connexion')
+        parser.add_argument('--loop', action='store_true', help='Continuer indéfiniment (worker)')
+        parser.add_argument('--interval', type=float, default=5, help='Attente (secondes) quand la file est vide')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        last_purge = 0
+        while True:
+            if time.monotonic() - last_purge >= PURGE_INTERVAL:
+                purged = purge_outbox()
+                last_purge = time.monotonic()
+                if purged:
+                    self.stdout.write(f'{purged} ancien(s) email(s) supprimé(s)')
+            sent, failed = send_queued_mail(batch_size=options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f'{sent} email(s) envoyé(s), {failed} en échec')
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'{total_sent} email(s) envoyé(s), {total_failed} échec(s) à retenter ou abandonnés.'
+        ))
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.5 on 2026-10-18 06:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_contactmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KPISnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_users', models.IntegerField(default=0, verbose_name='Utilisateurs')),
+                ('porteurs_count', models.IntegerField(default=0, verbose_name='Porteurs')),
+                ('investisseurs_count', models.IntegerField(default=0, verbose_name='Investisseurs')),
+                ('new_users_week', models.IntegerField(default=0, verbose_name='Nouveaux utilisateurs (7 jours)')),
+                ('active_users_month', models.IntegerField(default=0, verbose_name='Utilisateurs actifs (30 jours)')),
+                ('total_projects', models.IntegerField(default=0, verbose_name='Projets')),
+                ('pending_projects', models.IntegerField(default=0, verbose_name='Projets en attente')),
+                ('approved_projects', models.IntegerField(default=0, verbose_name='Projets validés')),
+                ('rejected_projects', models.IntegerField(default=0, verbose_name='Projets refusés')),
+                ('projects_by_sector', models.JSONField(blank=True, default=list, verbose_name='Projets par secteur')),
+                ('total_investments', models.IntegerField(default=0, verbose_name='Investissements')),
+                ('pending_investments', models.IntegerField(default=0, verbose_name='Investissements en attente')),
+                ('confirmed_investments', models.IntegerField(default=0, verbose_name='Investissements confirmés')),
+                ('rejected_investments', models.IntegerField(default=0, verbose_name='Investissements rejetés')),
+                ('total_invested', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Montant investi')),
+                ('total_current_value', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Valeur actuelle')),
+                ('total_messages', models.IntegerField(default=0, verbose_name='Messages')),
+                ('total_conversations', models.IntegerField(default=0, verbose_name='Conversations')),
+                ('messages_week', models.IntegerField(default=0, verbose_name='Messages (7 jours)')),
+                ('total_notifications', models.IntegerField(default=0, verbose_name='Notifications')),
+                ('unread_notifications', models.IntegerField(default=0, verbose_name='Notifications non lues')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Calculé le')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Dernière mise à jour')),
+            ],
+            options={
+                'verbose_name': 'Instantané des indicateurs',
+                'verbose_name_plural': 'Instantanés des indicateurs',
+                'ordering': ['-created_at'],
+                'get_latest_by': 'created_at',
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 06:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_kpisnapshot'),
+        ('users', '0002_user_gdpr_consent_user_gdpr_consent_date_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='unread_counter', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+                ('messages', models.PositiveIntegerField(default=0, verbose_name='Messages non lus')),
+                ('notifications', models.PositiveIntegerField(default=0, verbose_name='Notifications non lues')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Mis à jour le')),
+            ],
+            options={
+                'verbose_name': 'Compteur de non lus',
+                'verbose_name_plural': 'Compteurs de non lus',
+            },
+        ),
+    ]
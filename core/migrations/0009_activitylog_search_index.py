@@ -0,0 +1,84 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:40
+
+import sqlite3
+
+from django.db import migrations
+
+
+FTS_TABLE = 'core_activitylog_fts'
+
+
+def create_sqlite_triggers(schema_editor):
+    """
+    Triggers qui tiennent la table FTS5 à jour. SQLite les supprime quand une
+    migration reconstruit core_activitylog : elle doit alors rappeler cette fonction.
+    """
+    schema_editor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS core_activitylog_fts_insert AFTER INSERT ON core_activitylog BEGIN
+            INSERT INTO {FTS_TABLE} (rowid, entity_name, description)
+            VALUES (new.id, new.entity_name, new.description);
+        END
+    """)
+    schema_editor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS core_activitylog_fts_delete AFTER DELETE ON core_activitylog BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, entity_name, description)
+            VALUES ('delete', old.id, old.entity_name, old.description);
+        END
+    """)
+    schema_editor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS core_activitylog_fts_update AFTER UPDATE ON core_activitylog BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, entity_name, description)
+            VALUES ('delete', old.id, old.entity_name, old.description);
+            INSERT INTO {FTS_TABLE} (rowid, entity_name, description)
+            VALUES (new.id, new.entity_name, new.description);
+        END
+    """)
+
+
+def create_search_index(apps, schema_editor):
+    """Crée les index trigrammes adaptés au moteur et les alimente"""
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS core_activitylog_name_trgm ON core_activitylog '
+            'USING GIN (UPPER(entity_name) gin_trgm_ops)'
+        )
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS core_activitylog_desc_trgm ON core_activitylog '
+            'USING GIN (UPPER(description) gin_trgm_ops)'
+        )
+    elif vendor == 'sqlite' and sqlite3.sqlite_version_info >= (3, 34, 0):
+        # Tokenizer trigram disponible depuis SQLite 3.34
+        schema_editor.execute(f"""
+            CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+                entity_name, description,
+                content = 'core_activitylog', content_rowid = 'id',
+                tokenize = 'trigram'
+            )
+        """)
+        create_sqlite_triggers(schema_editor)
+        schema_editor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS core_activitylog_name_trgm')
+        schema_editor.execute('DROP INDEX IF EXISTS core_activitylog_desc_trgm')
+    elif vendor == 'sqlite':
+        for trigger in ('insert', 'delete', 'update'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS core_activitylog_fts_{trigger}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_activitylog_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:20
+
+from importlib import import_module
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def intern_user_agents(apps, schema_editor):
+    """Remplace la chaîne user agent de chaque log par une référence vers UserAgent"""
+    ActivityLog = apps.get_model('core', 'ActivityLog')
+    UserAgent = apps.get_model('core', 'UserAgent')
+
+    values = ActivityLog.objects.exclude(user_agent='').values_list('user_agent', flat=True).distinct()
+    UserAgent.objects.bulk_create(
+        [UserAgent(value=value) for value in values.iterator()],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    for user_agent in UserAgent.objects.iterator():
+        ActivityLog.objects.filter(user_agent=user_agent.value).update(user_agent_ref=user_agent.pk)
+
+
+def restore_user_agents(apps, schema_editor):
+    ActivityLog = apps.get_model('core', 'ActivityLog')
+    UserAgent = apps.get_model('core', 'UserAgent')
+    for user_agent in UserAgent.objects.iterator():
+        ActivityLog.objects.filter(user_agent_ref=user_agent.pk).update(user_agent=user_agent.value)
+
+
+def restore_search_triggers(apps, schema_editor):
+    """La reconstruction de core_activitylog par SQLite a supprimé les triggers de l'index FTS5"""
+    search_index = import_module('core.migrations.0009_activitylog_search_index')
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite' and search_index.FTS_TABLE in connection.introspection.table_names():
+        search_index.create_sqlite_triggers(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_activitylog_search_index'),
+    ]
+
+    operations = [
+        # Annulation : les triggers sont recréés une fois la table reconstruite
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.CreateModel(
+            name='UserAgent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.CharField(max_length=255, unique=True, verbose_name='User Agent')),
+            ],
+            options={
+                'verbose_name': 'User agent',
+                'verbose_name_plural': 'User agents',
+            },
+        ),
+        migrations.AddField(
+            model_name='activitylog',
+            name='user_agent_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.useragent', verbose_name='User Agent'),
+        ),
+        migrations.RunPython(intern_user_agents, restore_user_agents),
+        migrations.RemoveField(
+            model_name='activitylog',
+            name='user_agent',
+        ),
+        migrations.RenameField(
+            model_name='activitylog',
+            old_name='user_agent_ref',
+            new_name='user_agent',
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
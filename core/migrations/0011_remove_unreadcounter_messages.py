@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 06:45
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_useragent'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='unreadcounter',
+            name='messages',
+        ),
+    ]
@@ -1,5 +1,13 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
 from django.db import models
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, Greatest
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from django.utils.text import slugify
 from django.urls import reverse
 
@@ -83,9 +91,38 @@ class BlogPost(models.Model):
         return []
     
     def increment_views(self):
-        """Incrémente le compteur de vues"""
-        self.views_count += 1
-        self.save(update_fields=['views_count'])
+        """Incrémente le compteur de vues (écriture différée, voir core.counters)"""
+        from core.counters import view_counter
+        view_counter.add(type(self), self.pk)
+
+
+class UserAgent(models.Model):
+    """
+    User agent distinct, référencé par le journal d'activité : la chaîne n'est
+    stockée qu'une fois, chaque log ne porte que son identifiant.
+    """
+    value = models.CharField("User Agent", max_length=255, unique=True)
+    
+    class Meta:
+        verbose_name = "User agent"
+        verbose_name_plural = "User agents"
+    
+    def __str__(self):
+        return self.value
+    
+    @classmethod
+    def intern_many(cls, values):
+        """Retourne ``{chaîne: id}`` pour ``values``, en créant les chaînes inconnues (3 requêtes au plus)"""
+        values = {value for value in values if value}
+        if not values:
+            return {}
+        ids = dict(cls.objects.filter(value__in=values).values_list('value', 'pk'))
+        missing = values - ids.keys()
+        if missing:
+            # ignore_conflicts : un autre processus peut insérer la même chaîne en parallèle
+            cls.objects.bulk_create([cls(value=value) for value in missing], ignore_conflicts=True)
+            ids.update(cls.objects.filter(value__in=missing).values_list('value', 'pk'))
+        return ids
 
 
 class ActivityLog(models.Model):
@@ -122,16 +159,19 @@ class ActivityLog(models.Model):
     
     description = models.TextField("Description", blank=True)
     ip_address = models.GenericIPAddressField("Adresse IP", null=True, blank=True)
-    user_agent = models.CharField("User Agent", max_length=255, blank=True)
+    user_agent = models.ForeignKey(UserAgent, on_delete=models.PROTECT, null=True, blank=True,
+                                   verbose_name="User Agent", related_name='+')
     
-    created_at = models.DateTimeField("Date et heure", auto_now_add=True)
+    # Fixée à l'appel de log(), l'écriture pouvant être différée (core.audit)
+    created_at = models.DateTimeField("Date et heure", default=timezone.now, editable=False)
     
     class Meta:
         verbose_name = "Journal d'activité"
         verbose_name_plural = "Journal des activités"
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['-created_at']),
+            # Pagination par curseur du journal (core.views.admin_activity_logs)
+            models.Index(fields=['-created_at', 'id'], name='core_activitylog_keyset_idx'),
             models.Index(fields=['user', '-created_at']),
             models.Index(fields=['entity_type', '-created_at']),
             models.Index(fields=['action', '-created_at']),
@@ -142,13 +182,17 @@ class ActivityLog(models.Model):
     
     @classmethod
     def log(cls, user, action, entity_type, entity_id=None, entity_name='', 
-            description='', request=None):
+            description='', request=None, sync=False):
         """
         Méthode helper pour créer un log facilement
         
         Usage:
         ActivityLog.log(request.user, 'create', 'project', project.id, project.title, 
                        'Création d\'un nouveau projet', request)
+        
+        L'entrée est écrite en différé par lots (voir core.audit) et l'instance
+        retournée n'a pas encore de clé primaire ; ``sync=True`` l'enregistre
+        immédiatement, dans la transaction en cours.
         """
         log_data = {
             'user': user if user and user.is_authenticated else None,
@@ -167,10 +211,24 @@ class ActivityLog(models.Model):
             else:
                 log_data['ip_address'] = request.META.get('REMOTE_ADDR')
             
-            # User Agent
-            log_data['user_agent'] = request.META.get('HTTP_USER_AGENT', '')[:255]
+        from .audit import activity_log_buffer, buffering_enabled
         
-        return cls.objects.create(**log_data)
+        entry = cls(**log_data)
+        # User Agent : résolu en identifiant à l'écriture (UserAgent.intern_many)
+        entry.user_agent_value = request.META.get('HTTP_USER_AGENT', '')[:255] if request else ''
+        if sync or not buffering_enabled():
+            cls.resolve_user_agents([entry])
+            entry.save()
+            return entry
+        activity_log_buffer.add(entry)
+        return entry
+    
+    @staticmethod
+    def resolve_user_agents(entries):
+        """Renseigne ``user_agent`` des logs non enregistrés à partir de leur ``user_agent_value``"""
+        ids = UserAgent.intern_many(getattr(entry, 'user_agent_value', '') for entry in entries)
+        for entry in entries:
+            entry.user_agent_id = ids.get(getattr(entry, 'user_agent_value', ''))
 
 
 class ContactMessage(models.Model):
@@ -221,3 +279,279 @@ class ContactMessage(models.Model):
             self.status = 'read'
             self.read_at = timezone.now()
             self.save(update_fields=['status', 'read_at'])
+
+
+class KPISnapshot(models.Model):
+    """
+    Instantané des indicateurs du tableau de bord administrateur.
+    
+    Une ligne est créée à chaque recalcul complet (commande
+    ``refresh_kpi_snapshot``) ; entre deux recalculs, la dernière ligne est
+    tenue à jour par des deltas (voir ``core.kpi``). Les lignes précédentes
+    forment l'historique utilisé pour les courbes de tendance.
+    """
+    # Compteurs maintenus par deltas entre deux recalculs
+    COUNTERS = (
+        'total_users', 'porteurs_count', 'investisseurs_count', 'new_users_week',
+        'total_projects', 'pending_projects', 'approved_projects', 'rejected_projects',
+        'total_investments', 'pending_investments', 'confirmed_investments', 'rejected_investments',
+        'total_invested', 'total_current_value',
+        'total_messages', 'total_conversations', 'messages_week',
+        'total_notifications', 'unread_notifications',
+    )
+    
+    # Utilisateurs
+    total_users = models.IntegerField("Utilisateurs", default=0)
+    porteurs_count = models.IntegerField("Porteurs", default=0)
+    investisseurs_count = models.IntegerField("Investisseurs", default=0)
+    new_users_week = models.IntegerField("Nouveaux utilisateurs (7 jours)", default=0)
+    active_users_month = models.IntegerField("Utilisateurs actifs (30 jours)", default=0)
+    
+    # Projets
+    total_projects = models.IntegerField("Projets", default=0)
+    pending_projects = models.IntegerField("Projets en attente", default=0)
+    approved_projects = models.IntegerField("Projets validés", default=0)
+    rejected_projects = models.IntegerField("Projets refusés", default=0)
+    projects_by_sector = models.JSONField("Projets par secteur", default=list, blank=True)
+    
+    # Investissements
+    total_investments = models.IntegerField("Investissements", default=0)
+    pending_investments = models.IntegerField("Investissements en attente", default=0)
+    confirmed_investments = models.IntegerField("Investissements confirmés", default=0)
+    rejected_investments = models.IntegerField("Investissements rejetés", default=0)
+    total_invested = models.DecimalField("Montant investi", max_digits=16, decimal_places=2, default=0)
+    total_current_value = models.DecimalField("Valeur actuelle", max_digits=16, decimal_places=2, default=0)
+    
+    # Messagerie et notifications
+    total_messages = models.IntegerField("Messages", default=0)
+    total_conversations = models.IntegerField("Conversations", default=0)
+    messages_week = models.IntegerField("Messages (7 jours)", default=0)
+    total_notifications = models.IntegerField("Notifications", default=0)
+    unread_notifications = models.IntegerField("Notifications non lues", default=0)
+    
+    created_at = models.DateTimeField("Calculé le", default=timezone.now, db_index=True)
+    updated_at = models.DateTimeField("Dernière mise à jour", auto_now=True)
+    
+    class Meta:
+        verbose_name = "Instantané des indicateurs"
+        verbose_name_plural = "Instantanés des indicateurs"
+        ordering = ['-created_at']
+        get_latest_by = 'created_at'
+    
+    def __str__(self):
+        return f"Indicateurs du {self.created_at.strftime('%d/%m/%Y %H:%M')}"
+    
+    @property
+    def avg_investment(self):
+        if not self.confirmed_investments:
+            return 0
+        return self.total_invested / self.confirmed_investments
+    
+    @property
+    def is_stale(self):
+        """Vrai si le dernier recalcul complet date de plus de KPI_SNAPSHOT_MAX_AGE"""
+        max_age = getattr(settings, 'KPI_SNAPSHOT_MAX_AGE', 60 * 60)
+        return timezone.now() - self.created_at > timedelta(seconds=max_age)
+    
+    @classmethod
+    def current(cls):
+        """Dernier instantané (None si aucun n'a encore été calculé)"""
+        return cls.objects.order_by('-created_at').first()
+    
+    @classmethod
+    def take(cls):
+        """Recalcule tous les indicateurs et enregistre un nouvel instantané"""
+        from projects.models import Project, Investment
+        from messaging.models import Message, Conversation
+        from notifications.models import Notification
+        
+        now = timezone.now()
+        week_ago = now - timedelta(days=7)
+        figures = {}
+        
+        figures.update(User.objects.aggregate(
+            total_users=Count('pk'),
+            porteurs_count=Count('pk', filter=Q(user_type='porteur')),
+            investisseurs_count=Count('pk', filter=Q(user_type='investisseur')),
+            new_users_week=Count('pk', filter=Q(date_joined__gte=week_ago)),
+            active_users_month=Count('pk', filter=Q(last_login__gte=now - timedelta(days=30))),
+        ))
+        figures.update(Project.objects.aggregate(
+            total_projects=Count('pk'),
+            pending_projects=Count('pk', filter=Q(status__in=['submitted', 'under_review', 'revision_requested'])),
+            approved_projects=Count('pk', filter=Q(status='approved')),
+            rejected_projects=Count('pk', filter=Q(status='rejected')),
+        ))
+        figures['projects_by_sector'] = list(
+            Project.objects.values('sector').annotate(count=Count('id')).order_by('-count')[:5]
+        )
+        figures.update(Investment.objects.aggregate(
+            total_investments=Count('pk'),
+            pending_investments=Count('pk', filter=Q(status='pending')),
+            confirmed_investments=Count('pk', filter=Q(status='confirmed')),
+            rejected_investments=Count('pk', filter=Q(status='rejected')),
+            total_invested=Coalesce(Sum('amount', filter=Q(status='confirmed')), Decimal('0')),
+            total_current_value=Coalesce(Sum('current_value', filter=Q(status='confirmed')), Decimal('0')),
+        ))
+        figures.update(Message.objects.aggregate(
+            total_messages=Count('pk'),
+            messages_week=Count('pk', filter=Q(created_at__gte=week_ago)),
+        ))
+        figures['total_conversations'] = Conversation.objects.count()
+        figures.update(Notification.objects.aggregate(
+            total_notifications=Count('pk'),
+            unread_notifications=Count('pk', filter=Q(is_read=False)),
+        ))
+        
+        return cls.objects.create(created_at=now, **figures)
+    
+    @classmethod
+    def apply_deltas(cls, timed_deltas):
+        """
+        Ajoute au dernier instantané des deltas horodatés ``[(date, {compteur: variation})]``.
+        
+        Les deltas antérieurs au calcul de l'instantané y sont déjà comptés :
+        ils sont ignorés. Une seule requête UPDATE au plus.
+        """
+        snapshot = cls.objects.order_by('-created_at').values('pk', 'created_at').first()
+        if snapshot is None:
+            return 0
+        
+        totals = defaultdict(int)
+        for occurred_at, deltas in timed_deltas:
+            if occurred_at >= snapshot['created_at']:
+                for field, value in deltas.items():
+                    totals[field] += value
+        updates = {field: F(field) + value for field, value in totals.items() if value}
+        if not updates:
+            return 0
+        return cls.objects.filter(pk=snapshot['pk']).update(updated_at=timezone.now(), **updates)
+
+
+class UnreadCounter(models.Model):
+    """
+    Compteur dénormalisé des notifications non lues d'un utilisateur.
+    
+    La ligne est créée à la première lecture avec la valeur exacte, puis
+    ajustée à chaque création / lecture / suppression (voir ``adjust``). La
+    commande ``reconcile_unread_counters`` corrige une éventuelle dérive.
+    
+    Les messages non lus ne sont comptés qu'à un seul endroit, sur les lignes
+    de participation (``ConversationParticipant.unread_total``).
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True,
+                                verbose_name="Utilisateur", related_name='unread_counter')
+    notifications = models.PositiveIntegerField("Notifications non lues", default=0)
+    updated_at = models.DateTimeField("Mis à jour le", auto_now=True)
+    
+    class Meta:
+        verbose_name = "Compteur de non lus"
+        verbose_name_plural = "Compteurs de non lus"
+    
+    def __str__(self):
+        return f"{self.user} : {self.notifications} notification(s)"
+    
+    @classmethod
+    def for_user(cls, user):
+        """Compteur de l'utilisateur, calculé depuis la table source au premier accès"""
+        try:
+            return cls.objects.get(user=user)
+        except cls.DoesNotExist:
+            notifications = cls.compute([user.pk])[user.pk]
+            counter, _ = cls.objects.get_or_create(user=user, defaults={'notifications': notifications})
+            return counter
+    
+    @classmethod
+    def adjust(cls, condition, notifications=0):
+        """
+        Ajoute ``notifications`` (négatif pour décrémenter) aux compteurs
+        existants des utilisateurs vérifiant ``condition`` (un Q).
+        
+        Les utilisateurs sans ligne sont ignorés : leurs compteurs seront
+        calculés exactement au premier accès.
+        """
+        if not notifications:
+            return 0
+        return cls.objects.filter(condition).update(
+            updated_at=timezone.now(),
+            notifications=Greatest(F('notifications') + notifications, 0),
+        )
+    
+    @classmethod
+    def invalidate(cls, user_ids):
+        """Supprime les compteurs : ils seront recalculés au prochain accès"""
+        cls.objects.filter(user_id__in=list(user_ids)).delete()
+    
+    @classmethod
+    def compute(cls, user_ids):
+        """Calcule {user_id: notifications non lues} depuis la table source"""
+        from notifications.models import Notification
+        
+        counts = dict.fromkeys(user_ids, 0)
+        notification_counts = Notification.objects.filter(
+            recipient_id__in=user_ids, is_read=False
+        ).values('recipient_id').annotate(unread=Count('pk'))
+        for row in notification_counts:
+            counts[row['recipient_id']] = row['unread']
+        return counts
+    
+    @classmethod
+    def reconcile(cls, batch_size=500):
+        """Recalcule tous les compteurs existants ; retourne le nombre de lignes corrigées"""
+        fixed = 0
+        last_pk = 0
+        while True:
+            batch = list(cls.objects.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+            if not batch:
+                return fixed
+            last_pk = batch[-1].pk
+            
+            exact = cls.compute([counter.pk for counter in batch])
+            drifted = []
+            for counter in batch:
+                if counter.notifications != exact[counter.pk]:
+                    counter.notifications = exact[counter.pk]
+                    drifted.append(counter)
+            if drifted:
+                cls.objects.bulk_update(drifted, ['notifications'])
+                fixed += len(drifted)
+
+
+class OutboundEmail(models.Model):
+    """
+    Email rendu et mis en file d'attente (outbox).
+    
+    Les vues enregistrent le message (``core.mail.queue_mail``) au lieu de
+    l'envoyer ; la commande ``send_queued_mail`` les expédie par lots sur une
+    seule connexion SMTP, avec nouvelles tentatives espacées en cas d'échec.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('sent', 'Envoyé'),
+        ('failed', 'Échec définitif'),
+    ]
+    
+    subject = models.CharField("Sujet", max_length=255)
+    body = models.TextField("Texte")
+    html_body = models.TextField("HTML", blank=True)
+    from_email = models.CharField("Expéditeur", max_length=254)
+    recipients = models.JSONField("Destinataires", default=list)
+    
+    status = models.CharField("Statut", max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField("Tentatives", default=0)
+    next_attempt_at = models.DateTimeField("Prochaine tentative", default=timezone.now)
+    last_error = models.TextField("Dernière erreur", blank=True)
+    
+    created_at = models.DateTimeField("Créé le", auto_now_add=True)
+    sent_at = models.DateTimeField("Envoyé le", null=True, blank=True)
+    
+    class Meta:
+        verbose_name = "Email sortant"
+        verbose_name_plural = "Emails sortants"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.subject} → {', '.join(self.recipients)} ({self.get_status_display()})"
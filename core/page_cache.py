@@ -0,0 +1,148 @@
+"""
+Cache des pages publiques pour les visiteurs anonymes.
+
+``@cache_anonymous_page('blog')`` met en cache la réponse complète d'une vue,
+par chemin et query string normalisée (paramètres triés, vides et paramètres
+de suivi ``utm_*`` écartés). Une page servie depuis le cache ne coûte qu'une
+lecture de cache : ni requête SQL, ni rendu de template.
+
+Invalidation par groupe : chaque groupe (``'blog'``, ``'projects'``) a un
+numéro de version inclus dans la clé des pages. Les signaux de ``core.signals``
+changent la version du groupe quand un modèle dont il dépend est enregistré ou
+supprimé ; les anciennes pages ne sont plus jamais lues et expirent d'elles-mêmes.
+Les pages sans groupe (accueil, FAQ...) ne dépendent que de PAGE_CACHE_TIMEOUT.
+
+Le cache est contourné :
+- pour les requêtes autres que GET/HEAD et celles qui portent un cookie de
+  session ou de messages (utilisateur connecté, message flash à afficher) ;
+- à l'enregistrement, pour les réponses qui ne sont pas des 200, posent un
+  cookie, ajoutent un message ou utilisent un jeton CSRF (formulaire).
+
+Les vues comptées par ``core.counters.record_view`` pendant le rendu sont
+rejouées à chaque page servie depuis le cache.
+"""
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+
+VERSION_KEY = 'pagecache:version:{}'
+
+# Paramètres sans effet sur le contenu de la page
+IGNORED_PARAMETERS = {'fbclid', 'gclid'}
+
+# En-têtes de la réponse conservés avec la page
+CACHED_HEADERS = ('Content-Type', 'Content-Language')
+
+
+def page_cache_enabled():
+    return getattr(settings, 'PAGE_CACHE_ENABLED', True)
+
+
+def _timeout():
+    return getattr(settings, 'PAGE_CACHE_TIMEOUT', 600)
+
+
+def normalized_query(request):
+    """Query string triée, sans paramètres vides ni paramètres de suivi"""
+    items = sorted(
+        (key, value)
+        for key, values in request.GET.lists()
+        if key not in IGNORED_PARAMETERS and not key.startswith('utm_')
+        for value in values
+        if value
+    )
+    return urlencode(items)
+
+
+def _group_versions(groups):
+    """Version de chaque groupe, initialisée à l'horloge si elle est absente du cache"""
+    keys = [VERSION_KEY.format(group) for group in groups]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [str(versions[key]) for key in keys]
+
+
+def invalidate_page_groups(*groups):
+    """Rend obsolètes toutes les pages des groupes donnés (après validation de la transaction)"""
+    def bump():
+        version = time.time_ns()
+        cache.set_many({VERSION_KEY.format(group): version for group in groups}, timeout=None)
+    transaction.on_commit(bump)
+
+
+def _bypass(request):
+    if request.method not in ('GET', 'HEAD'):
+        return True
+    cookies = request.COOKIES
+    return (
+        settings.SESSION_COOKIE_NAME in cookies
+        or getattr(settings, 'MESSAGES_COOKIE_NAME', 'messages') in cookies
+    )
+
+
+def _cacheable(request, response):
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return False
+    # Jeton CSRF utilisé par le rendu : la page contient un formulaire propre au visiteur
+    if request.META.get('CSRF_COOKIE_NEEDS_UPDATE'):
+        return False
+    session = getattr(request, 'session', None)
+    if session is not None and session.modified:
+        return False
+    storage = getattr(request, '_messages', None)
+    if storage is not None and getattr(storage, '_queued_messages', None):
+        return False
+    cache_control = response.get('Cache-Control', '')
+    return 'private' not in cache_control and 'no-store' not in cache_control
+
+
+def _replay_views(request, views):
+    from .counters import record_view_of
+
+    for label, pk in views:
+        record_view_of(request, apps.get_model(label), pk)
+
+
+def cache_anonymous_page(*groups):
+    """Décorateur de vue : cache de page pour les visiteurs anonymes (voir le module)"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not page_cache_enabled() or _bypass(request):
+                return view(request, *args, **kwargs)
+
+            location = f'{request.path}?{normalized_query(request)}'
+            digest = hashlib.sha1(location.encode()).hexdigest()
+            key = 'pagecache:{}:{}:{}'.format(view.__qualname__, '-'.join(_group_versions(groups)), digest)
+
+            entry = cache.get(key)
+            if entry is not None:
+                content, headers, views = entry
+                response = HttpResponse(content)
+                for header, value in headers:
+                    response[header] = value
+                response['X-Page-Cache'] = 'hit'
+                _replay_views(request, views)
+                return response
+
+            request.page_cache_views = []
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                response = response.render()
+            if _cacheable(request, response):
+                headers = [(header, response[header]) for header in CACHED_HEADERS if header in response]
+                cache.set(key, (response.content, headers, request.page_cache_views), _timeout())
+                response['X-Page-Cache'] = 'miss'
+            return response
+        return wrapper
+    return decorator
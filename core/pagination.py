@@ -0,0 +1,187 @@
+"""
+Pagination par curseur (keyset) pour les listes volumineuses.
+
+Contrairement à Paginator (LIMIT/OFFSET + COUNT(*)), une page est obtenue
+par une requête de la forme ``WHERE (a, b) < (x, y) ORDER BY a DESC, b DESC
+LIMIT n`` : son coût dépend uniquement de la taille de la page, pas de sa
+position dans la liste.
+
+Le nombre total de résultats est fourni par ``estimate_count`` : estimation du
+planificateur PostgreSQL au-delà de quelques milliers de lignes, plutôt qu'un
+``COUNT(*)`` qui parcourt toute la table.
+"""
+import base64
+import json
+import logging
+
+from django.db import DatabaseError, connections
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+# Au-delà, le total affiché est une estimation (ou un minimum) plutôt qu'un COUNT(*) exact
+EXACT_COUNT_LIMIT = 10000
+
+
+def encode_cursor(values):
+    """Encode une liste de valeurs (dates, entiers...) en curseur opaque pour l'URL"""
+    payload = json.dumps([
+        value.isoformat() if hasattr(value, 'isoformat') else value
+        for value in values
+    ])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering):
+    """Décode un curseur ; retourne None s'il est absent ou invalide"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw_values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if len(raw_values) != len(ordering):
+            return None
+        return [
+            model._meta.get_field(field.lstrip('-')).to_python(value)
+            for field, value in zip(ordering, raw_values)
+        ]
+    except Exception:
+        return None
+
+
+def _keyset_condition(ordering, values, reverse=False):
+    """Construit la condition « strictement après » le curseur pour l'ordre donné"""
+    condition = Q()
+    for index, field in enumerate(ordering):
+        name = field.lstrip('-')
+        descending = field.startswith('-') != reverse
+        lookup = f'{name}__lt' if descending else f'{name}__gt'
+
+        clause = Q(**{lookup: values[index]})
+        for previous_field, previous_value in zip(ordering[:index], values[:index]):
+            clause &= Q(**{previous_field.lstrip('-'): previous_value})
+        condition |= clause
+    return condition
+
+
+def _reverse_ordering(ordering):
+    return [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+
+
+class KeysetPage:
+    """Une page de résultats avec les curseurs vers les pages voisines"""
+
+    def __init__(self, items, ordering, has_next, has_previous):
+        self.items = items
+        self.ordering = ordering
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def _cursor_for(self, item):
+        return encode_cursor([getattr(item, field.lstrip('-')) for field in self.ordering])
+
+    @property
+    def next_cursor(self):
+        """Curseur à passer en ``after`` pour obtenir la page suivante"""
+        if self.has_next and self.items:
+            return self._cursor_for(self.items[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        """Curseur à passer en ``before`` pour obtenir la page précédente"""
+        if self.has_previous and self.items:
+            return self._cursor_for(self.items[0])
+        return None
+
+
+def paginate_keyset(queryset, ordering, after=None, before=None, per_page=20):
+    """
+    Retourne une KeysetPage de ``queryset`` triée selon ``ordering``.
+
+    ``ordering`` doit se terminer par une colonne unique (ex: ``['-created_at', '-id']``).
+    ``after`` / ``before`` sont des curseurs encodés (voir KeysetPage) ; un curseur
+    invalide est ignoré et renvoie la première page.
+    """
+    ordering = list(ordering)
+    model = queryset.model
+    after_values = decode_cursor(after, model, ordering)
+    before_values = decode_cursor(before, model, ordering) if after_values is None else None
+
+    if before_values is not None:
+        # Page précédente : on parcourt la liste à l'envers puis on remet dans l'ordre
+        rows = list(
+            queryset.filter(_keyset_condition(ordering, before_values, reverse=True))
+            .order_by(*_reverse_ordering(ordering))[:per_page + 1]
+        )
+        has_previous = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        return KeysetPage(items, ordering, has_next=True, has_previous=has_previous)
+
+    if after_values is not None:
+        queryset = queryset.filter(_keyset_condition(ordering, after_values))
+
+    rows = list(queryset.order_by(*ordering)[:per_page + 1])
+    has_next = len(rows) > per_page
+    return KeysetPage(rows[:per_page], ordering, has_next=has_next, has_previous=after_values is not None)
+
+
+class EstimatedCount:
+    """
+    Nombre de résultats : exact (``exact``), estimé par le planificateur, ou
+    seulement minoré (``at_least`` : « plus de ``value`` »).
+    """
+
+    def __init__(self, value, exact=True, at_least=False):
+        self.value = value
+        self.exact = exact
+        self.at_least = at_least
+
+    def __int__(self):
+        return self.value
+
+
+def _planner_estimate(queryset):
+    """Nombre de lignes estimé par PostgreSQL, sans exécuter la requête ; None si inconnu"""
+    connection = connections[queryset.db]
+    try:
+        if not queryset.query.where:
+            # Table entière : statistiques tenues à jour par ANALYZE / autovacuum
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            # -1 : table jamais analysée
+            return row[0] if row and row[0] >= 0 else None
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+    except (DatabaseError, KeyError, IndexError, TypeError, ValueError):
+        logger.exception('Estimation du nombre de lignes impossible')
+        return None
+
+
+def estimate_count(queryset, exact_limit=EXACT_COUNT_LIMIT):
+    """
+    Retourne un EstimatedCount pour ``queryset``.
+
+    Le comptage exact est borné à ``exact_limit`` lignes (``COUNT`` sur un
+    ``LIMIT``). Au-delà, PostgreSQL fournit l'estimation de son planificateur ;
+    les autres moteurs indiquent seulement « plus de ``exact_limit`` ».
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        estimate = _planner_estimate(queryset)
+        if estimate is not None and estimate > exact_limit:
+            return EstimatedCount(estimate, exact=False)
+
+    count = queryset.order_by()[:exact_limit + 1].count()
+    if count > exact_limit:
+        return EstimatedCount(exact_limit, exact=False, at_least=True)
+    return EstimatedCount(count)
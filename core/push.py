@@ -0,0 +1,196 @@
+"""
+Diffusion en temps réel des nouveaux messages et notifications.
+
+Les navigateurs ouvrent un flux server-sent events (vue ``core.views.event_stream``,
+servie par ``config/asgi.py``). Après l'authentification de la connexion, un
+onglet inactif n'attend que son abonnement au broker : aucune requête en base.
+
+Les signaux de ``core.signals`` publient un événement par destinataire une fois
+la transaction validée. Le broker est choisi par ``PUSH_BROKER_BACKEND`` :
+
+- ``core.push.LocalBroker`` : files en mémoire du processus (un seul worker, tests) ;
+- ``core.push.CacheBroker`` : événements déposés dans le cache partagé
+  (``CACHE_URL``, ex: Redis), relus par chaque worker toutes les
+  ``PUSH_CACHE_POLL_INTERVAL`` secondes.
+
+Un autre backend n'a qu'à fournir ``publish(user_id, event)`` et
+``subscribe(user_id)``, dont l'abonnement expose ``await get(timeout)`` (événement
+ou None) et ``close()``.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================
+# BACKENDS
+# ============================================================
+
+class _LocalSubscription:
+    def __init__(self, broker, user_id):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker._unsubscribe(self)
+
+
+class LocalBroker:
+    """Broker en mémoire : les événements ne sortent pas du processus"""
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        subscription = _LocalSubscription(self, user_id)
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        # Appelé depuis le thread de la vue : chaque file est alimentée dans sa boucle
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.queue.put_nowait, event)
+            except RuntimeError:
+                # Boucle déjà fermée : la connexion est terminée
+                self._unsubscribe(subscription)
+
+
+class _CacheSubscription:
+    def __init__(self, broker, user_id):
+        self.broker = broker
+        self.user_id = user_id
+        self.position = None
+        self.missing_since = None
+
+    async def get(self, timeout):
+        broker = self.broker
+        deadline = time.monotonic() + timeout
+        sequence_key = broker.sequence_key(self.user_id)
+        if self.position is None:
+            self.position = await cache.aget(sequence_key, 0)
+
+        while True:
+            if (await cache.aget(sequence_key, 0)) > self.position:
+                event = await cache.aget(broker.event_key(self.user_id, self.position + 1))
+                if event is not None:
+                    self.position += 1
+                    self.missing_since = None
+                    return event
+                # Numéro réservé mais événement pas encore écrit, ou déjà expiré
+                if self.missing_since is None:
+                    self.missing_since = time.monotonic()
+                elif time.monotonic() - self.missing_since >= broker.poll_interval:
+                    self.position += 1
+                    self.missing_since = None
+                    continue
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            await asyncio.sleep(min(broker.poll_interval, remaining))
+
+    def close(self):
+        pass
+
+
+class CacheBroker:
+    """
+    Broker partagé entre workers via le cache : chaque utilisateur a un numéro
+    de séquence (``cache.incr``) et ses derniers événements, conservés
+    ``PUSH_EVENT_TTL`` secondes.
+    """
+
+    def __init__(self):
+        self.poll_interval = getattr(settings, 'PUSH_CACHE_POLL_INTERVAL', 1)
+        self.event_ttl = getattr(settings, 'PUSH_EVENT_TTL', 60)
+
+    @staticmethod
+    def sequence_key(user_id):
+        return f'push:{user_id}:seq'
+
+    @staticmethod
+    def event_key(user_id, sequence):
+        return f'push:{user_id}:{sequence}'
+
+    def subscribe(self, user_id):
+        return _CacheSubscription(self, user_id)
+
+    def publish(self, user_id, event):
+        sequence_key = self.sequence_key(user_id)
+        cache.add(sequence_key, 0, timeout=None)
+        sequence = cache.incr(sequence_key)
+        cache.set(self.event_key(user_id, sequence), event, self.event_ttl)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Instance unique du broker configuré par PUSH_BROKER_BACKEND"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                backend = getattr(settings, 'PUSH_BROKER_BACKEND', 'core.push.LocalBroker')
+                _broker = import_string(backend)()
+    return _broker
+
+
+# ============================================================
+# PUBLICATION
+# ============================================================
+
+def publish(user_id, event):
+    """Publie ``event`` (dict sérialisable en JSON) à l'utilisateur, sans jamais lever"""
+    try:
+        get_broker().publish(user_id, event)
+    except Exception:
+        logger.exception('Échec de la publication d\'un événement temps réel')
+
+
+def publish_on_commit(build_events):
+    """
+    Publie, une fois la transaction validée, les ``(user_id, event)`` renvoyés par
+    ``build_events()`` ; l'appel est différé pour ne rien diffuser d'annulé.
+    """
+    def send():
+        try:
+            events = list(build_events())
+        except Exception:
+            logger.exception('Échec de la préparation des événements temps réel')
+            return
+        for user_id, event in events:
+            publish(user_id, event)
+
+    transaction.on_commit(send)
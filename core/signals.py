@@ -0,0 +1,208 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.template.defaultfilters import date as date_filter
+from django.urls import reverse
+from django.utils import timezone
+from messaging.models import Message, Conversation, ConversationParticipant
+from notifications.models import Notification
+from projects.models import Project, Investment
+from blog.models import BlogPost, Category as BlogCategory
+from .models import UnreadCounter
+from .push import publish_on_commit
+from .snapshots import UNCHANGED, stored, track
+from .page_cache import invalidate_page_groups
+from .kpi import (
+    record_kpi, figures_delta,
+    user_figures, project_figures, investment_figures, notification_figures,
+)
+
+User = get_user_model()
+
+
+# Modèles dont la contribution aux indicateurs dépend de champs modifiables
+TRACKED_MODELS = {
+    Project: (project_figures, {'status'}),
+    Investment: (investment_figures, {'status', 'amount', 'current_value'}),
+    Notification: (notification_figures, {'is_read'}),
+}
+
+
+def _figures(instance):
+    """Contribution de l'objet aux indicateurs, None si des champs utiles sont différés"""
+    compute, fields = TRACKED_MODELS[type(instance)]
+    if fields & instance.get_deferred_fields():
+        return None
+    return compute(instance)
+
+
+for _model, (_, _fields) in TRACKED_MODELS.items():
+    track(_model, _fields)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Investment)
+@receiver(post_save, sender=Notification)
+def record_kpi_change(sender, instance, created, **kwargs):
+    """Variation entre l'objet tel qu'enregistré (``core.snapshots``) et l'objet sauvegardé"""
+    previous = None if created else stored(instance, TRACKED_MODELS[sender][1])
+    if previous is UNCHANGED:
+        return
+    before = _figures(previous) if previous is not None else {}
+    after = _figures(instance)
+    if before is None or after is None:
+        return
+    record_kpi(**figures_delta(before, after))
+
+
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Investment)
+@receiver(post_delete, sender=Notification)
+def record_kpi_removal(sender, instance, **kwargs):
+    # Les suppressions en cascade chargent les objets complets depuis la base
+    before = _figures(instance)
+    if before:
+        record_kpi(**figures_delta(before, {}))
+
+
+@receiver(post_save, sender=User)
+def record_user_created(sender, instance, created, **kwargs):
+    if created:
+        record_kpi(new_users_week=1, **user_figures(instance))
+
+
+@receiver(post_delete, sender=User)
+def record_user_deleted(sender, instance, **kwargs):
+    record_kpi(**figures_delta(user_figures(instance), {}))
+
+
+@receiver(post_save, sender=Message)
+def record_message_created(sender, instance, created, **kwargs):
+    if created:
+        record_kpi(total_messages=1, messages_week=1)
+
+
+@receiver(post_delete, sender=Message)
+def record_message_deleted(sender, instance, **kwargs):
+    record_kpi(total_messages=-1)
+
+
+@receiver(post_save, sender=Conversation)
+def record_conversation_created(sender, instance, created, **kwargs):
+    if created:
+        record_kpi(total_conversations=1)
+
+
+@receiver(post_delete, sender=Conversation)
+def record_conversation_deleted(sender, instance, **kwargs):
+    record_kpi(total_conversations=-1)
+
+
+# ============================================================
+# COMPTEURS DE NON LUS
+# ============================================================
+
+@receiver(post_save, sender=Notification)
+def increment_unread_notifications(sender, instance, created, **kwargs):
+    if created and not instance.is_read:
+        UnreadCounter.adjust(Q(user_id=instance.recipient_id), notifications=1)
+
+
+@receiver(post_delete, sender=Notification)
+def decrement_unread_notifications(sender, instance, **kwargs):
+    if not instance.is_read:
+        UnreadCounter.adjust(Q(user_id=instance.recipient_id), notifications=-1)
+
+
+# ============================================================
+# DIFFUSION TEMPS RÉEL (core.push)
+# ============================================================
+
+def _unread_by_user(user_ids):
+    """Non lus des utilisateurs : messages toujours, notifications si le compteur existe déjà"""
+    notifications = dict(
+        UnreadCounter.objects.filter(user_id__in=user_ids).values_list('user_id', 'notifications')
+    )
+    return {
+        user_id: {'messages': messages, 'notifications': notifications.get(user_id)}
+        for user_id, messages in ConversationParticipant.unread_totals(user_ids).items()
+    }
+
+
+def _display_date(value):
+    return date_filter(timezone.localtime(value), 'd/m/Y à H:i')
+
+
+@receiver(post_save, sender=Message)
+def push_new_message(sender, instance, created, **kwargs):
+    if not created:
+        return
+    message = instance
+
+    def events():
+        reader_ids = list(
+            ConversationParticipant.objects.filter(conversation_id=message.conversation_id)
+            .exclude(user_id=message.sender_id).values_list('user_id', flat=True)
+        )
+        unread = _unread_by_user(reader_ids)
+        payload = {
+            'type': 'message',
+            'conversation_id': message.conversation_id,
+            'message_id': message.pk,
+            'sender_name': message.sender.get_full_name(),
+            'preview': ' '.join(message.content.split())[:Conversation.PREVIEW_LENGTH],
+            'created_at': _display_date(message.created_at),
+            'url': reverse('messaging:conversation', kwargs={'pk': message.conversation_id}),
+        }
+        for user_id in reader_ids:
+            yield user_id, {**payload, 'unread': unread.get(user_id)}
+
+    publish_on_commit(events)
+
+
+def notification_events(notifications):
+    """``(destinataire, événement)`` de chaque notification créée ; aussi utilisé par bulk_notify"""
+    unread = _unread_by_user({notification.recipient_id for notification in notifications})
+    for notification in notifications:
+        yield notification.recipient_id, {
+            'type': 'notification',
+            'id': notification.pk,
+            'title': notification.title,
+            'message': notification.message[:100],
+            'notification_type': notification.notification_type,
+            'created_at': _display_date(notification.created_at),
+            'link': notification.link,
+            'unread': unread.get(notification.recipient_id),
+        }
+
+
+@receiver(post_save, sender=Notification)
+def push_new_notification(sender, instance, created, **kwargs):
+    if created:
+        publish_on_commit(lambda: notification_events([instance]))
+
+
+# ============================================================
+# CACHE DES PAGES PUBLIQUES (core.page_cache)
+# ============================================================
+
+# Compteurs affichés sur les pages mais tolérés périmés jusqu'à l'expiration
+# de la page (PAGE_CACHE_TIMEOUT) : un clic ne vide pas tout le groupe
+BLOG_COUNTER_FIELDS = {'views_count'}
+PROJECT_COUNTER_FIELDS = {'views_count', 'favorites_count'}
+
+
+@receiver([post_save, post_delete], sender=BlogPost)
+@receiver([post_save, post_delete], sender=BlogCategory)
+def invalidate_blog_pages(sender, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= BLOG_COUNTER_FIELDS:
+        return
+    invalidate_page_groups('blog')
+
+
+@receiver([post_save, post_delete], sender=Project)
+def invalidate_project_pages(sender, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= PROJECT_COUNTER_FIELDS:
+        return
+    invalidate_page_groups('projects')
@@ -0,0 +1,48 @@
+"""
+Valeurs enregistrées d'un objet juste avant sa modification.
+
+Les agrégats maintenus par signaux (indicateurs de ``core.kpi``, statistiques
+sectorielles de ``projects``) calculent une variation entre l'objet tel
+qu'enregistré et l'objet sauvegardé. ``track(Modèle, champs)`` déclare les
+champs utiles ; au ``pre_save``, ceux de tous les consommateurs sont relus en
+une seule requête, et seulement si la sauvegarde peut les modifier. Rien n'est
+lu au chargement des objets.
+"""
+from collections import defaultdict
+
+from django.db.models.signals import pre_save
+
+# Sauvegarde sans effet sur les champs demandés
+UNCHANGED = object()
+
+_tracked = defaultdict(set)
+
+
+def track(model, fields):
+    """Déclare les champs de ``model`` dont la valeur enregistrée est nécessaire au ``post_save``"""
+    _tracked[model].update(fields)
+    pre_save.connect(_remember, sender=model, dispatch_uid=f'core_snapshot_{model._meta.label_lower}')
+
+
+def _remember(sender, instance, update_fields=None, **kwargs):
+    fields = _tracked[sender]
+    update_fields = set(update_fields) if update_fields is not None else None
+    if instance._state.adding:
+        row = None
+    elif update_fields is not None and not fields & update_fields:
+        row = UNCHANGED
+    else:
+        row = sender._base_manager.filter(pk=instance.pk).only(*fields).first()
+    instance._stored = (row, update_fields)
+
+
+def stored(instance, fields):
+    """
+    L'objet tel qu'enregistré avant la sauvegarde en cours (``fields`` chargés) :
+    None s'il n'existait pas encore, UNCHANGED si la sauvegarde ne touche aucun
+    de ``fields``.
+    """
+    row, update_fields = instance.__dict__.get('_stored', (UNCHANGED, None))
+    if row is not UNCHANGED and update_fields is not None and not set(fields) & update_fields:
+        return UNCHANGED
+    return row
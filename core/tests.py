@@ -1,3 +1,602 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import sqlite3
+import tempfile
+import threading
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core import mail
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.signals import request_finished
+from django.db import OperationalError, connection
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseRedirect
+from django.middleware.csrf import get_token
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from notifications.models import Notification
+from projects.models import Project
+from users.models import User
+
+from .activity_search import search_activity_logs
+from .audit import ActivityLogBuffer
+from .buffers import WriteBehindBuffer
+from .counters import ViewCounterBuffer
+from .kpi import KPIDeltaBuffer
+from .log_archive import archive_dir, compact, iter_archived_logs
+from .push import LocalBroker, get_broker
+from .page_cache import VERSION_KEY, cache_anonymous_page
+from .pagination import decode_cursor, encode_cursor, paginate_keyset
+from .mail import purge_outbox, queue_mail, send_queued_mail, send_request_emails, start_request_emails
+from .models import ActivityLog, KPISnapshot, OutboundEmail
+
+
+class OutboundEmailTests(TestCase):
+    """File d'attente des emails : envoi, effacement du corps et purge"""
+
+    def queue(self, body='Lien : https://example.com/reset/secret-token/'):
+        return queue_mail('Réinitialisation', body, None, ['membre@example.com'])
+
+    @override_settings(EMAIL_OUTBOX_SEND_INLINE=False)
+    def test_send_blanks_body(self):
+        email = self.queue()
+        self.assertEqual(send_queued_mail(), (1, 0))
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('secret-token', mail.outbox[0].body)
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'sent')
+        self.assertEqual(email.body, '')
+        self.assertEqual(email.html_body, '')
+
+    @override_settings(EMAIL_OUTBOX_SEND_INLINE=True)
+    def test_inline_send_only_the_request_emails_after_response(self):
+        earlier = self.queue()
+        start_request_emails(None)
+        self.addCleanup(send_request_emails, None)
+        with self.captureOnCommitCallbacks(execute=True):
+            email = self.queue()
+        self.assertEqual(len(mail.outbox), 0)
+
+        send_request_emails(None)
+        self.assertEqual(len(mail.outbox), 1)
+        email.refresh_from_db()
+        earlier.refresh_from_db()
+        self.assertEqual((email.status, earlier.status), ('sent', 'pending'))
+
+    @override_settings(EMAIL_OUTBOX_SEND_INLINE=True)
+    def test_inline_send_needs_a_request(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.queue()
+        send_request_emails(None)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_inline_send_is_off_by_default(self):
+        start_request_emails(None)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.queue()
+        send_request_emails(None)
+        self.assertEqual(len(mail.outbox), 0)
+
+    @override_settings(EMAIL_OUTBOX_SEND_INLINE=False)
+    def test_without_inline_send_mail_waits_for_worker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.queue()
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboundEmail.objects.get().status, 'pending')
+
+    @override_settings(EMAIL_OUTBOX_SEND_INLINE=False, EMAIL_OUTBOX_RETENTION_DAYS=7)
+    def test_purge_keeps_recent_and_pending(self):
+        now = timezone.now()
+        old = now - timedelta(days=8)
+        sent_old = self.queue()
+        sent_recent = self.queue()
+        failed_old = self.queue()
+        pending_old = self.queue()
+        OutboundEmail.objects.filter(pk=sent_old.pk).update(status='sent', sent_at=old)
+        OutboundEmail.objects.filter(pk=sent_recent.pk).update(status='sent', sent_at=now)
+        OutboundEmail.objects.filter(pk=failed_old.pk).update(status='failed', created_at=old)
+        OutboundEmail.objects.filter(pk=pending_old.pk).update(created_at=old)
+
+        self.assertEqual(purge_outbox(now), 2)
+        self.assertQuerySetEqual(
+            OutboundEmail.objects.order_by('pk').values_list('pk', flat=True),
+            [sent_recent.pk, pending_old.pk],
+        )
+
+    @override_settings(EMAIL_OUTBOX_SEND_INLINE=False)
+    def test_admin_never_shows_body(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        email = self.queue()
+        self.client.force_login(admin)
+
+        for url in ('/admin/core/outboundemail/', f'/admin/core/outboundemail/{email.pk}/change/'):
+            response = self.client.get(url, HTTP_HOST='localhost')
+            self.assertEqual(response.status_code, 200)
+            self.assertNotContains(response, 'secret-token')
+
+
+class ActivityLogArchiveTests(TestCase):
+    """Archivage du journal d'activité et recherche dans les archives"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(ACTIVITY_LOG_ARCHIVE_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user('membre', 'membre@example.com', 'pass')
+        self.now = timezone.make_aware(datetime(2025, 9, 15, 12))
+        self.old = self.log('Ferme solaire', datetime(2025, 1, 10, 9))
+        self.other = self.log('Atelier couture', datetime(2025, 2, 3, 9), action='update')
+        self.recent = self.log('Ferme solaire', datetime(2025, 8, 1, 9))
+
+    def log(self, name, created_at, action='create'):
+        entry = ActivityLog.log(self.user, action, 'project', 1, name, 'Projet', sync=True)
+        ActivityLog.objects.filter(pk=entry.pk).update(created_at=timezone.make_aware(created_at))
+        return entry
+
+    def test_compact_moves_old_months_to_files(self):
+        self.assertEqual(compact(months=6, now=self.now), {'2025-01': 1, '2025-02': 1})
+
+        self.assertQuerySetEqual(ActivityLog.objects.values_list('pk', flat=True), [self.recent.pk])
+        with gzip.open(archive_dir() / 'activity-2025-01.jsonl.gz', 'rt', encoding='utf-8') as archive:
+            entries = [json.loads(line) for line in archive]
+        self.assertEqual([entry['id'] for entry in entries], [self.old.pk])
+        self.assertEqual(entries[0]['user_email'], 'membre@example.com')
+
+    def test_interrupted_delete_does_not_archive_twice(self):
+        with mock.patch('core.log_archive._delete', side_effect=OperationalError('arrêt')):
+            with self.assertRaises(OperationalError):
+                compact(months=6, now=self.now)
+        self.assertEqual(ActivityLog.objects.count(), 3)
+        later = self.log('Forage', datetime(2025, 1, 20, 9))
+
+        self.assertEqual(compact(months=6, now=self.now), {'2025-01': 1, '2025-02': 1})
+        self.assertQuerySetEqual(ActivityLog.objects.values_list('pk', flat=True), [self.recent.pk])
+        self.assertEqual(
+            sorted(entry['id'] for entry in iter_archived_logs()),
+            sorted([self.old.pk, self.other.pk, later.pk]),
+        )
+
+    def test_iter_archived_logs_filters(self):
+        compact(months=6, now=self.now)
+
+        self.assertEqual([entry['id'] for entry in iter_archived_logs(query='FERME')], [self.old.pk])
+        self.assertEqual([entry['id'] for entry in iter_archived_logs(action='update')], [self.other.pk])
+        self.assertEqual(
+            [entry['id'] for entry in iter_archived_logs(date_from=date(2025, 2, 1), date_to=date(2025, 2, 3))],
+            [self.other.pk],
+        )
+        self.assertEqual(list(iter_archived_logs(user_id=self.user.pk + 1)), [])
+
+    def test_search_command(self):
+        compact(months=6, now=self.now)
+        output = StringIO()
+        call_command('search_activity_archives', '--search', 'atelier', stdout=output)
+        self.assertIn('Atelier couture', output.getvalue())
+        self.assertNotIn('Ferme solaire', output.getvalue())
+
+    def test_archive_dir_must_be_configured(self):
+        with override_settings(ACTIVITY_LOG_ARCHIVE_DIR=''):
+            with self.assertRaises(CommandError):
+                call_command('compact_activity_logs', stdout=StringIO())
+        self.assertEqual(ActivityLog.objects.count(), 3)
+
+
+@override_settings(ACTIVITY_LOG_BUFFERED=True, ACTIVITY_LOG_BUFFER_SIZE=3, ACTIVITY_LOG_FLUSH_INTERVAL=60)
+class ActivityLogBufferTests(TestCase):
+    """Écriture différée du journal d'activité"""
+
+    def setUp(self):
+        self.buffer = ActivityLogBuffer()
+        self.addCleanup(self.buffer.flush)
+
+    def entry(self, name='Ferme solaire', action='create'):
+        entry = ActivityLog(action=action, entity_type='project', entity_name=name)
+        entry.user_agent_value = 'Mozilla/5.0'
+        return entry
+
+    def test_flush_writes_pending_entries(self):
+        self.buffer.add(self.entry('A'))
+        self.buffer.add(self.entry('B'))
+        self.assertEqual(ActivityLog.objects.count(), 0)
+        self.assertEqual(len(self.buffer), 2)
+
+        self.buffer.flush()
+        self.assertEqual(list(ActivityLog.objects.order_by('pk').values_list('entity_name', flat=True)), ['A', 'B'])
+        self.assertEqual(ActivityLog.objects.filter(user_agent__value='Mozilla/5.0').count(), 2)
+        self.assertEqual(len(self.buffer), 0)
+
+    def test_full_buffer_flushes(self):
+        for name in 'ABC':
+            self.buffer.add(self.entry(name))
+        self.assertEqual(ActivityLog.objects.count(), 3)
+
+    def test_log_is_flushed_at_request_end(self):
+        with mock.patch('core.audit.activity_log_buffer', self.buffer):
+            ActivityLog.log(None, 'create', 'project', entity_name='Requête')
+            self.assertEqual(ActivityLog.objects.count(), 0)
+            request_finished.send(sender=self.__class__)
+        self.assertEqual(ActivityLog.objects.get().entity_name, 'Requête')
+
+    def test_sync_log_skips_buffer(self):
+        with mock.patch('core.audit.activity_log_buffer', self.buffer):
+            ActivityLog.log(None, 'validate', 'investment', entity_name='Direct', sync=True)
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(ActivityLog.objects.get().entity_name, 'Direct')
+
+    def test_invalid_entry_is_dropped_alone(self):
+        self.buffer.add(self.entry('A'))
+        self.buffer.add(self.entry('Invalide', action=None))
+        with self.assertLogs('core.audit', 'ERROR'):
+            self.buffer.flush()
+        self.assertEqual(list(ActivityLog.objects.values_list('entity_name', flat=True)), ['A'])
+        self.assertEqual(len(self.buffer), 0)
+
+    def test_entries_requeued_when_database_unavailable(self):
+        self.buffer.add(self.entry('A'))
+        self.buffer.add(self.entry('B'))
+        with mock.patch.object(ActivityLog.objects, 'bulk_create', side_effect=OperationalError), \
+                mock.patch.object(ActivityLog, 'save', side_effect=OperationalError), \
+                self.assertLogs('core.audit', 'ERROR'):
+            self.buffer.flush()
+        self.assertEqual(len(self.buffer), 2)
+
+        self.buffer.flush()
+        self.assertEqual(ActivityLog.objects.count(), 2)
+
+
+class KeysetPaginationTests(TestCase):
+    """Curseurs du journal d'activité : aller-retour entre les pages"""
+
+    ordering = ['-created_at', 'id']
+
+    def setUp(self):
+        moment = timezone.now()
+        for index in range(7):
+            log = ActivityLog.log(None, 'create', 'project', index, f'Projet {index}', sync=True)
+            # Plusieurs entrées à la même date : l'id départage
+            ActivityLog.objects.filter(pk=log.pk).update(created_at=moment - timedelta(minutes=index // 3))
+        self.expected = list(ActivityLog.objects.order_by(*self.ordering))
+
+    def test_cursor_round_trip(self):
+        log = self.expected[0]
+        cursor = encode_cursor([log.created_at, log.pk])
+        self.assertEqual(decode_cursor(cursor, ActivityLog, self.ordering), [log.created_at, log.pk])
+        self.assertIsNone(decode_cursor('pas-un-curseur', ActivityLog, self.ordering))
+        self.assertIsNone(decode_cursor(encode_cursor([log.pk]), ActivityLog, self.ordering))
+
+    def test_next_then_previous_pages(self):
+        queryset = ActivityLog.objects.all()
+        pages = [paginate_keyset(queryset, self.ordering, per_page=3)]
+        while pages[-1].next_cursor:
+            pages.append(paginate_keyset(queryset, self.ordering, after=pages[-1].next_cursor, per_page=3))
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual([log for page in pages for log in page], self.expected)
+        self.assertFalse(pages[0].has_previous)
+
+        previous = paginate_keyset(queryset, self.ordering, before=pages[2].previous_cursor, per_page=3)
+        self.assertEqual(previous.items, pages[1].items)
+        first = paginate_keyset(queryset, self.ordering, before=previous.previous_cursor, per_page=3)
+        self.assertEqual(first.items, pages[0].items)
+        self.assertFalse(first.has_previous)
+
+    def test_invalid_cursor_returns_first_page(self):
+        page = paginate_keyset(ActivityLog.objects.all(), self.ordering, after='%%%', per_page=3)
+        self.assertEqual(page.items, self.expected[:3])
+
+
+@skipUnless(connection.vendor == 'sqlite' and sqlite3.sqlite_version_info >= (3, 34, 0), 'FTS5 trigram (SQLite)')
+class ActivitySearchTests(TestCase):
+    """Recherche FTS5 trigrammes du journal d'activité sous SQLite"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', user_type='admin')
+        self.member = User.objects.create_user('membre', 'marie.k@example.com', 'pass')
+        # Écrites après toutes les migrations : les triggers doivent les indexer
+        self.validation = ActivityLog.log(
+            self.admin, 'approve', 'project', 1, 'Ferme Solaire', 'Validation du projet', sync=True,
+        )
+        self.login = ActivityLog.log(self.member, 'login', 'user', self.member.pk, 'Marie', 'Connexion', sync=True)
+
+    def search(self, query):
+        return list(search_activity_logs(ActivityLog.objects.all(), query))
+
+    def test_new_log_is_found_through_fts(self):
+        queryset = search_activity_logs(ActivityLog.objects.all(), 'solaire')
+        self.assertIn('MATCH', str(queryset.query))
+        self.assertEqual(list(queryset), [self.validation])
+        self.assertEqual(self.search('ALIDATION DU'), [self.validation])
+        self.assertEqual(self.search('éolien'), [])
+
+    def test_updates_and_deletes_reach_the_index(self):
+        ActivityLog.objects.filter(pk=self.validation.pk).update(entity_name='Moulin')
+        self.assertEqual(self.search('solaire'), [])
+        self.assertEqual(self.search('moulin'), [self.validation])
+
+        ActivityLog.objects.filter(pk=self.validation.pk).delete()
+        self.assertEqual(self.search('moulin'), [])
+
+    def test_short_terms_quotes_and_emails(self):
+        self.assertEqual(self.search('ar'), [self.login])
+        self.assertEqual(self.search('"Ferme'), [])
+        self.assertEqual(self.search('marie.k@'), [self.login])
+
+    def test_admin_page_searches_logs(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('core:admin_activity_logs'), {'q': 'solaire'}, HTTP_HOST='localhost')
+        self.assertEqual(list(response.context['page']), [self.validation])
+
+
+class WriteBehindBufferTests(TestCase):
+    """Tampons d'écriture différée : cumul, vidage et minuteur"""
+
+    def setUp(self):
+        owner = User.objects.create_user('porteur', 'porteur@example.com', 'pass', user_type='porteur')
+        self.project = Project.objects.create(
+            owner=owner, title='Ferme solaire', summary='Résumé', description='Description',
+            sector='energy', funding_stage='seed', location='Kinshasa',
+            funding_goal=Decimal('10000'), min_investment=Decimal('100'), status='approved',
+        )
+
+    def buffer(self, cls):
+        buffer = cls()
+        self.addCleanup(buffer.flush)
+        return buffer
+
+    @override_settings(VIEW_COUNTER_FLUSH_INTERVAL=60)
+    def test_view_counter_accumulates_then_flushes(self):
+        buffer = self.buffer(ViewCounterBuffer)
+        buffer.add(Project, self.project.pk)
+        buffer.add(Project, self.project.pk, count=2)
+        self.assertEqual(buffer.pending(Project, self.project.pk), 3)
+        self.assertFalse(buffer.should_flush())
+
+        with self.assertNumQueries(1):
+            buffer.flush()
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.views_count, 3)
+        self.assertEqual(buffer.pending(Project, self.project.pk), 0)
+
+    @override_settings(VIEW_COUNTER_FLUSH_INTERVAL=60)
+    def test_failed_write_is_restored(self):
+        buffer = self.buffer(KPIDeltaBuffer)
+        buffer.add(total_messages=1)
+        with mock.patch('core.models.KPISnapshot.apply_deltas', side_effect=OperationalError), \
+                self.assertLogs('core.buffers', 'ERROR'):
+            buffer.flush()
+        self.assertEqual(sum(deltas['total_messages'] for deltas in buffer._pending.values()), 1)
+
+    def test_kpi_deltas_are_dated_like_snapshots(self):
+        buffer = self.buffer(KPIDeltaBuffer)
+        buffer.add(total_messages=5)
+        snapshot = KPISnapshot.take()
+        # Même seconde que l'instantané, mais après lui
+        with mock.patch('core.kpi.timezone.now', return_value=snapshot.created_at + timedelta(microseconds=1)):
+            buffer.add(total_messages=1)
+        buffer.flush()
+        snapshot.refresh_from_db()
+        self.assertEqual(snapshot.total_messages, 1)
+
+    @override_settings(VIEW_COUNTER_FLUSH_INTERVAL=0.05)
+    def test_timer_flushes_idle_buffer(self):
+        written = threading.Event()
+
+        class Buffer(WriteBehindBuffer):
+            def _write(self, pending):
+                self.written = dict(pending)
+                written.set()
+
+        buffer = self.buffer(Buffer)
+        buffer.add('clé', views=1)
+        buffer.add('clé', views=2)
+        self.assertTrue(written.wait(5))
+        self.assertEqual(buffer.written, {'clé': {'views': 3}})
+        self.assertEqual(len(buffer), 0)
+
+
+class KPISignalTests(TestCase):
+    """Variations des indicateurs calculées à l'enregistrement, pas au chargement"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user('porteur', 'porteur@example.com', 'pass', user_type='porteur')
+        self.project = Project.objects.create(
+            owner=self.owner, title='Ferme solaire', summary='Résumé', description='Description',
+            sector='energy', funding_stage='seed', location='Kinshasa',
+            funding_goal=Decimal('10000'), min_investment=Decimal('100'), status='submitted',
+        )
+        patcher = mock.patch('core.signals.record_kpi')
+        self.record_kpi = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_loading_takes_no_snapshot(self):
+        Notification.objects.create(
+            recipient=self.owner, notification_type='project_approved', title='Validé', message='Message',
+        )
+        with self.assertNumQueries(1):
+            notifications = list(Notification.objects.all())
+        self.assertFalse(hasattr(notifications[0], '_stored'))
+
+    def test_delta_is_computed_from_stored_row(self):
+        stale = Project.objects.get(pk=self.project.pk)
+        Project.objects.filter(pk=self.project.pk).update(status='approved')
+
+        stale.status = 'rejected'
+        stale.save()
+        self.record_kpi.assert_called_once_with(approved_projects=-1, rejected_projects=1)
+
+    def test_unrelated_update_fields_skip_the_lookup(self):
+        with self.assertNumQueries(1):
+            self.project.save(update_fields=['views_count'])
+        self.record_kpi.assert_not_called()
+
+    def test_full_save_reads_the_stored_row_once(self):
+        self.project.title = 'Ferme solaire de Goma'
+        with CaptureQueriesContext(connection) as queries:
+            self.project.save()
+        selects = [query for query in queries.captured_queries if query['sql'].startswith('SELECT')]
+        self.assertEqual(len(selects), 1)
+
+    def test_notification_read_and_delete(self):
+        notification = Notification.objects.create(
+            recipient=self.owner, notification_type='project_approved', title='Validé', message='Message',
+        )
+        self.record_kpi.assert_called_once_with(total_notifications=1, unread_notifications=1)
+
+        self.record_kpi.reset_mock()
+        notification.mark_as_read()
+        self.record_kpi.assert_called_once_with(unread_notifications=-1)
+
+        self.record_kpi.reset_mock()
+        notification.delete()
+        self.record_kpi.assert_called_once_with(total_notifications=-1)
+
+
+class LocalBrokerTests(TestCase):
+    """Broker en mémoire des événements temps réel"""
+
+    async def test_publish_reaches_subscribers_of_the_user(self):
+        broker = LocalBroker()
+        subscription = broker.subscribe(1)
+        other = broker.subscribe(2)
+
+        # Publication depuis un autre thread, comme depuis une vue synchrone
+        await asyncio.to_thread(broker.publish, 1, {'type': 'notification', 'id': 5})
+        self.assertEqual(await subscription.get(timeout=1), {'type': 'notification', 'id': 5})
+        self.assertIsNone(await other.get(timeout=0.01))
+
+    async def test_closed_subscription_receives_nothing(self):
+        broker = LocalBroker()
+        subscription = broker.subscribe(1)
+        subscription.close()
+        broker.publish(1, {'type': 'notification'})
+        self.assertIsNone(await subscription.get(timeout=0.01))
+        self.assertEqual(dict(broker._subscriptions), {})
+
+
+@override_settings(
+    ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+    PUSH_BROKER_BACKEND='core.push.LocalBroker',
+    PUSH_HEARTBEAT_INTERVAL=1,
+    PUSH_STREAM_MAX_AGE=2,
+)
+class EventStreamTests(TestCase):
+    """Flux server-sent events servi en ASGI"""
+
+    async def test_anonymous_is_refused(self):
+        response = await self.async_client.get(reverse('core:event_stream'))
+        self.assertEqual(response.status_code, 403)
+
+    async def test_stream_delivers_published_events(self):
+        user = await User.objects.acreate_user('membre', 'membre@example.com', 'pass')
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(reverse('core:event_stream'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b'retry: 5000\n\n')
+        get_broker().publish(user.pk, {'type': 'notification', 'unread': 3})
+        chunk = await anext(chunks)
+        self.assertTrue(chunk.startswith(b'event: notification\n'))
+        self.assertIn(b'"unread": 3', chunk)
+        await response.streaming_content.aclose()
+
+
+@override_settings(PAGE_CACHE_ENABLED=True)
+class PageCacheTests(TestCase):
+    """Cache des pages publiques : contournements et invalidation"""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.calls = 0
+
+    def cached_view(self, body=None):
+        @cache_anonymous_page('projects')
+        def view(request):
+            self.calls += 1
+            return body(request) if body else HttpResponse('page')
+        return view
+
+    def get(self, view, path='/projets/', **extra):
+        request = self.factory.get(path, **extra)
+        request._messages = CookieStorage(request)
+        return view(request)
+
+    def test_anonymous_page_is_served_from_cache(self):
+        view = self.cached_view()
+        self.assertEqual(self.get(view)['X-Page-Cache'], 'miss')
+        response = self.get(view, '/projets/?utm_source=mail')
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertEqual(response.content, b'page')
+        self.assertEqual(self.calls, 1)
+
+    def test_session_and_messages_cookies_bypass_cache(self):
+        view = self.cached_view()
+        self.get(view)
+        for cookie in (settings.SESSION_COOKIE_NAME, 'messages'):
+            response = self.get(view, HTTP_COOKIE=f'{cookie}=x')
+            self.assertNotIn('X-Page-Cache', response)
+        self.assertEqual(self.calls, 3)
+
+    def test_page_with_csrf_token_is_not_cached(self):
+        view = self.cached_view(lambda request: HttpResponse(get_token(request)))
+        self.assertNotIn('X-Page-Cache', self.get(view))
+        self.assertNotIn('X-Page-Cache', self.get(view))
+        self.assertEqual(self.calls, 2)
+
+    def test_page_adding_a_message_is_not_cached(self):
+        def body(request):
+            messages.info(request, 'Bienvenue')
+            return HttpResponse('page')
+        view = self.cached_view(body)
+        self.get(view)
+        self.get(view)
+        self.assertEqual(self.calls, 2)
+
+    def test_non_200_responses_are_not_cached(self):
+        for response in (HttpResponse(status=404), HttpResponseRedirect('/connexion/')):
+            self.calls = 0
+            view = self.cached_view(lambda request: response)
+            self.get(view, '/autre/')
+            self.get(view, '/autre/')
+            self.assertEqual(self.calls, 2)
+
+    def test_counter_saves_keep_project_pages(self):
+        owner = User.objects.create_user('porteur', 'porteur@example.com', 'pass', user_type='porteur')
+        project = Project.objects.create(
+            owner=owner, title='Ferme solaire', summary='Résumé', description='Description',
+            sector='energy', funding_stage='seed', location='Kinshasa',
+            funding_goal=Decimal('10000'), min_investment=Decimal('100'), status='approved',
+        )
+        view = self.cached_view()
+        self.get(view)
+        version = cache.get(VERSION_KEY.format('projects'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            project.favorites_count = 1
+            project.save(update_fields=['favorites_count'])
+            project.views_count = 10
+            project.save(update_fields=['views_count'])
+        self.assertEqual(cache.get(VERSION_KEY.format('projects')), version)
+        self.assertEqual(self.get(view)['X-Page-Cache'], 'hit')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            project.title = 'Ferme solaire de Goma'
+            project.save()
+        self.assertNotEqual(cache.get(VERSION_KEY.format('projects')), version)
+        self.assertEqual(self.get(view)['X-Page-Cache'], 'miss')
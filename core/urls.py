@@ -12,6 +12,9 @@ urlpatterns = [
     path('privacy/', views.privacy, name='privacy'),
     path('legal/', views.legal, name='legal'),
     
+    # Temps réel (server-sent events, ASGI)
+    path('events/', views.event_stream, name='event_stream'),
+    
     # Admin - Logs
     path('content/logs/', views.admin_activity_logs, name='admin_activity_logs'),
     
@@ -4,16 +4,29 @@ from django.core.paginator import Paginator
 from django.db.models import Q, Count
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.utils import timezone
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.conf import settings
+from django.db import connections
+from asgiref.sync import sync_to_async
+import asyncio
+import json
 from .forms import ContactForm
 from .models import BlogPost, BlogCategory, ActivityLog
+from .counters import record_view
+from .push import get_broker
+from .page_cache import cache_anonymous_page
+from .pagination import estimate_count, paginate_keyset
+from .activity_search import search_activity_logs
 
 
+@cache_anonymous_page()
 def home(request):
     """Page d'accueil"""
     return render(request, 'core/home.html')
 
 
+@cache_anonymous_page()
 def about(request):
     """Page À propos"""
     return render(request, 'core/about.html')
@@ -80,8 +93,8 @@ def blog_detail(request, slug):
     """Page détail d'un article de blog"""
     post = get_object_or_404(BlogPost, slug=slug, status='published')
     
-    # Incrémenter le compteur de vues
-    post.increment_views()
+    # Compter la vue (dédoublonnée par visiteur, écrite en différé)
+    record_view(request, post)
     
     # Articles similaires (même catégorie)
     related_posts = BlogPost.objects.filter(
@@ -272,6 +285,7 @@ def contact_message_update_status(request, message_id):
     return JsonResponse({'success': False, 'error': 'Statut invalide'}, status=400)
 
 
+@cache_anonymous_page()
 def faq(request):
     """Page FAQ"""
     return render(request, 'core/faq.html')
@@ -590,6 +604,9 @@ def admin_category_delete(request, category_id):
 # VUES ADMIN - LOGS/ACTIVITÉS
 # ============================================
 
+ACTIVITY_LOGS_PER_PAGE = 50
+ACTIVITY_LOG_ORDERING = ['-created_at', 'id']
+
 @login_required
 @user_passes_test(is_admin)
 def admin_activity_logs(request):
@@ -600,9 +617,9 @@ def admin_activity_logs(request):
     entity_type = request.GET.get('entity_type', '')
     date_from = request.GET.get('date_from', '')
     date_to = request.GET.get('date_to', '')
-    search = request.GET.get('q', '')
+    search = request.GET.get('q', '').strip()
     
-    logs = ActivityLog.objects.select_related('user').order_by('-created_at')
+    logs = ActivityLog.objects.select_related('user')
     
     # Appliquer les filtres
     if user_id:
@@ -621,16 +638,29 @@ def admin_activity_logs(request):
         logs = logs.filter(created_at__date__lte=date_to)
     
     if search:
-        logs = logs.filter(
-            Q(entity_name__icontains=search) |
-            Q(description__icontains=search) |
-            Q(user__email__icontains=search)
-        )
-    
-    # Pagination
-    paginator = Paginator(logs, 50)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+        logs = search_activity_logs(logs, search)
+    
+    # Pagination par curseur : une page profonde coûte autant que la première
+    page = paginate_keyset(
+        logs,
+        ordering=ACTIVITY_LOG_ORDERING,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        per_page=ACTIVITY_LOGS_PER_PAGE,
+    )
+    
+    # Liens de navigation : mêmes filtres, curseur remplacé
+    query = request.GET.copy()
+    query.pop('after', None)
+    query.pop('before', None)
+    next_page_query = previous_page_query = None
+    if page.next_cursor:
+        query['after'] = page.next_cursor
+        next_page_query = query.urlencode()
+        del query['after']
+    if page.previous_cursor:
+        query['before'] = page.previous_cursor
+        previous_page_query = query.urlencode()
     
     # Pour les filtres
     from django.contrib.auth import get_user_model
@@ -638,7 +668,10 @@ def admin_activity_logs(request):
     users = User.objects.filter(is_active=True).order_by('email')
     
     context = {
-        'page_obj': page_obj,
+        'page': page,
+        'total': estimate_count(logs),
+        'next_page_query': next_page_query,
+        'previous_page_query': previous_page_query,
         'users': users,
         'action_choices': ActivityLog.ACTION_CHOICES,
         'entity_choices': ActivityLog.ENTITY_CHOICES,
@@ -653,3 +686,57 @@ def admin_activity_logs(request):
     
     return render(request, 'core/admin_activity_logs.html', context)
 
+
+
+# ============================================
+# TEMPS RÉEL
+# ============================================
+
+def _release_db_connections():
+    """Ferme les connexions du thread hors transaction (la vue n'en a plus besoin)"""
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+async def event_stream(request):
+    """
+    Flux server-sent events des nouveaux messages et notifications de l'utilisateur.
+
+    Nécessite un serveur ASGI (config/asgi.py) ; servi en WSGI, il répond 204 et
+    le navigateur n'essaie pas de se reconnecter. La connexion est fermée après
+    PUSH_STREAM_MAX_AGE secondes, EventSource la rouvre aussitôt.
+
+    La connexion à la base ouverte pour l'authentification est fermée avant
+    l'attente : un onglet ouvert n'occupe pas de connexion pendant des minutes.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=403)
+    await sync_to_async(_release_db_connections)()
+
+    heartbeat = getattr(settings, 'PUSH_HEARTBEAT_INTERVAL', 15)
+    max_age = getattr(settings, 'PUSH_STREAM_MAX_AGE', 300)
+
+    async def events():
+        subscription = get_broker().subscribe(user.pk)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_age
+        try:
+            yield 'retry: 5000\n\n'
+            while loop.time() < deadline:
+                event = await subscription.get(timeout=min(heartbeat, max(deadline - loop.time(), 0)))
+                if event is None:
+                    # Commentaire SSE : garde la connexion ouverte à travers les proxys
+                    yield ': ping\n\n'
+                else:
+                    yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
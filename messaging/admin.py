@@ -1,11 +1,19 @@
 from django.contrib import admin
-from .models import Conversation, Message
+from .models import Conversation, ConversationParticipant, Message
+
+
+class ConversationParticipantInline(admin.TabularInline):
+    model = ConversationParticipant
+    extra = 0
+    raw_id_fields = ['user']
+    readonly_fields = ['unread_count', 'last_activity_at', 'last_read_at']
+    exclude = ['last_read_message']
 
 
 class MessageInline(admin.TabularInline):
     model = Message
     extra = 0
-    readonly_fields = ['sender', 'created_at', 'is_read']
+    readonly_fields = ['sender', 'created_at']
 
 
 @admin.register(Conversation)
@@ -13,9 +21,11 @@ class ConversationAdmin(admin.ModelAdmin):
     list_display = ['id', 'get_participants', 'project', 'created_at', 'updated_at']
     list_filter = ['created_at', 'updated_at']
     search_fields = ['participants__username']
-    filter_horizontal = ['participants']
     raw_id_fields = ['project']
-    inlines = [MessageInline]
+    readonly_fields = [
+        'participant_key', 'last_message', 'last_message_at', 'last_message_sender', 'last_message_preview'
+    ]
+    inlines = [ConversationParticipantInline, MessageInline]
     
     def get_participants(self, obj):
         return ', '.join([user.username for user in obj.participants.all()])
@@ -24,11 +34,11 @@ class ConversationAdmin(admin.ModelAdmin):
 
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
-    list_display = ['sender', 'conversation', 'content_preview', 'is_read', 'created_at']
-    list_filter = ['is_read', 'created_at']
+    list_display = ['sender', 'conversation', 'content_preview', 'created_at']
+    list_filter = ['created_at']
     search_fields = ['sender__username', 'content']
     raw_id_fields = ['conversation', 'sender']
-    readonly_fields = ['created_at', 'read_at']
+    readonly_fields = ['created_at']
     
     def content_preview(self, obj):
         return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
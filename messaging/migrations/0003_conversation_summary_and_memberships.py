@@ -0,0 +1,102 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_summaries(apps, schema_editor):
+    """Renseigne le dernier message des conversations et les non lus par participant"""
+    Conversation = apps.get_model('messaging', 'Conversation')
+    ConversationParticipant = apps.get_model('messaging', 'ConversationParticipant')
+    Message = apps.get_model('messaging', 'Message')
+
+    for conversation in Conversation.objects.iterator(chunk_size=500):
+        last_message = Message.objects.filter(conversation=conversation).order_by('-created_at', '-id').first()
+        if last_message is not None:
+            preview = ' '.join(last_message.content.split())
+            if len(preview) > 120:
+                preview = preview[:119].rstrip() + '…'
+            Conversation.objects.filter(pk=conversation.pk).update(
+                last_message=last_message,
+                last_message_at=last_message.created_at,
+                last_message_sender=last_message.sender_id,
+                last_message_preview=preview,
+            )
+        last_activity_at = last_message.created_at if last_message else conversation.created_at
+
+        for membership in ConversationParticipant.objects.filter(conversation=conversation):
+            membership.unread_count = Message.objects.filter(
+                conversation=conversation, is_read=False
+            ).exclude(sender_id=membership.user_id).count()
+            membership.last_activity_at = last_activity_at
+            membership.save(update_fields=['unread_count', 'last_activity_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # La table M2M existante devient le modèle ConversationParticipant
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ConversationParticipant',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='messaging.conversation', verbose_name='Conversation')),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversation_memberships', to=settings.AUTH_USER_MODEL, verbose_name='Participant')),
+                    ],
+                    options={
+                        'verbose_name': 'Participant',
+                        'verbose_name_plural': 'Participants',
+                        'db_table': 'messaging_conversation_participants',
+                        'unique_together': {('conversation', 'user')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='conversation',
+                    name='participants',
+                    field=models.ManyToManyField(related_name='conversations', through='messaging.ConversationParticipant', to=settings.AUTH_USER_MODEL, verbose_name='Participants'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='conversationparticipant',
+            name='unread_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Messages non lus'),
+        ),
+        migrations.AddField(
+            model_name='conversationparticipant',
+            name='last_activity_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Dernière activité'),
+        ),
+        migrations.AddIndex(
+            model_name='conversationparticipant',
+            index=models.Index(fields=['user', '-last_activity_at', '-id'], name='messaging_c_user_id_2ace3c_idx'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='messaging.message', verbose_name='Dernier message'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Dernier message le'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_preview',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Aperçu du dernier message'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_sender',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Auteur du dernier message'),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
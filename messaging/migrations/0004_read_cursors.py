@@ -0,0 +1,65 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def flags_to_cursors(apps, schema_editor):
+    """
+    Place le curseur de chaque participant sur le dernier message lu qu'il a
+    reçu, puis recalcule ses non lus comme les messages reçus après ce curseur.
+    """
+    ConversationParticipant = apps.get_model('messaging', 'ConversationParticipant')
+    Message = apps.get_model('messaging', 'Message')
+
+    for membership in ConversationParticipant.objects.iterator(chunk_size=500):
+        received = Message.objects.filter(
+            conversation_id=membership.conversation_id
+        ).exclude(sender_id=membership.user_id)
+        last_read = received.filter(is_read=True).order_by('-created_at', '-id').first()
+        if last_read is not None:
+            membership.last_read_at = last_read.created_at
+            membership.last_read_message_id = last_read.pk
+            received = received.filter(created_at__gt=last_read.created_at)
+        membership.unread_count = received.count()
+        membership.save(update_fields=['last_read_at', 'last_read_message', 'unread_count'])
+
+
+def cursors_to_flags(apps, schema_editor):
+    """Retour arrière : marque comme lus les messages reçus jusqu'au curseur"""
+    ConversationParticipant = apps.get_model('messaging', 'ConversationParticipant')
+    Message = apps.get_model('messaging', 'Message')
+
+    memberships = ConversationParticipant.objects.filter(last_read_at__isnull=False)
+    for membership in memberships.iterator(chunk_size=500):
+        Message.objects.filter(
+            conversation_id=membership.conversation_id,
+            created_at__lte=membership.last_read_at,
+        ).exclude(sender_id=membership.user_id).update(is_read=True, read_at=membership.last_read_at)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0003_conversation_summary_and_memberships'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversationparticipant',
+            name='last_read_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name="Lu jusqu'au"),
+        ),
+        migrations.AddField(
+            model_name='conversationparticipant',
+            name='last_read_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='messaging.message', verbose_name='Dernier message lu'),
+        ),
+        migrations.RunPython(flags_to_cursors, cursors_to_flags),
+        migrations.RemoveField(
+            model_name='message',
+            name='is_read',
+        ),
+        migrations.RemoveField(
+            model_name='message',
+            name='read_at',
+        ),
+    ]
@@ -0,0 +1,49 @@
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def backfill_participant_keys(apps, schema_editor):
+    """
+    Calcule la clé canonique des conversations à deux participants.
+
+    Si plusieurs conversations existent déjà pour la même paire (et le même
+    projet), seule la plus récemment active reçoit la clé ; les doublons
+    restent consultables mais ne sont plus retrouvés par start_conversation.
+    """
+    Conversation = apps.get_model('messaging', 'Conversation')
+    ConversationParticipant = apps.get_model('messaging', 'ConversationParticipant')
+
+    participants = defaultdict(list)
+    for conversation_id, user_id in ConversationParticipant.objects.values_list('conversation_id', 'user_id').iterator():
+        participants[conversation_id].append(user_id)
+
+    used_keys = set()
+    conversations = Conversation.objects.order_by('-updated_at', '-id').values_list('pk', 'project_id')
+    for conversation_id, project_id in conversations.iterator():
+        user_ids = participants.get(conversation_id, [])
+        if len(user_ids) != 2:
+            continue
+        key = '-'.join(str(user_id) for user_id in sorted(user_ids))
+        if project_id is not None:
+            key += f':p{project_id}'
+        if key in used_keys:
+            continue
+        used_keys.add(key)
+        Conversation.objects.filter(pk=conversation_id).update(participant_key=key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0005_message_history_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='participant_key',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True, verbose_name='Clé des participants'),
+        ),
+        migrations.RunPython(backfill_participant_keys, migrations.RunPython.noop),
+    ]
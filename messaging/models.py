@@ -1,13 +1,20 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Case, When, Value, Sum, Q
+from django.db.models.functions import Coalesce, Greatest
 from django.conf import settings
 from django.urls import reverse
+from django.utils import timezone
 
 
 class Conversation(models.Model):
     """Conversation entre deux utilisateurs"""
     
+    # Longueur de l'aperçu du dernier message affiché dans la boîte de réception
+    PREVIEW_LENGTH = 120
+    
     participants = models.ManyToManyField(
         settings.AUTH_USER_MODEL,
+        through='ConversationParticipant',
         related_name='conversations',
         verbose_name='Participants'
     )
@@ -22,6 +29,36 @@ class Conversation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Créée le')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Dernière activité')
     
+    # Résumé du dernier message, maintenu à l'envoi (voir record_message)
+    last_message = models.ForeignKey(
+        'Message',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Dernier message'
+    )
+    last_message_at = models.DateTimeField(null=True, blank=True, verbose_name='Dernier message le')
+    last_message_sender = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Auteur du dernier message'
+    )
+    last_message_preview = models.CharField(max_length=255, blank=True, verbose_name='Aperçu du dernier message')
+    
+    # Clé canonique de la paire de participants (voir make_participant_key) ;
+    # vide lorsqu'un participant a quitté la conversation
+    participant_key = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name='Clé des participants'
+    )
+    
     class Meta:
         verbose_name = 'Conversation'
         verbose_name_plural = 'Conversations'
@@ -34,9 +71,195 @@ class Conversation(models.Model):
     def get_absolute_url(self):
         return reverse('messaging:conversation', kwargs={'pk': self.pk})
     
+    @staticmethod
+    def make_participant_key(user_ids, project_id=None):
+        """Clé canonique : ids des participants triés, puis projet éventuel (ex: ``3-8:p12``)"""
+        key = '-'.join(str(user_id) for user_id in sorted(user_ids))
+        if project_id is not None:
+            key += f':p{project_id}'
+        return key
+    
+    @classmethod
+    def get_or_create_between(cls, user, other_user, project=None):
+        """
+        Retourne ``(conversation, created)`` pour la paire d'utilisateurs (et le projet).
+        
+        Une lecture sur l'index unique de ``participant_key`` ; si deux requêtes
+        créent la conversation en même temps, la contrainte d'unicité départage
+        et la perdante relit la conversation de la gagnante.
+        
+        Sans projet, toute conversation de la paire convient, y compris une
+        conversation ouverte à propos d'un projet : la plus récente est reprise.
+        """
+        key = cls.make_participant_key([user.pk, other_user.pk], project.pk if project else None)
+        lookup = Q(participant_key=key)
+        if project is None:
+            # Clés ``<paire>:p<projet>``, lues comme un intervalle de l'index unique
+            lookup |= Q(participant_key__gte=f'{key}:p', participant_key__lt=f'{key}:q')
+        conversation = cls.objects.filter(lookup).order_by('-updated_at').first()
+        if conversation is not None:
+            return conversation, False
+        try:
+            with transaction.atomic():
+                conversation = cls.objects.create(participant_key=key, project=project)
+                conversation.participants.add(user, other_user)
+        except IntegrityError:
+            return cls.objects.get(participant_key=key), False
+        return conversation, True
+    
     def get_other_participant(self, current_user):
         """Retourne l'autre participant de la conversation"""
         return self.participants.exclude(pk=current_user.pk).first()
+    
+    def record_message(self, message):
+        """
+        Met à jour le résumé de la conversation et les lignes des participants
+        après l'envoi de ``message`` : deux requêtes UPDATE, quel que soit le
+        nombre de messages de la conversation.
+        """
+        preview = ' '.join(message.content.split())
+        if len(preview) > self.PREVIEW_LENGTH:
+            preview = preview[:self.PREVIEW_LENGTH - 1].rstrip() + '…'
+        
+        Conversation.objects.filter(pk=self.pk).update(
+            last_message=message,
+            last_message_at=message.created_at,
+            last_message_sender=message.sender_id,
+            last_message_preview=preview,
+            updated_at=message.created_at,
+        )
+        self.last_message = message
+        self.last_message_at = message.created_at
+        self.last_message_sender_id = message.sender_id
+        self.last_message_preview = preview
+        self.updated_at = message.created_at
+        
+        # Un message non lu de plus pour tous les participants sauf l'expéditeur
+        self.memberships.update(
+            last_activity_at=message.created_at,
+            unread_count=F('unread_count') + Case(
+                When(user_id=message.sender_id, then=Value(0)),
+                default=Value(1),
+            ),
+        )
+
+
+class ConversationParticipant(models.Model):
+    """
+    Participation d'un utilisateur à une conversation.
+    
+    Porte le nombre de messages non lus et la date de dernière activité de la
+    conversation, pour que la boîte de réception se lise sur l'index
+    (user, -last_activity_at, -id) sans toucher à la table des messages.
+    """
+    
+    conversation = models.ForeignKey(
+        Conversation,
+        on_delete=models.CASCADE,
+        related_name='memberships',
+        verbose_name='Conversation'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='conversation_memberships',
+        verbose_name='Participant'
+    )
+    unread_count = models.PositiveIntegerField(default=0, verbose_name='Messages non lus')
+    last_activity_at = models.DateTimeField(default=timezone.now, verbose_name='Dernière activité')
+    
+    # Curseur de lecture : tout message jusqu'à celui-ci (inclus) est lu
+    last_read_at = models.DateTimeField(null=True, blank=True, verbose_name='Lu jusqu\'au')
+    last_read_message = models.ForeignKey(
+        'Message',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Dernier message lu'
+    )
+    
+    class Meta:
+        db_table = 'messaging_conversation_participants'
+        verbose_name = 'Participant'
+        verbose_name_plural = 'Participants'
+        unique_together = ['conversation', 'user']
+        indexes = [
+            models.Index(fields=['user', '-last_activity_at', '-id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} dans la conversation {self.conversation_id}"
+    
+    def mark_read(self):
+        """
+        Avance le curseur de lecture jusqu'au dernier message de la conversation.
+        
+        Une seule écriture, quel que soit le nombre de messages non lus.
+        Retourne le nombre de messages qui viennent d'être lus.
+        """
+        read_count = self.unread_count
+        if not read_count:
+            return 0
+        conversation = self.conversation
+        
+        # Un message arrivé entre-temps reste compté comme non lu
+        ConversationParticipant.objects.filter(pk=self.pk).update(
+            last_read_at=conversation.last_message_at,
+            last_read_message=conversation.last_message_id,
+            unread_count=Greatest(F('unread_count') - read_count, 0),
+        )
+        self.last_read_at = conversation.last_message_at
+        self.last_read_message_id = conversation.last_message_id
+        self.unread_count = 0
+        return read_count
+    
+    def count_unread(self):
+        """Recompte les non lus depuis le curseur (plage sur l'index conversation, -created_at)"""
+        messages = Message.objects.filter(conversation_id=self.conversation_id).exclude(sender_id=self.user_id)
+        if self.last_read_at is not None:
+            messages = messages.filter(created_at__gt=self.last_read_at)
+        return messages.count()
+    
+    def has_read(self, message):
+        """Accusé de lecture : vrai si le curseur a atteint ``message``"""
+        return self.last_read_message_id is not None and message.pk <= self.last_read_message_id
+    
+    @classmethod
+    def unread_total(cls, user):
+        """Total des messages non lus de ``user``, toutes conversations confondues"""
+        return cls.objects.filter(user=user).aggregate(
+            total=Coalesce(Sum('unread_count'), 0)
+        )['total']
+    
+    @classmethod
+    def unread_totals(cls, user_ids):
+        """{user_id: messages non lus} pour plusieurs utilisateurs, en une requête"""
+        totals = dict.fromkeys(user_ids, 0)
+        rows = cls.objects.filter(user_id__in=totals).values('user_id').annotate(unread=Sum('unread_count'))
+        for row in rows:
+            totals[row['user_id']] = row['unread']
+        return totals
+    
+    @classmethod
+    def reconcile(cls, batch_size=500):
+        """Recalcule les non lus de chaque participation ; retourne le nombre de lignes corrigées"""
+        fixed = 0
+        last_pk = 0
+        while True:
+            batch = list(cls.objects.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+            if not batch:
+                return fixed
+            last_pk = batch[-1].pk
+            drifted = []
+            for membership in batch:
+                exact = membership.count_unread()
+                if membership.unread_count != exact:
+                    membership.unread_count = exact
+                    drifted.append(membership)
+            if drifted:
+                cls.objects.bulk_update(drifted, ['unread_count'])
+                fixed += len(drifted)
 
 
 class Message(models.Model):
@@ -55,26 +278,15 @@ class Message(models.Model):
         verbose_name='Expéditeur'
     )
     content = models.TextField(verbose_name='Contenu')
-    is_read = models.BooleanField(default=False, verbose_name='Lu')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Envoyé le')
-    read_at = models.DateTimeField(null=True, blank=True, verbose_name='Lu le')
     
     class Meta:
         verbose_name = 'Message'
         verbose_name_plural = 'Messages'
         ordering = ['created_at']
         indexes = [
-            models.Index(fields=['conversation', '-created_at']),
+            models.Index(fields=['conversation', '-created_at', '-id']),
         ]
     
     def __str__(self):
         return f"{self.sender.username}: {self.content[:50]}"
-    
-    def mark_as_read(self):
-        """Marquer le message comme lu"""
-        if not self.is_read:
-            from django.utils import timezone
-            self.is_read = True
-            self.read_at = timezone.now()
-            self.save()
-
@@ -0,0 +1,21 @@
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import ConversationParticipant, Message
+
+
+@receiver(post_save, sender=Message)
+def update_conversation_summary(sender, instance, created, **kwargs):
+    """Maintient le résumé de la conversation et les non lus par participant à l'envoi"""
+    if created:
+        instance.conversation.record_message(instance)
+
+
+@receiver(post_delete, sender=Message)
+def forget_unread_message(sender, instance, **kwargs):
+    """Message supprimé : il ne compte plus pour les participants qui ne l'avaient pas lu"""
+    ConversationParticipant.objects.filter(
+        Q(last_read_at__isnull=True) | Q(last_read_at__lt=instance.created_at),
+        conversation_id=instance.conversation_id,
+    ).exclude(user_id=instance.sender_id).update(unread_count=Greatest(F('unread_count') - 1, 0))
@@ -1,3 +1,343 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from projects.models import Project
+from users.models import User
+
+from .models import Conversation, ConversationParticipant, Message
+from .views import MESSAGES_PER_PAGE
+
+
+class UnreadMessagesTests(TestCase):
+    """Non lus tenus sur les seules lignes de participation"""
+
+    def setUp(self):
+        self.alice = User.objects.create_user('alice', 'alice@example.com', 'pass')
+        self.bob = User.objects.create_user('bob', 'bob@example.com', 'pass')
+        self.carol = User.objects.create_user('carol', 'carol@example.com', 'pass')
+        self.with_alice, _ = Conversation.get_or_create_between(self.alice, self.bob)
+        self.with_carol, _ = Conversation.get_or_create_between(self.carol, self.bob)
+
+    def send(self, conversation, sender, content='Bonjour'):
+        return Message.objects.create(conversation=conversation, sender=sender, content=content)
+
+    def membership(self, conversation, user):
+        return ConversationParticipant.objects.get(conversation=conversation, user=user)
+
+    def test_total_sums_conversations(self):
+        self.send(self.with_alice, self.alice)
+        self.send(self.with_alice, self.alice)
+        self.send(self.with_carol, self.carol)
+        self.send(self.with_carol, self.bob)
+
+        self.assertEqual(ConversationParticipant.unread_total(self.bob), 3)
+        self.assertEqual(ConversationParticipant.unread_total(self.alice), 0)
+        self.assertEqual(
+            ConversationParticipant.unread_totals([self.alice.pk, self.bob.pk, self.carol.pk]),
+            {self.alice.pk: 0, self.bob.pk: 3, self.carol.pk: 1},
+        )
+
+    def test_reading_a_conversation_updates_the_total(self):
+        self.send(self.with_alice, self.alice)
+        self.send(self.with_carol, self.carol)
+        self.client.force_login(self.bob)
+
+        self.client.get(reverse('messaging:conversation', kwargs={'pk': self.with_alice.pk}), HTTP_HOST='localhost')
+        self.assertEqual(ConversationParticipant.unread_total(self.bob), 1)
+
+        response = self.client.get(reverse('messaging:inbox'), HTTP_HOST='localhost')
+        self.assertEqual(response.context['total_unread'], 1)
+
+    def test_deleting_a_message_forgets_it_only_where_unread(self):
+        read = self.send(self.with_alice, self.alice)
+        self.membership(self.with_alice, self.bob).mark_read()
+        unread = self.send(self.with_alice, self.alice)
+        self.send(self.with_alice, self.alice)
+
+        unread.delete()
+        self.assertEqual(self.membership(self.with_alice, self.bob).unread_count, 1)
+        read.delete()
+        self.assertEqual(self.membership(self.with_alice, self.bob).unread_count, 1)
+        self.assertEqual(self.membership(self.with_alice, self.alice).unread_count, 0)
+
+    def test_reconcile_fixes_drift(self):
+        self.send(self.with_alice, self.alice)
+        ConversationParticipant.objects.filter(user=self.bob).update(unread_count=7)
+
+        call_command('reconcile_unread_counters', stdout=StringIO())
+        self.assertEqual(ConversationParticipant.unread_total(self.bob), 1)
+
+
+class ConversationLookupTests(TestCase):
+    """Conversation d'une paire retrouvée par ``participant_key``"""
+
+    def setUp(self):
+        self.alice = User.objects.create_user('alice', 'alice@example.com', 'pass')
+        self.bob = User.objects.create_user('bob', 'bob@example.com', 'pass', user_type='porteur')
+        self.project = Project.objects.create(
+            owner=self.bob, title='Ferme solaire', summary='Résumé', description='Description',
+            sector='energy', funding_stage='seed', location='Kinshasa',
+            funding_goal=Decimal('10000'), min_investment=Decimal('100'), status='approved',
+        )
+
+    def between(self, user, other_user):
+        """Requête d'origine : toute conversation dont les deux sont participants"""
+        return Conversation.objects.filter(participants=user).filter(participants=other_user).first()
+
+    def test_conversation_without_project_reuses_the_project_conversation(self):
+        about_project, created = Conversation.get_or_create_between(self.alice, self.bob, project=self.project)
+        self.assertTrue(created)
+
+        conversation, created = Conversation.get_or_create_between(self.bob, self.alice)
+        self.assertFalse(created)
+        self.assertEqual(conversation, about_project)
+        self.assertEqual(conversation, self.between(self.alice, self.bob))
+
+        self.client.force_login(self.alice)
+        response = self.client.get(
+            reverse('messaging:start_conversation', kwargs={'username': 'bob'}), HTTP_HOST='localhost'
+        )
+        self.assertRedirects(response, about_project.get_absolute_url(), fetch_redirect_response=False)
+        self.assertEqual(Conversation.objects.count(), 1)
+
+    def test_project_conversation_is_distinct_from_the_plain_one(self):
+        plain, _ = Conversation.get_or_create_between(self.alice, self.bob)
+        about_project, created = Conversation.get_or_create_between(self.alice, self.bob, project=self.project)
+        self.assertTrue(created)
+        self.assertNotEqual(about_project, plain)
+        self.assertEqual(about_project.project, self.project)
+        self.assertEqual(Conversation.get_or_create_between(self.alice, self.bob, project=self.project), (about_project, False))
+
+    def test_lookup_matches_the_pair_query(self):
+        carol = User.objects.create_user('carol', 'carol@example.com', 'pass')
+        pairs = [(self.alice, self.bob), (carol, self.alice), (self.bob, carol)]
+        created = [Conversation.get_or_create_between(user, other)[0] for user, other in pairs]
+        self.assertEqual(
+            created[0].participant_key, Conversation.make_participant_key([self.alice.pk, self.bob.pk])
+        )
+        for (user, other), conversation in zip(pairs, created):
+            self.assertEqual(Conversation.get_or_create_between(other, user), (conversation, False))
+            self.assertEqual(conversation, self.between(user, other))
+        self.assertEqual(Conversation.objects.count(), 3)
+
+    def test_concurrent_creation_returns_the_existing_conversation(self):
+        existing, _ = Conversation.get_or_create_between(self.alice, self.bob)
+        # La lecture ne voit pas encore la conversation créée par l'autre requête
+        with mock.patch('django.db.models.query.QuerySet.first', return_value=None):
+            conversation, created = Conversation.get_or_create_between(self.bob, self.alice)
+        self.assertEqual((conversation, created), (existing, False))
+        self.assertEqual(Conversation.objects.count(), 1)
+
+    def test_leaving_lets_the_pair_start_again(self):
+        first, _ = Conversation.get_or_create_between(self.alice, self.bob)
+        self.client.force_login(self.alice)
+        self.client.post(
+            reverse('messaging:delete_conversation', kwargs={'pk': first.pk}), HTTP_HOST='localhost'
+        )
+        first.refresh_from_db()
+        self.assertIsNone(first.participant_key)
+        self.assertIsNone(self.between(self.alice, self.bob))
+
+        second, created = Conversation.get_or_create_between(self.alice, self.bob)
+        self.assertTrue(created)
+        self.assertNotEqual(second, first)
+        self.assertEqual(second, self.between(self.alice, self.bob))
+
+
+class ConversationHistoryTests(TestCase):
+    """Historique JSON par curseur, identique à la liste complète des messages"""
+
+    def setUp(self):
+        self.alice = User.objects.create_user('alice', 'alice@example.com', 'pass')
+        self.bob = User.objects.create_user('bob', 'bob@example.com', 'pass')
+        self.conversation, _ = Conversation.get_or_create_between(self.alice, self.bob)
+        self.url = reverse('messaging:conversation_messages', kwargs={'pk': self.conversation.pk})
+        start = timezone.now() - timedelta(hours=2)
+        for index in range(70):
+            message = self.send(self.alice if index % 2 else self.bob, f'Message {index}')
+            # Horodatages en partie identiques : l'ordre est départagé par l'id
+            Message.objects.filter(pk=message.pk).update(created_at=start + timedelta(minutes=index // 3))
+        self.client.force_login(self.bob)
+
+    def send(self, sender, content):
+        return Message.objects.create(conversation=self.conversation, sender=sender, content=content)
+
+    def fetch(self, **params):
+        response = self.client.get(self.url, params, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def expected(self):
+        return list(
+            Message.objects.filter(conversation=self.conversation).order_by('created_at', 'id')
+            .values_list('pk', flat=True)
+        )
+
+    def test_older_pages_cover_the_history_once(self):
+        page = self.fetch()
+        first_after = page['after']
+        ids = [message['id'] for message in page['messages']]
+        while page['before']:
+            page = self.fetch(before=page['before'])
+            self.assertLessEqual(len(page['messages']), MESSAGES_PER_PAGE)
+            ids = [message['id'] for message in page['messages']] + ids
+        self.assertEqual(ids, self.expected())
+        self.assertEqual(self.fetch(after=first_after)['messages'], [])
+
+    def test_newer_messages_mark_the_conversation_read(self):
+        after = self.fetch()['after']
+        new = [self.send(self.alice, f'Nouveau {index}').pk for index in range(MESSAGES_PER_PAGE + 5)]
+        self.assertEqual(ConversationParticipant.unread_total(self.bob), 35 + len(new))
+
+        page = self.fetch(after=after)
+        self.assertTrue(page['has_newer'])
+        self.assertNotIn('unread_messages', page)
+        received = [message['id'] for message in page['messages']]
+        while page['has_newer']:
+            page = self.fetch(after=page['after'])
+            received += [message['id'] for message in page['messages']]
+        self.assertEqual(received, new)
+        self.assertEqual(page['unread_messages'], 0)
+        self.assertEqual(ConversationParticipant.unread_total(self.bob), 0)
+
+        self.client.force_login(self.alice)
+        sent = {message['id']: message['is_read'] for message in self.fetch()['messages'] if message['is_mine']}
+        self.assertTrue(all(sent.values()))
+
+    def test_other_users_get_a_404(self):
+        self.client.force_login(User.objects.create_user('carol', 'carol@example.com', 'pass'))
+        response = self.client.get(self.url, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 404)
+
+
+class SummaryBackfillTests(TransactionTestCase):
+    """Migration 0003 : résumés des conversations et non lus repris des messages existants"""
+
+    before = [('messaging', '0002_initial')]
+    after = [('messaging', '0003_conversation_summary_and_memberships')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def setUp(self):
+        self.addCleanup(self.migrate, MigrationExecutor(connection).loader.graph.leaf_nodes())
+        self.alice = User.objects.create_user('alice', 'alice@example.com', 'pass')
+        self.bob = User.objects.create_user('bob', 'bob@example.com', 'pass')
+        self.carol = User.objects.create_user('carol', 'carol@example.com', 'pass')
+
+        old_apps = self.migrate(self.before)
+        Conversation = old_apps.get_model('messaging', 'Conversation')
+        Message = old_apps.get_model('messaging', 'Message')
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.set([self.alice.pk, self.bob.pk])
+        self.empty = Conversation.objects.create()
+        self.empty.participants.set([self.bob.pk, self.carol.pk])
+
+        start = timezone.now() - timedelta(hours=1)
+        self.messages = []
+        for minutes, sender, content, is_read in [
+            (0, self.alice, 'Bonjour', True),
+            (1, self.alice, 'Vous   êtes\nlà ?', False),
+            (2, self.bob, 'Oui, ' + 'x' * 200, False),
+        ]:
+            message = Message.objects.create(
+                conversation=self.conversation, sender_id=sender.pk, content=content, is_read=is_read,
+            )
+            Message.objects.filter(pk=message.pk).update(created_at=start + timedelta(minutes=minutes))
+            self.messages.append(message.pk)
+
+    def test_backfill_summaries_and_unread_counts(self):
+        new_apps = self.migrate(self.after)
+        Conversation = new_apps.get_model('messaging', 'Conversation')
+        ConversationParticipant = new_apps.get_model('messaging', 'ConversationParticipant')
+
+        conversation = Conversation.objects.get(pk=self.conversation.pk)
+        self.assertEqual(conversation.last_message_id, self.messages[-1])
+        self.assertEqual(conversation.last_message_sender_id, self.bob.pk)
+        self.assertEqual(len(conversation.last_message_preview), 120)
+        self.assertTrue(conversation.last_message_preview.startswith('Oui, x'))
+
+        unread = dict(
+            ConversationParticipant.objects.filter(conversation=conversation).values_list('user_id', 'unread_count')
+        )
+        self.assertEqual(unread, {self.alice.pk: 1, self.bob.pk: 1})
+        memberships = ConversationParticipant.objects.filter(conversation=conversation)
+        self.assertEqual({m.last_activity_at for m in memberships}, {conversation.last_message_at})
+
+        empty = Conversation.objects.get(pk=self.empty.pk)
+        self.assertIsNone(empty.last_message_id)
+        self.assertEqual(
+            set(ConversationParticipant.objects.filter(conversation=empty).values_list('last_activity_at', flat=True)),
+            {empty.created_at},
+        )
+
+    def test_totals_after_all_migrations(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+        self.assertEqual(ConversationParticipant.unread_total(self.bob), 1)
+        self.assertEqual(ConversationParticipant.unread_total(self.alice), 1)
+        bob = ConversationParticipant.objects.get(conversation_id=self.conversation.pk, user=self.bob)
+        self.assertEqual(bob.last_read_message_id, self.messages[0])
+
+
+class ParticipantKeyBackfillTests(TransactionTestCase):
+    """Migration 0006 : clé de paire calculée pour les conversations existantes"""
+
+    before = [('messaging', '0005_message_history_index')]
+    after = [('messaging', '0006_participant_key')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def setUp(self):
+        self.addCleanup(self.migrate, MigrationExecutor(connection).loader.graph.leaf_nodes())
+        self.alice = User.objects.create_user('alice', 'alice@example.com', 'pass')
+        self.bob = User.objects.create_user('bob', 'bob@example.com', 'pass', user_type='porteur')
+        self.carol = User.objects.create_user('carol', 'carol@example.com', 'pass')
+        self.project = Project.objects.create(
+            owner=self.bob, title='Ferme solaire', summary='Résumé', description='Description',
+            sector='energy', funding_stage='seed', location='Kinshasa',
+            funding_goal=Decimal('10000'), min_investment=Decimal('100'), status='approved',
+        )
+
+        old_apps = self.migrate(self.before)
+        Conversation = old_apps.get_model('messaging', 'Conversation')
+        start = timezone.now() - timedelta(days=1)
+
+        def conversation(users, minutes, project=None):
+            created = Conversation.objects.create(project_id=project.pk if project else None)
+            created.participants.set([user.pk for user in users])
+            Conversation.objects.filter(pk=created.pk).update(updated_at=start + timedelta(minutes=minutes))
+            return created.pk
+
+        self.older = conversation([self.alice, self.bob], 0)
+        self.recent = conversation([self.bob, self.alice], 5)
+        self.about_project = conversation([self.alice, self.bob], 1, project=self.project)
+        self.group = conversation([self.alice, self.bob, self.carol], 2)
+
+    def test_most_recent_duplicate_gets_the_key(self):
+        self.migrate(self.after)
+        keys = dict(Conversation.objects.values_list('pk', 'participant_key'))
+        pair = Conversation.make_participant_key([self.alice.pk, self.bob.pk])
+        self.assertEqual(keys, {
+            self.older: None,
+            self.recent: pair,
+            self.about_project: Conversation.make_participant_key([self.alice.pk, self.bob.pk], self.project.pk),
+            self.group: None,
+        })
+
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+        conversation, created = Conversation.get_or_create_between(self.alice, self.bob)
+        self.assertEqual((conversation.pk, created), (self.recent, False))
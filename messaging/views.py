@@ -1,44 +1,115 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages as django_messages
-from django.db.models import Q, Count, Max, Prefetch
+from django.db.models import Prefetch
 from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.template.defaultfilters import date as date_filter
 from django.utils import timezone
-from .models import Conversation, Message
+from .models import Conversation, ConversationParticipant, Message
 from notifications.models import Notification
+from users.dashboard import invalidate_dashboard_summary
+from core.pagination import encode_cursor, paginate_keyset
 
 User = get_user_model()
 
+# Nombre de conversations par page de la boîte de réception
+CONVERSATIONS_PER_PAGE = 20
+
+# Nombre de messages par page de l'historique d'une conversation
+MESSAGES_PER_PAGE = 30
+MESSAGE_ORDERING = ['-created_at', '-id']
+
+
+def _message_page(conversation_id, before=None, after=None):
+    """
+    Page de l'historique d'une conversation, par curseur sur (created_at, id).
+
+    Sans curseur : les messages les plus récents ; ``before`` : les messages plus
+    anciens que le curseur ; ``after`` : les plus récents que le curseur.
+    Retourne ``(messages, before_cursor, after_cursor, has_newer)`` avec les
+    messages du plus ancien au plus récent ; ``before_cursor`` vaut None quand le
+    début de la conversation est atteint.
+    """
+    # La liste est parcourue du plus récent au plus ancien : « plus ancien » est
+    # la page suivante de paginate_keyset, « plus récent » la page précédente
+    page = paginate_keyset(
+        Message.objects.filter(conversation_id=conversation_id).select_related('sender'),
+        MESSAGE_ORDERING,
+        after=before,
+        before=after,
+        per_page=MESSAGES_PER_PAGE,
+    )
+    messages_list = list(reversed(page.items))
+    if messages_list:
+        newest = messages_list[-1]
+        after = encode_cursor([newest.created_at, newest.pk])
+    return messages_list, page.next_cursor, after, page.has_previous
+
+
+def _mark_conversation_read(user, membership, memberships):
+    """Avance le curseur de lecture de ``membership`` et met à jour les compteurs"""
+    read_count = membership.mark_read()
+    if read_count:
+        invalidate_dashboard_summary(*[m.user_id for m in memberships])
+        # La notification regroupée de la conversation est lue avec elle
+        notification = Notification.objects.filter(
+            recipient=user, conversation_id=membership.conversation_id, is_read=False
+        ).first()
+        if notification is not None:
+            notification.mark_as_read()
+    return read_count
+
+
+def _serialize_message(message, user, other_last_read_message_id):
+    is_mine = message.sender_id == user.pk
+    return {
+        'id': message.pk,
+        'sender_id': message.sender_id,
+        'sender_name': message.sender.get_full_name(),
+        'content': message.content,
+        'created_at': message.created_at.isoformat(),
+        'created_at_display': date_filter(timezone.localtime(message.created_at), 'd/m/Y à H:i'),
+        'is_mine': is_mine,
+        'is_read': bool(
+            is_mine and other_last_read_message_id and message.pk <= other_last_read_message_id
+        ),
+    }
+
 
 @login_required
 def inbox(request):
-    """Boîte de réception avec statistiques"""
-    # Récupérer toutes les conversations de l'utilisateur avec le dernier message
-    conversations = request.user.conversations.annotate(
-        unread_count=Count(
-            'messages',
-            filter=Q(messages__is_read=False) & ~Q(messages__sender=request.user)
-        ),
-        last_message_time=Max('messages__created_at')
-    ).select_related().prefetch_related(
-        'participants',
-        Prefetch(
-            'messages',
-            queryset=Message.objects.select_related('sender').order_by('-created_at')[:1],
-            to_attr='latest_message'
-        )
-    ).order_by('-last_message_time')
+    """Boîte de réception paginée par curseur (sans lecture de la table des messages)"""
+    memberships = ConversationParticipant.objects.filter(
+        user=request.user
+    ).select_related('conversation', 'conversation__project')
+    page = paginate_keyset(
+        memberships,
+        ['-last_activity_at', '-id'],
+        after=request.GET.get('after'),
+        per_page=CONVERSATIONS_PER_PAGE,
+    )
     
-    # Ajouter l'autre participant à chaque conversation
-    for conversation in conversations:
-        conversation.other_user = conversation.get_other_participant(request.user)
-    
-    # Statistiques
-    total_unread = sum(conv.unread_count for conv in conversations)
+    # Autre participant de chaque conversation de la page : une seule requête
+    conversation_ids = [membership.conversation_id for membership in page]
+    other_users = {
+        membership.conversation_id: membership.user
+        for membership in ConversationParticipant.objects.filter(
+            conversation_id__in=conversation_ids
+        ).exclude(user=request.user).select_related('user')
+    }
+    conversations = []
+    for membership in page:
+        conversation = membership.conversation
+        conversation.other_user = other_users.get(conversation.pk)
+        conversation.unread_count = membership.unread_count
+        conversations.append(conversation)
     
     context = {
         'conversations': conversations,
-        'total_unread': total_unread,
+        'page': page,
+        'is_first_page': not request.GET.get('after'),
+        'total_unread': ConversationParticipant.unread_total(request.user),
     }
     return render(request, 'messaging/inbox.html', context)
 
@@ -48,7 +119,9 @@ def conversation_detail(request, pk):
     """Détail d'une conversation avec envoi de message"""
     # Vérifier que la conversation existe
     try:
-        conversation = Conversation.objects.prefetch_related('participants').get(
+        conversation = Conversation.objects.prefetch_related(
+            Prefetch('memberships', queryset=ConversationParticipant.objects.select_related('user'))
+        ).get(
             pk=pk,
             participants=request.user
         )
@@ -56,16 +129,12 @@ def conversation_detail(request, pk):
         django_messages.error(request, "Cette conversation n'existe pas ou vous n'y avez pas accès.")
         return redirect('messaging:inbox')
     
-    # Marquer les messages non lus comme lus
-    unread_messages = conversation.messages.filter(
-        is_read=False
-    ).exclude(sender=request.user)
+    memberships = list(conversation.memberships.all())
+    membership = next(m for m in memberships if m.user_id == request.user.pk)
+    other_membership = next((m for m in memberships if m.user_id != request.user.pk), None)
     
-    for msg in unread_messages:
-        msg.mark_as_read()
-    
-    # Récupérer les messages
-    messages_list = conversation.messages.select_related('sender').order_by('created_at')
+    # Marquer la conversation comme lue : le curseur avance en une seule écriture
+    _mark_conversation_read(request.user, membership, memberships)
     
     # Traiter l'envoi d'un nouveau message
     if request.method == 'POST':
@@ -78,30 +147,62 @@ def conversation_detail(request, pk):
                 content=content
             )
             
-            # Créer une notification pour l'autre participant
-            other_participant = conversation.get_other_participant(request.user)
-            if other_participant:
-                Notification.objects.create(
-                    recipient=other_participant,
-                    notification_type='new_message',
-                    title='Nouveau message',
-                    message=f'{request.user.get_full_name()} vous a envoyé un message',
-                    link=conversation.get_absolute_url()
-                )
+            # Notifier l'autre participant (une seule notification non lue par conversation)
+            if other_membership:
+                Notification.notify_message(message, other_membership.user)
             
             return redirect('messaging:conversation', pk=pk)
     
-    # Récupérer l'autre participant
-    other_participant = conversation.get_other_participant(request.user)
+    # Seule la page la plus récente est rendue ; l'historique se charge au défilement
+    messages_list, before_cursor, after_cursor, _ = _message_page(conversation.pk)
     
     context = {
         'conversation': conversation,
         'conversation_messages': messages_list,
-        'other_participant': other_participant,
+        'before_cursor': before_cursor,
+        'after_cursor': after_cursor,
+        'other_participant': other_membership.user if other_membership else None,
+        # Accusés de lecture : messages jusqu'au curseur de l'autre participant
+        'other_last_read_message_id': other_membership.last_read_message_id if other_membership else None,
     }
     return render(request, 'messaging/conversation.html', context)
 
 
+@login_required
+def conversation_messages(request, pk):
+    """
+    Historique JSON d'une conversation, par pages de MESSAGES_PER_PAGE messages.
+
+    Paramètres GET ``before`` / ``after`` : curseurs renvoyés par un appel précédent.
+    Les messages récupérés avec ``after`` sont affichés en direct : une fois le
+    dernier atteint, la conversation est marquée comme lue.
+    """
+    memberships = list(ConversationParticipant.objects.filter(conversation_id=pk))
+    membership = next((m for m in memberships if m.user_id == request.user.pk), None)
+    if membership is None:
+        return JsonResponse({'error': 'Conversation introuvable'}, status=404)
+    other_membership = next((m for m in memberships if m.user_id != request.user.pk), None)
+    other_last_read_message_id = other_membership.last_read_message_id if other_membership else None
+    
+    after = request.GET.get('after')
+    messages_list, before_cursor, after_cursor, has_newer = _message_page(
+        pk, before=request.GET.get('before'), after=after
+    )
+    data = {
+        'messages': [
+            _serialize_message(message, request.user, other_last_read_message_id)
+            for message in messages_list
+        ],
+        'before': before_cursor,
+        'after': after_cursor,
+        'has_newer': has_newer,
+    }
+    if after and messages_list and not has_newer:
+        _mark_conversation_read(request.user, membership, memberships)
+        data['unread_messages'] = ConversationParticipant.unread_total(request.user)
+    return JsonResponse(data)
+
+
 @login_required
 def start_conversation(request, username):
     """Démarrer une nouvelle conversation avec un utilisateur"""
@@ -112,19 +213,8 @@ def start_conversation(request, username):
         django_messages.error(request, 'Vous ne pouvez pas vous envoyer un message à vous-même.')
         return redirect('messaging:inbox')
     
-    # Vérifier si une conversation existe déjà entre ces deux utilisateurs
-    existing_conversation = Conversation.objects.filter(
-        participants=request.user
-    ).filter(
-        participants=other_user
-    ).first()
-    
-    if existing_conversation:
-        return redirect('messaging:conversation', pk=existing_conversation.pk)
-    
-    # Créer une nouvelle conversation
-    conversation = Conversation.objects.create()
-    conversation.participants.add(request.user, other_user)
+    # Conversation existante entre ces deux utilisateurs, ou nouvelle conversation
+    conversation, _ = Conversation.get_or_create_between(request.user, other_user)
     
     return redirect('messaging:conversation', pk=conversation.pk)
 
@@ -133,6 +223,7 @@ def start_conversation(request, username):
 def start_conversation_about_project(request, project_slug):
     """Démarrer une conversation à propos d'un projet"""
     from projects.models import Project
+    from projects.engagement import record_engagement
     
     project = get_object_or_404(Project, slug=project_slug)
     project_owner = project.owner
@@ -142,20 +233,10 @@ def start_conversation_about_project(request, project_slug):
         django_messages.error(request, 'Vous ne pouvez pas vous contacter vous-même.')
         return redirect('projects:detail', slug=project_slug)
     
-    # Vérifier si une conversation existe déjà pour ce projet entre ces utilisateurs
-    existing_conversation = Conversation.objects.filter(
-        participants=request.user,
-        project=project
-    ).filter(
-        participants=project_owner
-    ).first()
-    
-    if existing_conversation:
-        return redirect('messaging:conversation', pk=existing_conversation.pk)
-    
-    # Créer une nouvelle conversation liée au projet
-    conversation = Conversation.objects.create(project=project)
-    conversation.participants.add(request.user, project_owner)
+    # Conversation existante pour ce projet entre ces utilisateurs, ou nouvelle conversation
+    conversation, created = Conversation.get_or_create_between(request.user, project_owner, project=project)
+    if created:
+        record_engagement(project, conversations_started=1)
     
     return redirect('messaging:conversation', pk=conversation.pk)
 
@@ -166,8 +247,9 @@ def delete_conversation(request, pk):
     conversation = get_object_or_404(Conversation, pk=pk, participants=request.user)
     
     if request.method == 'POST':
-        # Retirer l'utilisateur de la conversation
+        # Retirer l'utilisateur de la conversation ; la paire pourra en démarrer une nouvelle
         conversation.participants.remove(request.user)
+        Conversation.objects.filter(pk=conversation.pk).update(participant_key=None)
         
         # Si plus aucun participant, supprimer la conversation
         if conversation.participants.count() == 0:
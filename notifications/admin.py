@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Notification
+from core.models import UnreadCounter
+from .models import ArchivedNotification, Notification, NotificationBatch
+from .versions import bump_notification_version
 
 
 @admin.register(Notification)
@@ -13,12 +15,46 @@ class NotificationAdmin(admin.ModelAdmin):
     actions = ['mark_as_read', 'mark_as_unread']
     
     def mark_as_read(self, request, queryset):
+        recipient_ids = set(queryset.values_list('recipient_id', flat=True))
         count = queryset.update(is_read=True)
+        UnreadCounter.invalidate(recipient_ids)
+        bump_notification_version(*recipient_ids)
         self.message_user(request, f'{count} notification(s) marquée(s) comme lue(s).')
     mark_as_read.short_description = 'Marquer comme lues'
     
     def mark_as_unread(self, request, queryset):
+        recipient_ids = set(queryset.values_list('recipient_id', flat=True))
         count = queryset.update(is_read=False, read_at=None)
+        UnreadCounter.invalidate(recipient_ids)
+        bump_notification_version(*recipient_ids)
         self.message_user(request, f'{count} notification(s) marquée(s) comme non lue(s).')
     mark_as_unread.short_description = 'Marquer comme non lues'
 
+
+@admin.register(ArchivedNotification)
+class ArchivedNotificationAdmin(admin.ModelAdmin):
+    list_display = ['title', 'recipient', 'notification_type', 'created_at', 'archived_at']
+    list_filter = ['notification_type', 'archived_at']
+    search_fields = ['title', 'recipient__username']
+    raw_id_fields = ['recipient']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(NotificationBatch)
+class NotificationBatchAdmin(admin.ModelAdmin):
+    """Envois groupés en attente (send_notification_batches)"""
+    list_display = ['title', 'notification_type', 'created_at']
+    list_filter = ['notification_type']
+    exclude = ['recipient_ids']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
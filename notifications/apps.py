@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class NotificationsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "notifications"
+
+    def ready(self):
+        from django.core.signals import request_finished, request_started
+        from . import signals  # noqa: F401
+        from .broadcast import send_request_batches, start_request_batches
+        request_started.connect(start_request_batches, dispatch_uid='notifications_start_request_batches')
+        request_finished.connect(send_request_batches, dispatch_uid='notifications_send_request_batches')
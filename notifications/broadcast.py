@@ -0,0 +1,95 @@
+"""
+Envoi groupé différé des notifications (``Notification.bulk_notify``).
+
+Au-delà de NOTIFICATIONS_BULK_SYNC_LIMIT destinataires, ``bulk_notify``
+n'enregistre que des NotificationBatch, un par lot de destinataires, dans la
+transaction de l'appelant. ``send_notification_batches`` transforme ensuite
+chaque lot en notifications et le supprime dans une même transaction : un lot
+n'est ni perdu ni écrit deux fois, même si le processus s'arrête.
+
+Les lots sont traités par la commande ``send_notification_batches`` (worker
+avec ``--loop``, ou planifiée). Sans worker, NOTIFICATIONS_BULK_SEND_INLINE
+(désactivé par défaut) fait traiter par le processus web les seuls lots
+enregistrés par une requête, une fois la réponse transmise (``request_finished``).
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection as db_connection, transaction
+
+from .models import Notification, NotificationBatch
+
+logger = logging.getLogger(__name__)
+
+# Lots enregistrés par la requête en cours, traités après la réponse
+_request_batches = threading.local()
+
+
+def queue_broadcast(recipient_ids, fields, batch_size):
+    """Enregistre les destinataires (``values_list`` des pk) par lots de ``batch_size``"""
+    batches = []
+    chunk = []
+    for recipient_id in recipient_ids.iterator(chunk_size=batch_size):
+        chunk.append(recipient_id)
+        if len(chunk) >= batch_size:
+            batches.append(NotificationBatch(recipient_ids=chunk, **fields))
+            chunk = []
+    if chunk:
+        batches.append(NotificationBatch(recipient_ids=chunk, **fields))
+    NotificationBatch.objects.bulk_create(batches)
+    pks = getattr(_request_batches, 'pks', None)
+    if pks is not None and getattr(settings, 'NOTIFICATIONS_BULK_SEND_INLINE', False):
+        created = [batch.pk for batch in batches]
+        transaction.on_commit(lambda: pks.extend(created))
+
+
+def start_request_batches(sender, **kwargs):
+    """Handler de request_started : ouvre la liste des lots de la requête"""
+    _request_batches.pks = []
+
+
+def send_request_batches(sender, **kwargs):
+    """Handler de request_finished : traite les lots de la requête, après la réponse"""
+    pks, _request_batches.pks = getattr(_request_batches, 'pks', None), None
+    if not pks:
+        return
+    try:
+        send_notification_batches(pks=pks)
+    except Exception:
+        logger.exception('Échec de l\'envoi des lots de notifications de la requête')
+
+
+def send_notification_batches(limit=None, pks=None):
+    """
+    Écrit les notifications des lots en attente (parmi ``pks`` si donné), un lot
+    par transaction ; un worker concurrent saute les lots verrouillés.
+    Retourne ``(lots, notifications)``.
+    """
+    batches = notifications = 0
+    while limit is None or batches < limit:
+        with transaction.atomic():
+            pending = NotificationBatch.objects.order_by('pk')
+            if pks is not None:
+                pending = pending.filter(pk__in=pks)
+            if db_connection.features.has_select_for_update_skip_locked:
+                pending = pending.select_for_update(skip_locked=True)
+            batch = pending.first()
+            if batch is None:
+                break
+            # Comptes supprimés depuis la mise en file
+            recipient_ids = list(
+                get_user_model().objects.filter(pk__in=batch.recipient_ids).values_list('pk', flat=True)
+            )
+            if recipient_ids:
+                Notification._create_batch(recipient_ids, {
+                    'notification_type': batch.notification_type,
+                    'title': batch.title,
+                    'message': batch.message,
+                    'link': batch.link,
+                })
+            batch.delete()
+        batches += 1
+        notifications += len(recipient_ids)
+    return batches, notifications
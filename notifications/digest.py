@@ -0,0 +1,120 @@
+"""
+Résumés des notifications par email.
+
+Chaque utilisateur choisit sa fréquence (``User.digest_frequency``). À chaque
+passage de ``send_notification_digests``, les utilisateurs dont la période est
+écoulée et qui ont des notifications non lues depuis leur dernier résumé
+reçoivent un seul email, mis dans la file d'attente (``core.mail``) :
+un envoi par utilisateur et par période, quel que soit le volume.
+
+Les utilisateurs sont traités par lots (pagination sur la clé primaire) et
+seules les DIGEST_MAX_ITEMS dernières notifications de chacun sont chargées.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q
+from django.db.models.functions import Coalesce
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from core.mail import queue_mail
+from .models import Notification
+
+
+DIGEST_PERIODS = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(days=7),
+}
+
+# Notifications détaillées dans l'email ; les autres sont seulement comptées
+DIGEST_MAX_ITEMS = 10
+
+
+def due_users(now=None):
+    """Utilisateurs dont la période est écoulée et qui ont du nouveau depuis leur dernier résumé"""
+    now = now or timezone.now()
+    period_elapsed = Q()
+    for frequency, period in DIGEST_PERIODS.items():
+        period_elapsed |= Q(digest_frequency=frequency) & (
+            Q(last_digest_at__isnull=True) | Q(last_digest_at__lte=now - period)
+        )
+    has_news = Notification.objects.filter(
+        recipient=OuterRef('pk'),
+        is_read=False,
+        created_at__gt=Coalesce(OuterRef('last_digest_at'), OuterRef('date_joined')),
+    )
+    return get_user_model().objects.filter(period_elapsed, is_active=True).exclude(email='').filter(Exists(has_news))
+
+
+def _pending_notifications(user_ids):
+    """Non lues depuis le dernier résumé de chaque utilisateur"""
+    return Notification.objects.filter(
+        recipient_id__in=user_ids,
+        is_read=False,
+        created_at__gt=Coalesce(F('recipient__last_digest_at'), F('recipient__date_joined')),
+    )
+
+
+def _collect(user_ids):
+    """Retourne ``{user_id: (total, [dernières notifications])}`` en deux requêtes"""
+    pending = _pending_notifications(user_ids)
+    totals = dict(
+        pending.order_by().values('recipient_id').annotate(total=Count('pk')).values_list('recipient_id', 'total')
+    )
+    latest = defaultdict(list)
+    rows = pending.order_by('recipient_id', '-created_at').values(
+        'recipient_id', 'title', 'message', 'link', 'notification_type', 'created_at'
+    )
+    for row in rows.iterator(chunk_size=500):
+        items = latest[row['recipient_id']]
+        if len(items) < DIGEST_MAX_ITEMS:
+            items.append(row)
+    return {user_id: (total, latest[user_id]) for user_id, total in totals.items()}
+
+
+def render_digest(user, total, notifications, now):
+    context = {
+        'title': 'Vos notifications InvestLink',
+        'user': user,
+        'total': total,
+        'notifications': notifications,
+        'remaining': total - len(notifications),
+        'frequency': user.get_digest_frequency_display().lower(),
+        'site_url': getattr(settings, 'SITE_URL', '').rstrip('/'),
+        'year': now.year,
+    }
+    subject = f'InvestLink - {total} notification(s) non lue(s)'
+    text = render_to_string('emails/notification_digest.txt', context)
+    html = render_to_string('emails/notification_digest.html', context)
+    return subject, text, html
+
+
+def send_digests(batch_size=200, now=None, dry_run=False):
+    """Met en file un résumé pour chaque utilisateur concerné ; retourne le nombre de résumés"""
+    now = now or timezone.now()
+    users = due_users(now).order_by('pk')
+    queued = 0
+    last_pk = 0
+    while True:
+        batch = list(users.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return queued
+        last_pk = batch[-1].pk
+        collected = _collect([user.pk for user in batch])
+        if dry_run:
+            queued += len(collected)
+            continue
+
+        with transaction.atomic():
+            for user in batch:
+                if user.pk not in collected:
+                    continue
+                total, notifications = collected[user.pk]
+                subject, text, html = render_digest(user, total, notifications, now)
+                queue_mail(subject, text, settings.DEFAULT_FROM_EMAIL, [user.email], html_message=html)
+                queued += 1
+            get_user_model().objects.filter(pk__in=[user.pk for user in batch]).update(last_digest_at=now)
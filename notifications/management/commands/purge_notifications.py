@@ -0,0 +1,39 @@
+"""
+Commande de gestion Django pour purger les notifications lues au-delà de leur
+durée de conservation (NOTIFICATION_RETENTION_DAYS). À planifier chaque nuit.
+Usage: python manage.py purge_notifications [--archive] [--batch-size 500] [--pause 0.1] [--dry-run]
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from notifications.retention import expired_querysets, purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Supprime ou archive par lots les notifications lues expirées'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--archive',
+            action='store_true',
+            default=getattr(settings, 'NOTIFICATION_RETENTION_ARCHIVE', False),
+            help='Copier les notifications dans les archives avant de les supprimer',
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Notifications traitées par transaction')
+        parser.add_argument('--pause', type=float, default=0, help='Pause (secondes) entre deux lots')
+        parser.add_argument('--dry-run', action='store_true', help='Afficher les volumes sans rien supprimer')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            for label, queryset in expired_querysets():
+                self.stdout.write(f'{label} : {queryset.count()} notification(s) expirée(s)')
+            return
+        
+        purged = purge_expired(
+            batch_size=options['batch_size'],
+            archive=options['archive'],
+            pause=options['pause'],
+        )
+        for label, count in purged.items():
+            self.stdout.write(f'{label} : {count} notification(s)')
+        verb = 'archivée(s)' if options['archive'] else 'supprimée(s)'
+        self.stdout.write(self.style.SUCCESS(f'{sum(purged.values())} notification(s) {verb}.'))
@@ -0,0 +1,33 @@
+"""
+Commande de gestion Django pour écrire les notifications groupées en attente
+(Notification.bulk_notify au-delà de NOTIFICATIONS_BULK_SYNC_LIMIT destinataires).
+Usage: python manage.py send_notification_batches [--loop [--interval 5]]
+
+Sans --loop, vide la file puis s'arrête (cron) ; avec --loop, tourne comme worker.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from notifications.broadcast import send_notification_batches
+
+
+class Command(BaseCommand):
+    help = 'Écrit les notifications des envois groupés en attente'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Continuer indéfiniment (worker)')
+        parser.add_argument('--interval', type=float, default=5, help='Attente (secondes) quand la file est vide')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            batches, notifications = send_notification_batches(limit=1)
+            total += notifications
+            if batches:
+                self.stdout.write(f'{notifications} notification(s) envoyée(s)')
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        
+        self.stdout.write(self.style.SUCCESS(f'{total} notification(s) envoyée(s).'))
@@ -0,0 +1,24 @@
+"""
+Commande de gestion Django pour envoyer les résumés de notifications par email.
+À planifier une fois par jour (les résumés hebdomadaires partent tous les 7 jours).
+Usage: python manage.py send_notification_digests [--batch-size 200] [--dry-run]
+
+Les emails sont mis en file d'attente ; send_queued_mail les expédie.
+"""
+from django.core.management.base import BaseCommand
+from notifications.digest import send_digests
+
+
+class Command(BaseCommand):
+    help = 'Regroupe les notifications non lues de chaque utilisateur en un email de résumé'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Utilisateurs traités par lot')
+        parser.add_argument('--dry-run', action='store_true', help='Compter les résumés sans les envoyer')
+
+    def handle(self, *args, **options):
+        count = send_digests(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        if options['dry_run']:
+            self.stdout.write(f'{count} résumé(s) à envoyer.')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{count} résumé(s) mis en file d\'attente.'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 06:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_alter_notification_notification_type'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('project_submitted', 'Projet soumis'), ('project_approved', 'Projet validé'), ('project_published', 'Nouveau projet publié'), ('project_rejected', 'Projet refusé'), ('project_revision', 'Révision demandée'), ('new_message', 'Nouveau message'), ('project_favorite', 'Projet ajouté aux favoris'), ('investment', 'Investissement déclaré'), ('investment_confirmed', 'Investissement confirmé'), ('investment_rejected', 'Investissement rejeté'), ('profile_update', 'Mise à jour du profil'), ('system', 'Notification système')], max_length=30, verbose_name='Type de notification'),
+        ),
+    ]
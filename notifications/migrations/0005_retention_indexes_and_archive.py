@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-18 06:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_project_published_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(verbose_name="Identifiant d'origine")),
+                ('notification_type', models.CharField(choices=[('project_submitted', 'Projet soumis'), ('project_approved', 'Projet validé'), ('project_published', 'Nouveau projet publié'), ('project_rejected', 'Projet refusé'), ('project_revision', 'Révision demandée'), ('new_message', 'Nouveau message'), ('project_favorite', 'Projet ajouté aux favoris'), ('investment', 'Investissement déclaré'), ('investment_confirmed', 'Investissement confirmé'), ('investment_rejected', 'Investissement rejeté'), ('profile_update', 'Mise à jour du profil'), ('system', 'Notification système')], max_length=30, verbose_name='Type de notification')),
+                ('title', models.CharField(max_length=200, verbose_name='Titre')),
+                ('message', models.TextField(verbose_name='Message')),
+                ('link', models.CharField(blank=True, max_length=500, verbose_name='Lien')),
+                ('created_at', models.DateTimeField(verbose_name='Créée le')),
+                ('read_at', models.DateTimeField(blank=True, null=True, verbose_name='Lue le')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Archivée le')),
+            ],
+            options={
+                'verbose_name': 'Notification archivée',
+                'verbose_name_plural': 'Notifications archivées',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='notificatio_is_read_9edb86_idx',
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['recipient', '-created_at'], name='notif_unread_recipient_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', True)), fields=['created_at'], name='notif_read_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivednotification',
+            name='recipient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_notifications', to=settings.AUTH_USER_MODEL, verbose_name='Destinataire'),
+        ),
+        migrations.AddIndex(
+            model_name='archivednotification',
+            index=models.Index(fields=['recipient', '-created_at'], name='notificatio_recipie_9d7f42_idx'),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.5 on 2026-10-18 06:14
+
+import re
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+CONVERSATION_LINK = re.compile(r'/conversation/(\d+)/')
+
+
+def coalesce_message_notifications(apps, schema_editor):
+    """
+    Rattache les notifications de messages existantes à leur conversation (d'après
+    le lien) et fusionne les non lues d'une même conversation en une seule.
+    """
+    Notification = apps.get_model('notifications', 'Notification')
+    Conversation = apps.get_model('messaging', 'Conversation')
+    UnreadCounter = apps.get_model('core', 'UnreadCounter')
+
+    existing = set(Conversation.objects.values_list('pk', flat=True))
+    unread = defaultdict(list)
+    notifications = Notification.objects.filter(notification_type='new_message').order_by('-created_at', '-id')
+    for notification in notifications.iterator(chunk_size=500):
+        match = CONVERSATION_LINK.search(notification.link)
+        if not match or int(match.group(1)) not in existing:
+            continue
+        conversation_id = int(match.group(1))
+        if notification.is_read:
+            Notification.objects.filter(pk=notification.pk).update(conversation_id=conversation_id)
+        else:
+            unread[(notification.recipient_id, conversation_id)].append(notification.pk)
+
+    merged_recipients = set()
+    for (recipient_id, conversation_id), ids in unread.items():
+        latest_id, duplicate_ids = ids[0], ids[1:]
+        Notification.objects.filter(pk=latest_id).update(conversation_id=conversation_id, count=len(ids))
+        if duplicate_ids:
+            Notification.objects.filter(pk__in=duplicate_ids).delete()
+            merged_recipients.add(recipient_id)
+
+    # Les compteurs de non lus concernés seront recalculés au prochain accès
+    UnreadCounter.objects.filter(user_id__in=merged_recipients).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_unreadcounter'),
+        ('messaging', '0006_participant_key'),
+        ('notifications', '0005_retention_indexes_and_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='actor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Dernier expéditeur'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='conversation',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='messaging.conversation', verbose_name='Conversation'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='count',
+            field=models.PositiveIntegerField(default=1, verbose_name='Nombre de messages'),
+        ),
+        migrations.RunPython(coalesce_message_notifications, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('conversation__isnull', False), ('is_read', False)), fields=('recipient', 'conversation'), name='notif_unread_per_conversation'),
+        ),
+    ]
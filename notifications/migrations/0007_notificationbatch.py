@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-18 06:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0006_coalesced_message_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_type', models.CharField(choices=[('project_submitted', 'Projet soumis'), ('project_approved', 'Projet validé'), ('project_published', 'Nouveau projet publié'), ('project_rejected', 'Projet refusé'), ('project_revision', 'Révision demandée'), ('new_message', 'Nouveau message'), ('project_favorite', 'Projet ajouté aux favoris'), ('investment', 'Investissement déclaré'), ('investment_confirmed', 'Investissement confirmé'), ('investment_rejected', 'Investissement rejeté'), ('profile_update', 'Mise à jour du profil'), ('system', 'Notification système')], max_length=30, verbose_name='Type de notification')),
+                ('title', models.CharField(max_length=200, verbose_name='Titre')),
+                ('message', models.TextField(verbose_name='Message')),
+                ('link', models.CharField(blank=True, max_length=500, verbose_name='Lien')),
+                ('recipient_ids', models.JSONField(verbose_name='Destinataires')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créé le')),
+            ],
+            options={
+                'verbose_name': 'Lot de notifications en attente',
+                'verbose_name_plural': 'Lots de notifications en attente',
+                'ordering': ['pk'],
+            },
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.urls import reverse
 
@@ -9,6 +9,7 @@ class Notification(models.Model):
     NOTIFICATION_TYPES = (
         ('project_submitted', 'Projet soumis'),
         ('project_approved', 'Projet validé'),
+        ('project_published', 'Nouveau projet publié'),
         ('project_rejected', 'Projet refusé'),
         ('project_revision', 'Révision demandée'),
         ('new_message', 'Nouveau message'),
@@ -38,13 +39,53 @@ class Notification(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Créée le')
     read_at = models.DateTimeField(null=True, blank=True, verbose_name='Lue le')
     
+    # Notifications de messages regroupées par conversation (voir notify_message) :
+    # created_at est alors la date du dernier message
+    conversation = models.ForeignKey(
+        'messaging.Conversation',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='notifications',
+        verbose_name='Conversation'
+    )
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Dernier expéditeur'
+    )
+    count = models.PositiveIntegerField(default=1, verbose_name='Nombre de messages')
+    
     class Meta:
         verbose_name = 'Notification'
         verbose_name_plural = 'Notifications'
         ordering = ['-created_at']
+        constraints = [
+            # Au plus une notification non lue par destinataire et conversation
+            models.UniqueConstraint(
+                fields=['recipient', 'conversation'],
+                condition=models.Q(is_read=False, conversation__isnull=False),
+                name='notif_unread_per_conversation',
+            ),
+        ]
         indexes = [
             models.Index(fields=['recipient', '-created_at']),
-            models.Index(fields=['is_read']),
+            # Non lues d'un utilisateur : l'index ne contient que les non lues,
+            # sa taille ne dépend pas de l'historique
+            models.Index(
+                fields=['recipient', '-created_at'],
+                condition=models.Q(is_read=False),
+                name='notif_unread_recipient_idx',
+            ),
+            # Purge des notifications lues anciennes (notifications.retention)
+            models.Index(
+                fields=['created_at'],
+                condition=models.Q(is_read=True),
+                name='notif_read_created_idx',
+            ),
         ]
     
     def __str__(self):
@@ -54,9 +95,12 @@ class Notification(models.Model):
         """Marquer la notification comme lue"""
         if not self.is_read:
             from django.utils import timezone
+            from django.db.models import Q
+            from core.models import UnreadCounter
             self.is_read = True
             self.read_at = timezone.now()
             self.save()
+            UnreadCounter.adjust(Q(user_id=self.recipient_id), notifications=-1)
     
     @classmethod
     def create_notification(cls, recipient, notification_type, title, message, link=''):
@@ -69,4 +113,184 @@ class Notification(models.Model):
             link=link
         )
         return notification
+    
+    @classmethod
+    def notify_message(cls, message, recipient):
+        """
+        Notifie ``recipient`` d'un nouveau message, en regroupant par conversation.
+        
+        Tant que la notification de la conversation n'est pas lue, elle est mise à
+        jour sur place (nombre de messages, dernier expéditeur, date) au lieu d'en
+        créer une nouvelle : pas de nouvelle ligne ni de non lu supplémentaire.
+        """
+        from django.db import IntegrityError
+        
+        sender_name = message.sender.get_full_name()
+        pending = cls.objects.select_for_update().filter(
+            recipient=recipient, conversation_id=message.conversation_id, is_read=False
+        )
+        for attempt in range(2):
+            with transaction.atomic():
+                notification = pending.first()
+                if notification is not None:
+                    notification.count += 1
+                    notification.actor_id = message.sender_id
+                    notification.created_at = message.created_at
+                    notification.title = 'Nouveaux messages'
+                    notification.message = f'{sender_name} vous a envoyé {notification.count} messages'
+                    notification.save(update_fields=['count', 'actor', 'created_at', 'title', 'message'])
+                    return notification
+            try:
+                with transaction.atomic():
+                    return cls.objects.create(
+                        recipient=recipient,
+                        notification_type='new_message',
+                        title='Nouveau message',
+                        message=f'{sender_name} vous a envoyé un message',
+                        link=reverse('messaging:conversation', kwargs={'pk': message.conversation_id}),
+                        conversation_id=message.conversation_id,
+                        actor_id=message.sender_id,
+                    )
+            except IntegrityError:
+                # Créée entre-temps par une requête concurrente : la mettre à jour
+                if attempt:
+                    raise
+    
+    @classmethod
+    def bulk_notify(cls, recipients, notification_type, title, message, link='', batch_size=1000, background=None):
+        """
+        Envoie la même notification à tous les utilisateurs de ``recipients`` (queryset).
+        
+        Les identifiants sont lus par lots avec ``.iterator()`` et les notifications
+        insérées par ``bulk_create`` : la mémoire reste bornée par ``batch_size``.
+        bulk_create n'émettant pas de signal, compteurs de non lus, indicateurs,
+        résumés de tableau de bord, versions de polling et diffusion temps réel
+        sont traités explicitement, par lot.
+        
+        Au-delà de NOTIFICATIONS_BULK_SYNC_LIMIT destinataires (ou si ``background``
+        est vrai), seuls des lots en attente sont enregistrés (voir
+        ``notifications.broadcast``). Retourne le nombre de destinataires.
+        """
+        recipient_ids = recipients.order_by().values_list('pk', flat=True)
+        audience = recipient_ids.count()
+        if not audience:
+            return 0
+        if background is None:
+            background = audience > getattr(settings, 'NOTIFICATIONS_BULK_SYNC_LIMIT', 1000)
+        fields = {
+            'notification_type': notification_type,
+            'title': title,
+            'message': message,
+            'link': link,
+        }
+        
+        if background:
+            from .broadcast import queue_broadcast
+            queue_broadcast(recipient_ids, fields, batch_size)
+        else:
+            cls._notify_in_batches(recipient_ids, fields, batch_size)
+        return audience
+    
+    @classmethod
+    def _notify_in_batches(cls, recipient_ids, fields, batch_size):
+        batch = []
+        for recipient_id in recipient_ids.iterator(chunk_size=batch_size):
+            batch.append(recipient_id)
+            if len(batch) >= batch_size:
+                cls._create_batch(batch, fields)
+                batch = []
+        if batch:
+            cls._create_batch(batch, fields)
+    
+    @classmethod
+    def _create_batch(cls, recipient_ids, fields):
+        """Insère un lot de notifications et répercute les compteurs en quelques requêtes"""
+        from django.db.models import Q
+        from core.kpi import record_kpi
+        from core.models import UnreadCounter
+        from core.push import publish_on_commit
+        from core.signals import notification_events
+        from users.dashboard import invalidate_dashboard_summary
+        from .versions import bump_notification_version
+        
+        with transaction.atomic():
+            notifications = cls.objects.bulk_create(
+                [cls(recipient_id=recipient_id, **fields) for recipient_id in recipient_ids],
+                batch_size=len(recipient_ids),
+            )
+            UnreadCounter.adjust(Q(user_id__in=recipient_ids), notifications=1)
+            publish_on_commit(lambda: notification_events(notifications))
+        count = len(recipient_ids)
+        record_kpi(total_notifications=count, unread_notifications=count)
+        invalidate_dashboard_summary(*recipient_ids)
+        bump_notification_version(*recipient_ids)
+
+
+class NotificationBatch(models.Model):
+    """Lot de notifications identiques en attente d'écriture (voir notifications.broadcast)"""
+    
+    notification_type = models.CharField(
+        max_length=30,
+        choices=Notification.NOTIFICATION_TYPES,
+        verbose_name='Type de notification'
+    )
+    title = models.CharField(max_length=200, verbose_name='Titre')
+    message = models.TextField(verbose_name='Message')
+    link = models.CharField(max_length=500, blank=True, verbose_name='Lien')
+    recipient_ids = models.JSONField(verbose_name='Destinataires')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Créé le')
+    
+    class Meta:
+        verbose_name = 'Lot de notifications en attente'
+        verbose_name_plural = 'Lots de notifications en attente'
+        ordering = ['pk']
+    
+    def __str__(self):
+        return f"{self.title} ({len(self.recipient_ids)} destinataires)"
 
+
+class ArchivedNotification(models.Model):
+    """Notification lue archivée par la rétention (voir notifications.retention)"""
+    
+    original_id = models.BigIntegerField(verbose_name='Identifiant d\'origine')
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='archived_notifications',
+        verbose_name='Destinataire'
+    )
+    notification_type = models.CharField(
+        max_length=30,
+        choices=Notification.NOTIFICATION_TYPES,
+        verbose_name='Type de notification'
+    )
+    title = models.CharField(max_length=200, verbose_name='Titre')
+    message = models.TextField(verbose_name='Message')
+    link = models.CharField(max_length=500, blank=True, verbose_name='Lien')
+    created_at = models.DateTimeField(verbose_name='Créée le')
+    read_at = models.DateTimeField(null=True, blank=True, verbose_name='Lue le')
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name='Archivée le')
+    
+    class Meta:
+        verbose_name = 'Notification archivée'
+        verbose_name_plural = 'Notifications archivées'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', '-created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.title} - {self.recipient_id} (archivée)"
+    
+    @classmethod
+    def from_notification(cls, notification):
+        return cls(
+            original_id=notification.pk,
+            recipient_id=notification.recipient_id,
+            notification_type=notification.notification_type,
+            title=notification.title,
+            message=notification.message,
+            link=notification.link,
+            created_at=notification.created_at,
+            read_at=notification.read_at,
+        )
@@ -0,0 +1,84 @@
+"""
+Rétention des notifications lues.
+
+Chaque type de notification a sa durée de conservation (NOTIFICATION_RETENTION_DAYS,
+clé ``'default'`` pour les types non listés). Au-delà, les notifications lues
+sont supprimées — ou d'abord copiées dans ArchivedNotification — par petits
+lots, chacun dans sa propre transaction : les verrous ne sont jamais tenus
+longtemps et la purge peut tourner pendant que le site est en service.
+
+Les notifications non lues ne sont jamais purgées.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedNotification, Notification
+
+
+DEFAULT_RETENTION_DAYS = 90
+
+
+def retention_windows():
+    """Durée de conservation (jours) par type, ``'default'`` pour les autres ; 0 = conserver"""
+    windows = {'default': DEFAULT_RETENTION_DAYS}
+    windows.update(getattr(settings, 'NOTIFICATION_RETENTION_DAYS', {}))
+    return windows
+
+
+def expired_querysets(now=None):
+    """Retourne ``(libellé, queryset)`` des notifications lues expirées, par fenêtre de rétention"""
+    now = now or timezone.now()
+    windows = retention_windows()
+    default_days = windows.pop('default')
+    read = Notification.objects.filter(is_read=True)
+
+    for notification_type, days in windows.items():
+        if days:
+            yield notification_type, read.filter(
+                notification_type=notification_type,
+                created_at__lt=now - timedelta(days=days),
+            )
+    if default_days:
+        yield 'default', read.exclude(notification_type__in=list(windows)).filter(
+            created_at__lt=now - timedelta(days=default_days),
+        )
+
+
+def purge_batch(queryset, batch_size=500, archive=False):
+    """Supprime (ou archive) au plus ``batch_size`` notifications ; retourne le nombre traité"""
+    with transaction.atomic():
+        batch = list(queryset.order_by('pk')[:batch_size])
+        if not batch:
+            return 0
+        if archive:
+            ArchivedNotification.objects.bulk_create(
+                [ArchivedNotification.from_notification(notification) for notification in batch]
+            )
+        Notification.objects.filter(pk__in=[notification.pk for notification in batch]).delete()
+    return len(batch)
+
+
+def purge_expired(batch_size=500, archive=False, pause=0, now=None):
+    """
+    Purge toutes les notifications lues expirées, lot par lot.
+
+    ``pause`` : secondes d'attente entre deux lots pour laisser passer le trafic.
+    Retourne le nombre de notifications purgées par fenêtre de rétention.
+    """
+    purged = {}
+    for label, queryset in expired_querysets(now):
+        total = 0
+        while True:
+            count = purge_batch(queryset, batch_size=batch_size, archive=archive)
+            total += count
+            if count < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+        if total:
+            purged[label] = total
+    return purged
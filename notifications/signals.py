@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Notification
+from .versions import bump_notification_version
+
+
+@receiver([post_save, post_delete], sender=Notification)
+def bump_version_on_change(sender, instance, **kwargs):
+    """Création, lecture ou suppression : la version du destinataire change"""
+    bump_notification_version(instance.recipient_id)
@@ -1,3 +1,394 @@
-from django.test import TestCase
+import time
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models.query import QuerySet
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import UnreadCounter
+from messaging.models import Conversation, ConversationParticipant, Message
+from users.models import User
+
+from .broadcast import send_notification_batches, send_request_batches, start_request_batches
+from .digest import due_users
+from .models import ArchivedNotification, Notification, NotificationBatch
+from .retention import purge_batch, purge_expired
+
+
+class DigestBackfillTests(TestCase):
+    """Les comptes existant avant les résumés ne reçoivent pas tout leur historique"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('membre', 'membre@example.com', 'pass')
+        self.user.date_joined = timezone.now() - timedelta(days=365)
+        self.user.save(update_fields=['date_joined'])
+        notification = Notification.objects.create(
+            recipient=self.user, notification_type='system', title='Ancienne', message='Ancienne',
+        )
+        Notification.objects.filter(pk=notification.pk).update(created_at=timezone.now() - timedelta(days=200))
+
+    def backfill(self):
+        migration = import_module('users.migrations.0004_backfill_last_digest_at')
+        migration.backfill_last_digest_at(apps, None)
+
+    def test_history_is_not_sent_after_backfill(self):
+        later = timezone.now() + timedelta(days=2)
+        self.assertIn(self.user, due_users(later))
+
+        self.backfill()
+        self.assertNotIn(self.user, due_users(later))
+
+    def test_new_notifications_still_sent(self):
+        self.backfill()
+        Notification.objects.create(
+            recipient=self.user, notification_type='system', title='Nouvelle', message='Nouvelle',
+        )
+        self.assertIn(self.user, due_users(timezone.now() + timedelta(days=2)))
+
+
+class BulkNotifyTests(TestCase):
+    """Notifications envoyées à tous les investisseurs"""
+
+    def setUp(self):
+        self.investors = [
+            User.objects.create_user(f'investisseur{i}', f'inv{i}@example.com', 'pass', user_type='investisseur')
+            for i in range(3)
+        ]
+        User.objects.create_user('porteur', 'porteur@example.com', 'pass', user_type='porteur')
+        for user in self.investors:
+            UnreadCounter.for_user(user)
+
+    def notify(self, **kwargs):
+        return Notification.bulk_notify(
+            User.objects.filter(user_type='investisseur'),
+            notification_type='project_published', title='Nouveau projet publié',
+            message='Le projet "Ferme solaire" est ouvert.', link='/projects/1/', batch_size=2, **kwargs,
+        )
+
+    def test_sync_send_updates_counters_and_pushes(self):
+        with mock.patch('core.push.publish') as publish, self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.notify(background=False), 3)
+
+        self.assertEqual(Notification.objects.filter(notification_type='project_published').count(), 3)
+        self.assertEqual(
+            sorted(UnreadCounter.objects.filter(user__in=self.investors).values_list('notifications', flat=True)),
+            [1, 1, 1],
+        )
+        pushed = {call.args[0]: call.args[1] for call in publish.call_args_list}
+        self.assertEqual(set(pushed), {user.pk for user in self.investors})
+        event = pushed[self.investors[0].pk]
+        self.assertEqual(event['type'], 'notification')
+        self.assertEqual(event['unread']['notifications'], 1)
+
+    @override_settings(NOTIFICATIONS_BULK_SEND_INLINE=False)
+    def test_background_send_waits_for_worker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notify(background=True)
+        self.assertEqual(NotificationBatch.objects.count(), 2)
+        self.assertFalse(Notification.objects.exists())
+
+        # Compte supprimé entre la mise en file et l'envoi
+        self.investors[2].delete()
+        self.assertEqual(send_notification_batches(), (2, 2))
+        self.assertFalse(NotificationBatch.objects.exists())
+        self.assertEqual(Notification.objects.count(), 2)
+
+    @override_settings(NOTIFICATIONS_BULK_SEND_INLINE=True)
+    def test_background_send_inline_after_response(self):
+        start_request_batches(None)
+        self.addCleanup(send_request_batches, None)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notify(background=True)
+        self.assertFalse(Notification.objects.exists())
+
+        send_request_batches(None)
+        self.assertFalse(NotificationBatch.objects.exists())
+        self.assertEqual(Notification.objects.count(), 3)
+
+    def test_background_send_is_not_inline_by_default(self):
+        start_request_batches(None)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notify(background=True)
+        send_request_batches(None)
+        self.assertEqual(NotificationBatch.objects.count(), 2)
+        self.assertFalse(Notification.objects.exists())
+
+
+@override_settings(NOTIFICATION_RETENTION_DAYS={'default': 90, 'new_message': 30, 'investment': 0})
+class RetentionTests(TestCase):
+    """Purge par lots des notifications lues, conforme aux fenêtres de rétention"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('membre', 'membre@example.com', 'pass')
+        self.now = timezone.now()
+        for notification_type in ('new_message', 'system', 'investment'):
+            for age in (10, 45, 120, 400):
+                for is_read in (True, False):
+                    self.notification(notification_type, age, is_read)
+
+    def notification(self, notification_type, age, is_read):
+        notification = Notification.objects.create(
+            recipient=self.user, notification_type=notification_type, title=f'{notification_type} {age}',
+            message='Message', is_read=is_read, read_at=self.now if is_read else None,
+        )
+        Notification.objects.filter(pk=notification.pk).update(created_at=self.now - timedelta(days=age))
+
+    def expected_expired(self):
+        """Sélection sans requête dédiée : chaque notification comparée à sa fenêtre"""
+        windows = {'new_message': 30, 'investment': 0}
+        return {
+            notification.pk for notification in Notification.objects.all()
+            if notification.is_read
+            and windows.get(notification.notification_type, 90)
+            and notification.created_at < self.now - timedelta(days=windows.get(notification.notification_type, 90))
+        }
+
+    def test_purge_removes_exactly_the_expired_read_notifications(self):
+        expired = self.expected_expired()
+        remaining = set(Notification.objects.values_list('pk', flat=True)) - expired
+        with mock.patch('notifications.retention.purge_batch', wraps=purge_batch) as batch:
+            purged = purge_expired(batch_size=2, now=self.now)
+
+        self.assertEqual(purged, {'new_message': 3, 'default': 2})
+        self.assertEqual(set(Notification.objects.values_list('pk', flat=True)), remaining)
+        self.assertFalse(ArchivedNotification.objects.exists())
+        # Lots de 2 : deux pleins puis un partiel pour new_message, un plein puis un vide pour default
+        self.assertEqual(batch.call_count, 4)
+
+    def test_archive_keeps_a_copy_of_each_purged_notification(self):
+        expired = self.expected_expired()
+        titles = dict(Notification.objects.filter(pk__in=expired).values_list('pk', 'title'))
+        purge_expired(archive=True, now=self.now)
+        self.assertEqual(dict(ArchivedNotification.objects.values_list('original_id', 'title')), titles)
+        self.assertFalse(Notification.objects.filter(pk__in=expired).exists())
+
+    def test_dry_run_only_reports(self):
+        count = Notification.objects.count()
+        out = StringIO()
+        call_command('purge_notifications', '--dry-run', stdout=out)
+        self.assertIn('new_message : 3', out.getvalue())
+        self.assertIn('default : 2', out.getvalue())
+        self.assertEqual(Notification.objects.count(), count)
+
+
+class DropdownPollingTests(TestCase):
+    """Polling du dropdown des notifications (ETag et intervalle conseillé)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('membre', 'membre@example.com', 'pass')
+        self.url = reverse('notifications:dropdown_api')
+
+    def poll(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(self.url, HTTP_HOST='localhost', **headers)
+
+    def notify(self, title='Bienvenue'):
+        return Notification.create_notification(self.user, 'system', title, 'Message')
+
+    def assertMatchesQuery(self, response):
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        unread = self.user.notifications.filter(is_read=False)
+        self.assertEqual([n['id'] for n in data['notifications']], [n.pk for n in unread[:5]])
+        self.assertEqual(data['unread_count'], unread.count())
+        self.assertEqual(data['poll_interval'], int(response['X-Poll-Interval']))
+
+    def test_unchanged_poll_gets_a_304_without_reading_notifications(self):
+        for index in range(7):
+            self.notify(f'Notification {index}')
+        self.client.force_login(self.user)
+        response = self.poll()
+        self.assertMatchesQuery(response)
+
+        with CaptureQueriesContext(connection) as queries:
+            not_modified = self.poll(f'W/{response["ETag"]}, "autre"')
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+        self.assertFalse([q for q in queries if 'notifications_notification' in q['sql']])
+
+    def test_every_change_gives_a_new_etag(self):
+        first = self.notify()
+        self.client.force_login(self.user)
+        changes = [
+            lambda: self.notify('Deuxième'),
+            lambda: self.client.get(reverse('notifications:mark_read', kwargs={'pk': first.pk}), HTTP_HOST='localhost'),
+            lambda: self.client.post(reverse('notifications:mark_all_read'), HTTP_HOST='localhost'),
+            lambda: self.client.post(reverse('notifications:delete_all_read'), HTTP_HOST='localhost'),
+            lambda: Notification.bulk_notify(
+                User.objects.filter(pk=self.user.pk), 'system', 'Annonce', 'Message', background=False,
+            ),
+            cache.clear,
+        ]
+        etag = self.poll()['ETag']
+        for change in changes:
+            change()
+            response = self.poll(etag)
+            self.assertMatchesQuery(response)
+            self.assertNotEqual(response['ETag'], etag)
+            etag = response['ETag']
+            self.assertEqual(self.poll(etag).status_code, 304)
+
+    @override_settings(NOTIFICATIONS_POLL_MIN_INTERVAL=10, NOTIFICATIONS_POLL_MAX_INTERVAL=120)
+    def test_poll_interval_grows_while_nothing_changes(self):
+        self.client.force_login(self.user)
+        self.notify()
+        now = time.time()
+        intervals = []
+        for idle in (0, 100, 300, 3600):
+            with mock.patch('notifications.versions.time.time', return_value=now + idle):
+                intervals.append(int(self.poll()['X-Poll-Interval']))
+        self.assertEqual(intervals, [10, 25, 75, 120])
+
+    def test_anonymous_poll_is_sent_to_login(self):
+        response = self.poll('"notif-1-1"')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('users:login'), response['Location'])
+
+    def test_invalidated_session_does_not_get_a_304(self):
+        self.client.force_login(self.user)
+        etag = self.poll()['ETag']
+        self.assertEqual(self.poll(etag).status_code, 304)
+
+        # Mot de passe changé ailleurs : la session n'authentifie plus l'utilisateur
+        self.user.set_password('nouveau')
+        self.user.save()
+        self.assertEqual(self.poll(etag).status_code, 302)
+
+
+class MessageNotificationTests(TestCase):
+    """Une seule notification non lue par conversation, mise à jour à chaque message"""
+
+    def setUp(self):
+        self.alice = User.objects.create_user('alice', 'alice@example.com', 'pass')
+        self.bob = User.objects.create_user('bob', 'bob@example.com', 'pass')
+        self.conversation, _ = Conversation.get_or_create_between(self.alice, self.bob)
+        self.url = reverse('messaging:conversation', kwargs={'pk': self.conversation.pk})
+
+    def post(self, sender, content='Bonjour'):
+        self.client.force_login(sender)
+        self.client.post(self.url, {'content': content}, HTTP_HOST='localhost')
+
+    def unread(self, user):
+        return user.notifications.filter(notification_type='new_message', is_read=False)
+
+    def assertCounterMatches(self, user):
+        counter = UnreadCounter.for_user(user)
+        counter.refresh_from_db()
+        self.assertEqual(counter.notifications, user.notifications.filter(is_read=False).count())
+
+    def test_messages_update_the_unread_notification(self):
+        for content in ('Un', 'Deux', 'Trois'):
+            self.post(self.alice, content)
+
+        notification = self.unread(self.bob).get()
+        latest = Message.objects.filter(conversation=self.conversation).latest('created_at', 'id')
+        self.assertEqual(notification.count, 3)
+        self.assertEqual(notification.count, ConversationParticipant.unread_total(self.bob))
+        self.assertEqual((notification.actor, notification.created_at), (self.alice, latest.created_at))
+        self.assertCounterMatches(self.bob)
+
+    def test_reading_the_conversation_starts_a_new_notification(self):
+        self.post(self.alice)
+        self.client.force_login(self.bob)
+        self.client.get(self.url, HTTP_HOST='localhost')
+        self.assertFalse(self.unread(self.bob).exists())
+        self.assertCounterMatches(self.bob)
+
+        self.post(self.alice)
+        self.assertEqual(self.unread(self.bob).get().count, 1)
+        self.assertEqual(self.bob.notifications.filter(notification_type='new_message').count(), 2)
+        self.assertCounterMatches(self.bob)
+
+    def test_conversations_are_notified_separately(self):
+        carol = User.objects.create_user('carol', 'carol@example.com', 'pass')
+        other, _ = Conversation.get_or_create_between(carol, self.bob)
+        self.post(self.alice)
+        Notification.notify_message(Message.objects.create(conversation=other, sender=carol, content='Salut'), self.bob)
+        self.assertEqual(
+            dict(self.unread(self.bob).values_list('conversation_id', 'count')),
+            {self.conversation.pk: 1, other.pk: 1},
+        )
+        self.assertCounterMatches(self.bob)
+
+    def test_concurrent_first_message_updates_the_created_notification(self):
+        self.post(self.alice)
+        message = Message.objects.create(conversation=self.conversation, sender=self.alice, content='Encore')
+        first = QuerySet.first
+        calls = []
+
+        def missed_once(queryset):
+            # La première lecture ne voit pas la notification créée par l'autre requête
+            calls.append(queryset)
+            return None if len(calls) == 1 else first(queryset)
+
+        with mock.patch.object(QuerySet, 'first', autospec=True, side_effect=missed_once):
+            notification = Notification.notify_message(message, self.bob)
+        self.assertEqual(notification.count, 2)
+        self.assertEqual(self.unread(self.bob).get(), notification)
+
+
+class MessageNotificationBackfillTests(TransactionTestCase):
+    """Migration 0006 : notifications de messages existantes regroupées par conversation"""
+
+    before = [('notifications', '0005_retention_indexes_and_archive')]
+    after = [('notifications', '0006_coalesced_message_notifications')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def setUp(self):
+        self.addCleanup(self.migrate, MigrationExecutor(connection).loader.graph.leaf_nodes())
+        self.alice = User.objects.create_user('alice', 'alice@example.com', 'pass')
+        self.bob = User.objects.create_user('bob', 'bob@example.com', 'pass')
+        self.conversation, _ = Conversation.get_or_create_between(self.alice, self.bob)
+        UnreadCounter.for_user(self.bob)
+
+        old_apps = self.migrate(self.before)
+        Notification = old_apps.get_model('notifications', 'Notification')
+        link = reverse('messaging:conversation', kwargs={'pk': self.conversation.pk})
+        start = timezone.now() - timedelta(hours=1)
+
+        def notification(minutes, is_read=False, link=link):
+            created = Notification.objects.create(
+                recipient_id=self.bob.pk, notification_type='new_message', title='Nouveau message',
+                message='Message', link=link, is_read=is_read,
+            )
+            Notification.objects.filter(pk=created.pk).update(created_at=start + timedelta(minutes=minutes))
+            return created.pk
+
+        self.read = notification(0, is_read=True)
+        self.unread = [notification(minutes) for minutes in (1, 2, 3)]
+        self.unknown = notification(4, link='/messaging/conversation/999999/')
+
+    def test_unread_notifications_are_merged_into_the_latest(self):
+        new_apps = self.migrate(self.after)
+        Notification = new_apps.get_model('notifications', 'Notification')
+        rows = {
+            row[0]: row[1:]
+            for row in Notification.objects.values_list('pk', 'conversation_id', 'count', 'is_read')
+        }
+        self.assertEqual(rows, {
+            self.read: (self.conversation.pk, 1, True),
+            self.unread[-1]: (self.conversation.pk, 3, False),
+            self.unknown: (None, 1, False),
+        })
+        UnreadCounterModel = new_apps.get_model('core', 'UnreadCounter')
+        self.assertFalse(UnreadCounterModel.objects.filter(user_id=self.bob.pk).exists())
+
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+        self.assertEqual(
+            UnreadCounter.for_user(self.bob).notifications,
+            self.bob.notifications.filter(is_read=False).count(),
+        )
@@ -0,0 +1,56 @@
+"""
+Numéro de version des notifications de chaque utilisateur, conservé dans le cache.
+
+Il change à chaque création, lecture ou suppression d'une notification
+(``notifications.signals`` et les mises à jour en masse des vues et de l'admin).
+``notifications_dropdown`` s'en sert comme ETag : tant qu'il n'a pas changé,
+le polling reçoit un 304 sans aucune requête sur les notifications.
+
+Une version perdue (cache vidé) est régénérée à partir de l'horloge : elle ne
+peut pas coïncider avec une version déjà servie, le client recharge simplement
+la liste.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+CACHE_KEY = 'notifications:version:{}'
+
+
+def _new_state():
+    return {'version': time.time_ns() // 1000, 'changed_at': time.time()}
+
+
+def bump_notification_version(*user_ids):
+    """Signale un changement dans les notifications des utilisateurs donnés"""
+    state = _new_state()
+    values = {CACHE_KEY.format(user_id): state for user_id in user_ids if user_id}
+    if values:
+        cache.set_many(values, timeout=None)
+
+
+def get_notification_state(user_id):
+    """Retourne ``{'version', 'changed_at'}`` pour l'utilisateur, en l'initialisant au besoin"""
+    key = CACHE_KEY.format(user_id)
+    state = cache.get(key)
+    if state is None:
+        state = _new_state()
+        cache.add(key, state, timeout=None)
+    return state
+
+
+def notification_etag(user_id, state):
+    return f'"notif-{user_id}-{state["version"]}"'
+
+
+def suggested_poll_interval(state):
+    """
+    Intervalle de polling conseillé (secondes) : court juste après un changement,
+    puis de plus en plus long tant que rien ne bouge.
+    """
+    minimum = getattr(settings, 'NOTIFICATIONS_POLL_MIN_INTERVAL', 15)
+    maximum = getattr(settings, 'NOTIFICATIONS_POLL_MAX_INTERVAL', 300)
+    idle = time.time() - state['changed_at']
+    return int(min(maximum, max(minimum, idle / 4)))
@@ -1,9 +1,16 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponseNotModified
 from django.views.decorators.http import require_http_methods
+from django.db.models import Q
 from .models import Notification
+from .versions import (
+    bump_notification_version, get_notification_state, notification_etag, suggested_poll_interval,
+)
+from users.dashboard import invalidate_dashboard_summary
+from core.kpi import record_kpi
+from core.models import UnreadCounter
 
 
 @login_required
@@ -20,7 +27,7 @@ def notification_list(request):
     
     # Statistiques
     total_count = request.user.notifications.count()
-    unread_count = request.user.notifications.filter(is_read=False).count()
+    unread_count = UnreadCounter.for_user(request.user).notifications
     
     context = {
         'notifications': notifications_query[:50],  # Limiter à 50 notifications
@@ -47,7 +54,12 @@ def mark_as_read(request, pk):
 @require_http_methods(["POST"])
 def mark_all_as_read(request):
     """Marquer toutes les notifications comme lues"""
-    request.user.notifications.filter(is_read=False).update(is_read=True)
+    updated_count = request.user.notifications.filter(is_read=False).update(is_read=True)
+    # update() n'émet pas de signal : répercuter sur les résumés et indicateurs
+    invalidate_dashboard_summary(request.user.pk)
+    record_kpi(unread_notifications=-updated_count)
+    UnreadCounter.adjust(Q(user=request.user), notifications=-updated_count)
+    bump_notification_version(request.user.pk)
     messages.success(request, 'Toutes les notifications ont été marquées comme lues.')
     return redirect('notifications:list')
 
@@ -71,11 +83,31 @@ def delete_all_read(request):
     return redirect('notifications:list')
 
 
+def _polling_headers(response, etag, state):
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    response['X-Poll-Interval'] = suggested_poll_interval(state)
+    return response
+
+
 @login_required
 def notifications_dropdown(request):
-    """API pour le dropdown des notifications (AJAX)"""
+    """
+    API pour le dropdown des notifications (AJAX).
+    
+    Réponse conditionnelle : si l'ETag envoyé en If-None-Match correspond à la
+    version courante (lue dans le cache), 304 sans lire les notifications.
+    L'en-tête X-Poll-Interval et le champ ``poll_interval`` indiquent dans
+    combien de secondes interroger à nouveau.
+    """
+    state = get_notification_state(request.user.pk)
+    etag = notification_etag(request.user.pk, state)
+    client_etags = [tag.strip().removeprefix('W/') for tag in request.headers.get('If-None-Match', '').split(',')]
+    if etag in client_etags:
+        return _polling_headers(HttpResponseNotModified(), etag, state)
+    
     notifications = request.user.notifications.filter(is_read=False)[:5]
-    unread_count = request.user.notifications.filter(is_read=False).count()
+    unread_count = UnreadCounter.for_user(request.user).notifications
     
     notifications_data = [{
         'id': notif.id,
@@ -86,7 +118,9 @@ def notifications_dropdown(request):
         'link': notif.link,
     } for notif in notifications]
     
-    return JsonResponse({
+    response = JsonResponse({
         'notifications': notifications_data,
         'unread_count': unread_count,
+        'poll_interval': suggested_poll_interval(state),
     })
+    return _polling_headers(response, etag, state)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Project, ProjectDocument, ProjectFavorite
+from .models import Project, ProjectDocument, ProjectFavorite, SectorStatistic, ProjectDailyStats
 
 
 class ProjectDocumentInline(admin.TabularInline):
@@ -63,16 +63,19 @@ class ProjectAdmin(admin.ModelAdmin):
     def approve_projects(self, request, queryset):
         from django.utils import timezone
         count = queryset.update(status='approved', published_at=timezone.now())
+        SectorStatistic.rebuild()
         self.message_user(request, f'{count} projet(s) validé(s).')
     approve_projects.short_description = 'Valider les projets sélectionnés'
     
     def reject_projects(self, request, queryset):
         count = queryset.update(status='rejected')
+        SectorStatistic.rebuild()
         self.message_user(request, f'{count} projet(s) refusé(s).')
     reject_projects.short_description = 'Refuser les projets sélectionnés'
     
     def request_revision(self, request, queryset):
         count = queryset.update(status='revision_requested')
+        SectorStatistic.rebuild()
         self.message_user(request, f'{count} projet(s) en révision.')
     request_revision.short_description = 'Demander une révision'
 
@@ -92,3 +95,30 @@ class ProjectFavoriteAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'project__title']
     raw_id_fields = ['user', 'project']
 
+
+
+@admin.register(SectorStatistic)
+class SectorStatisticAdmin(admin.ModelAdmin):
+    list_display = ['sector', 'projects_count', 'funding_goal_total', 'invested_total', 'current_value_total', 'updated_at']
+    readonly_fields = ['sector', 'projects_count', 'funding_goal_total', 'invested_total', 'current_value_total', 'updated_at']
+    actions = ['rebuild_statistics']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def rebuild_statistics(self, request, queryset):
+        SectorStatistic.rebuild()
+        self.message_user(request, 'Statistiques sectorielles recalculées.')
+    rebuild_statistics.short_description = 'Recalculer toutes les statistiques'
+
+
+@admin.register(ProjectDailyStats)
+class ProjectDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ['project', 'day', 'views', 'unique_viewers', 'favorites_added', 'favorites_removed', 'conversations_started', 'investments_declared']
+    list_filter = ['day']
+    search_fields = ['project__title']
+    date_hierarchy = 'day'
+    raw_id_fields = ['project']
+    
+    def has_add_permission(self, request):
+        return False
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ProjectsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "projects"
+
+    def ready(self):
+        from django.core.signals import request_finished
+        from . import signals  # noqa: F401
+        from .engagement import flush_engagement_on_request_finished
+        request_finished.connect(flush_engagement_on_request_finished, dispatch_uid='projects_flush_engagement')
@@ -0,0 +1,66 @@
+"""
+Suivi de l'engagement quotidien des projets (ProjectDailyStats).
+
+Les événements (vues, favoris, conversations, investissements) sont cumulés
+en mémoire par (projet, jour) puis écrits en lot, au même rythme que les
+compteurs de vues (``core.buffers``, ``VIEW_COUNTER_FLUSH_INTERVAL``) : aucun
+chemin de requête n'écrit directement dans la table d'agrégats.
+"""
+import atexit
+
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from core.buffers import WriteBehindBuffer
+
+
+class EngagementBuffer(WriteBehindBuffer):
+    """Tampon des incréments quotidiens en attente, par (projet, jour)"""
+
+    def add(self, project_id, day, **increments):
+        super().add((project_id, day), **increments)
+
+    def _write(self, pending):
+        """Écrit les agrégats : un INSERT groupé des lignes manquantes puis un UPDATE par ligne"""
+        from .models import Project, ProjectDailyStats
+
+        # Projets supprimés depuis l'événement : leurs incréments sont abandonnés,
+        # sans quoi la clé étrangère ferait échouer (et remettre en attente) tout le lot
+        existing = set(
+            Project.objects.filter(pk__in={project_id for project_id, _ in pending}).values_list('pk', flat=True)
+        )
+        pending = {key: increments for key, increments in pending.items() if key[0] in existing}
+
+        ProjectDailyStats.objects.bulk_create(
+            [ProjectDailyStats(project_id=project_id, day=day) for project_id, day in pending],
+            ignore_conflicts=True,
+        )
+        for (project_id, day), increments in pending.items():
+            ProjectDailyStats.objects.filter(project_id=project_id, day=day).update(**{
+                metric: F(metric) + count for metric, count in increments.items() if count
+            })
+
+
+engagement_buffer = EngagementBuffer()
+atexit.register(engagement_buffer.flush)
+
+
+def record_engagement(project, **increments):
+    """Enregistre des événements du jour pour un projet (ex: favorites_added=1)"""
+    project_id = getattr(project, 'pk', project)
+    engagement_buffer.add(project_id, timezone.localdate(), **increments)
+
+
+def record_project_view(project, viewer_key):
+    """Enregistre une vue comptée ; le visiteur n'est compté unique qu'une fois par jour"""
+    day = timezone.localdate()
+    increments = {'views': 1}
+    if cache.add(f'engagement:viewer:{project.pk}:{day.isoformat()}:{viewer_key}', 1, 60 * 60 * 24):
+        increments['unique_viewers'] = 1
+    engagement_buffer.add(project.pk, day, **increments)
+
+
+def flush_engagement_on_request_finished(sender, **kwargs):
+    """Handler de request_finished : vide le tampon après l'envoi de la réponse"""
+    engagement_buffer.maybe_flush()
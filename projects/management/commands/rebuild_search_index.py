@@ -0,0 +1,14 @@
+"""
+Commande de gestion Django pour reconstruire l'index de recherche des projets.
+Usage: python manage.py rebuild_search_index
+"""
+from django.core.management.base import BaseCommand
+from projects import search
+
+
+class Command(BaseCommand):
+    help = 'Reconstruit l\'index plein texte des projets (tsvector PostgreSQL ou FTS5 SQLite)'
+
+    def handle(self, *args, **options):
+        count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'{count} projet(s) indexé(s).'))
@@ -0,0 +1,21 @@
+"""
+Commande de gestion Django pour recalculer les statistiques sectorielles.
+Usage: python manage.py rebuild_sector_stats
+"""
+from django.core.management.base import BaseCommand
+from projects.models import SectorStatistic
+
+
+class Command(BaseCommand):
+    help = 'Recalcule la table des statistiques par secteur depuis les projets et investissements'
+
+    def handle(self, *args, **options):
+        SectorStatistic.rebuild()
+        
+        for stat in SectorStatistic.objects.all():
+            self.stdout.write(
+                f'{stat.get_sector_display()}: {stat.projects_count} projet(s), '
+                f'{stat.funding_goal_total}$ recherchés, {stat.invested_total}$ investis'
+            )
+        
+        self.stdout.write(self.style.SUCCESS('Statistiques sectorielles recalculées avec succès.'))
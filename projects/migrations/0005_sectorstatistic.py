@@ -0,0 +1,65 @@
+# Generated by Django 5.2.5 on 2026-10-18 05:49
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_sector_statistics(apps, schema_editor):
+    """Initialise les statistiques sectorielles depuis les données existantes"""
+    Project = apps.get_model('projects', 'Project')
+    Investment = apps.get_model('projects', 'Investment')
+    SectorStatistic = apps.get_model('projects', 'SectorStatistic')
+    
+    projects_by_sector = {
+        row['sector']: row
+        for row in Project.objects.filter(status='approved').values('sector').annotate(
+            count=Count('id'), funding=Sum('funding_goal')
+        )
+    }
+    investments_by_sector = {
+        row['project__sector']: row
+        for row in Investment.objects.filter(status='confirmed').values('project__sector').annotate(
+            invested=Sum('amount'), current=Sum('current_value')
+        )
+    }
+    
+    sectors = [code for code, _ in SectorStatistic._meta.get_field('sector').choices]
+    SectorStatistic.objects.bulk_create([
+        SectorStatistic(
+            sector=sector,
+            projects_count=projects_by_sector.get(sector, {}).get('count') or 0,
+            funding_goal_total=projects_by_sector.get(sector, {}).get('funding') or Decimal('0'),
+            invested_total=investments_by_sector.get(sector, {}).get('invested') or Decimal('0'),
+            current_value_total=investments_by_sector.get(sector, {}).get('current') or Decimal('0'),
+        )
+        for sector in sectors
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0004_investment_current_value'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SectorStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sector', models.CharField(choices=[('tech', 'Technologies'), ('health', 'Santé'), ('education', 'Éducation'), ('agriculture', 'Agriculture'), ('energy', 'Énergie'), ('finance', 'Finance'), ('real_estate', 'Immobilier'), ('commerce', 'Commerce'), ('industry', 'Industrie'), ('services', 'Services'), ('other', 'Autre')], max_length=50, unique=True, verbose_name='Secteur')),
+                ('projects_count', models.PositiveIntegerField(default=0, verbose_name='Projets validés')),
+                ('funding_goal_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16, verbose_name='Capital recherché ($)')),
+                ('invested_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16, verbose_name='Montant investi confirmé ($)')),
+                ('current_value_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16, verbose_name='Valeur actuelle ($)')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Dernière mise à jour')),
+            ],
+            options={
+                'verbose_name': 'Statistique sectorielle',
+                'verbose_name_plural': 'Statistiques sectorielles',
+                'ordering': ['sector'],
+            },
+        ),
+        migrations.RunPython(populate_sector_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-18 05:50
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_published_at(apps, schema_editor):
+    """Les projets validés sans date de publication prennent leur date de création"""
+    Project = apps.get_model('projects', 'Project')
+    Project.objects.filter(status='approved', published_at__isnull=True).update(published_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0005_sectorstatistic'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['status', '-published_at', '-id'], name='projects_pr_status_655985_idx'),
+        ),
+        migrations.RunPython(backfill_published_at, migrations.RunPython.noop),
+    ]
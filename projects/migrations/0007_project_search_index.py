@@ -0,0 +1,63 @@
+# Generated by Django 5.2.5 on 2026-10-18 06:02
+
+from django.db import migrations
+
+
+def _sector_label_sql(apps):
+    """Expression SQL qui traduit le code secteur en libellé (indexé avec le projet)"""
+    Project = apps.get_model('projects', 'Project')
+    cases = ' '.join(
+        "WHEN '{}' THEN '{}'".format(code, label.replace("'", "''"))
+        for code, label in Project._meta.get_field('sector').choices
+    )
+    return f'CASE sector {cases} ELSE sector END'
+
+
+def create_search_index(apps, schema_editor):
+    """Crée la structure d'index plein texte adaptée au moteur et l'alimente"""
+    vendor = schema_editor.connection.vendor
+    sector_label = _sector_label_sql(apps)
+
+    if vendor == 'postgresql':
+        schema_editor.execute('ALTER TABLE projects_project ADD COLUMN search_vector tsvector')
+        schema_editor.execute(
+            'CREATE INDEX projects_project_search_vector_gin ON projects_project USING GIN (search_vector)'
+        )
+        schema_editor.execute(f"""
+            UPDATE projects_project SET search_vector =
+                setweight(to_tsvector('french', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('french', coalesce(summary, '')), 'B') ||
+                setweight(to_tsvector('french', coalesce(location, '') || ' ' || {sector_label}), 'C') ||
+                setweight(to_tsvector('french', coalesce(description, '')), 'D')
+        """)
+    elif vendor == 'sqlite':
+        schema_editor.execute("""
+            CREATE VIRTUAL TABLE projects_project_fts USING fts5(
+                title, summary, description, location, sector,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """)
+        schema_editor.execute(f"""
+            INSERT INTO projects_project_fts (rowid, title, summary, description, location, sector)
+            SELECT id, title, summary, description, location, {sector_label} FROM projects_project
+        """)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS projects_project_search_vector_gin')
+        schema_editor.execute('ALTER TABLE projects_project DROP COLUMN IF EXISTS search_vector')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS projects_project_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_project_catalogue_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
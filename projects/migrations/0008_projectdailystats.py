@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-18 05:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0007_project_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Jour')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Vues')),
+                ('unique_viewers', models.PositiveIntegerField(default=0, verbose_name='Visiteurs uniques')),
+                ('favorites_added', models.PositiveIntegerField(default=0, verbose_name='Favoris ajoutés')),
+                ('favorites_removed', models.PositiveIntegerField(default=0, verbose_name='Favoris retirés')),
+                ('conversations_started', models.PositiveIntegerField(default=0, verbose_name='Conversations démarrées')),
+                ('investments_declared', models.PositiveIntegerField(default=0, verbose_name='Investissements déclarés')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='projects.project', verbose_name='Projet')),
+            ],
+            options={
+                'verbose_name': 'Statistiques quotidiennes de projet',
+                'verbose_name_plural': 'Statistiques quotidiennes de projets',
+                'ordering': ['project', 'day'],
+                'unique_together': {('project', 'day')},
+            },
+        ),
+    ]
@@ -1,7 +1,11 @@
 from django.db import models
+from django.db.models import F, Sum, Count
+from django.db.models.functions import Greatest
 from django.conf import settings
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.text import slugify
+from collections import Counter, defaultdict
 from decimal import Decimal
 
 
@@ -120,14 +124,27 @@ class Project(models.Model):
             models.Index(fields=['-created_at']),
             models.Index(fields=['status']),
             models.Index(fields=['sector']),
+            models.Index(fields=['status', '-published_at', '-id']),
         ]
     
+    # Champs nécessaires à l'affichage d'une carte du catalogue (projection légère)
+    CARD_FIELDS = (
+        'id', 'slug', 'title', 'summary', 'sector', 'funding_stage', 'location',
+        'funding_goal', 'current_funding', 'min_investment', 'featured_image',
+        'views_count', 'favorites_count', 'status', 'published_at', 'created_at',
+    )
+    
     def __str__(self):
         return self.title
     
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        # Le catalogue est paginé sur published_at : un projet validé doit toujours en avoir un
+        if self.status == 'approved' and not self.published_at:
+            self.published_at = timezone.now()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'published_at'}
         super().save(*args, **kwargs)
     
     def get_absolute_url(self):
@@ -374,3 +391,222 @@ class ProjectPerformance(models.Model):
     
     def __str__(self):
         return f"{self.project.title} - {self.report_date.strftime('%B %Y')}"
+
+
+class SectorStatistic(models.Model):
+    """
+    Statistiques agrégées par secteur, maintenues de façon incrémentale par les
+    signaux de ``projects.signals`` à chaque enregistrement ou suppression d'un
+    projet ou d'un investissement, quel que soit le chemin d'écriture (vues,
+    formulaires de l'admin, shell). Les mises à jour en masse (``update()``)
+    appellent ``rebuild``.
+    """
+    
+    sector = models.CharField(
+        max_length=50,
+        choices=Project.SECTOR_CHOICES,
+        unique=True,
+        verbose_name='Secteur'
+    )
+    projects_count = models.PositiveIntegerField(default=0, verbose_name='Projets validés')
+    funding_goal_total = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name='Capital recherché ($)'
+    )
+    invested_total = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name='Montant investi confirmé ($)'
+    )
+    current_value_total = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name='Valeur actuelle ($)'
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Dernière mise à jour')
+    
+    class Meta:
+        verbose_name = 'Statistique sectorielle'
+        verbose_name_plural = 'Statistiques sectorielles'
+        ordering = ['sector']
+    
+    def __str__(self):
+        return f"{self.get_sector_display()} ({self.projects_count})"
+    
+    @property
+    def roi_percentage(self):
+        """ROI moyen des investissements confirmés du secteur"""
+        if self.invested_total > 0:
+            return ((self.current_value_total - self.invested_total) / self.invested_total) * 100
+        return Decimal('0')
+    
+    @classmethod
+    def apply_delta(cls, sector, projects=0, funding_goal=0, invested=0, current_value=0):
+        """
+        Applique un delta atomique (UPDATE ... SET col = col + n) sur un secteur.
+        
+        Les valeurs sont bornées à 0 : une dérive (mise à jour en masse sans
+        ``rebuild``) ne doit pas faire échouer l'enregistrement en cours.
+        """
+        zero = Decimal('0')
+        updated = cls.objects.filter(sector=sector).update(
+            projects_count=Greatest(F('projects_count') + projects, 0),
+            funding_goal_total=Greatest(F('funding_goal_total') + funding_goal, zero),
+            invested_total=Greatest(F('invested_total') + invested, zero),
+            current_value_total=Greatest(F('current_value_total') + current_value, zero),
+        )
+        if not updated:
+            # Première écriture pour ce secteur : on reconstruit à partir des données réelles
+            cls.rebuild(sectors=[sector])
+    
+    @classmethod
+    def _apply_deltas(cls, deltas):
+        for sector, delta in deltas.items():
+            if any(delta.values()):
+                cls.apply_delta(sector, **delta)
+    
+    @classmethod
+    def record_project_change(cls, previous, project):
+        """
+        Répercute le passage d'un projet de ``previous`` (tel qu'enregistré, None
+        à la création) à ``project`` (None à la suppression) : statut validé,
+        secteur et capital recherché.
+        """
+        deltas = defaultdict(Counter)
+        if previous is not None and previous.status == 'approved':
+            deltas[previous.sector].update(projects=-1, funding_goal=-previous.funding_goal)
+        if project is not None and project.status == 'approved':
+            deltas[project.sector].update(projects=1, funding_goal=project.funding_goal)
+        if previous is not None and project is not None and previous.sector != project.sector:
+            # Les investissements confirmés suivent le projet dans son nouveau secteur
+            moved = Investment.objects.filter(project_id=project.pk, status='confirmed').aggregate(
+                invested=Sum('amount'), current_value=Sum('current_value'),
+            )
+            if moved['invested'] is not None:
+                deltas[previous.sector].update({field: -value for field, value in moved.items()})
+                deltas[project.sector].update(moved)
+        cls._apply_deltas(deltas)
+    
+    @classmethod
+    def record_investment_change(cls, previous, investment):
+        """Répercute le passage d'un investissement de ``previous`` à ``investment`` (voir ci-dessus)"""
+        by_project = defaultdict(Counter)
+        for sign, state in ((-1, previous), (1, investment)):
+            if state is not None and state.status == 'confirmed':
+                by_project[state.project_id].update(
+                    invested=sign * state.amount, current_value=sign * state.current_value,
+                )
+        if not by_project:
+            return
+        sectors = dict(Project.objects.filter(pk__in=by_project).values_list('pk', 'sector'))
+        deltas = defaultdict(Counter)
+        for project_id, delta in by_project.items():
+            # Projet déjà supprimé : ses montants ont été retirés avec lui
+            if project_id in sectors:
+                deltas[sectors[project_id]].update(delta)
+        cls._apply_deltas(deltas)
+    
+    @classmethod
+    def rebuild(cls, sectors=None):
+        """Recalcule les statistiques depuis les tables sources (2 requêtes agrégées)"""
+        if sectors is None:
+            sectors = [code for code, _ in Project.SECTOR_CHOICES]
+        
+        project_rows = Project.objects.filter(
+            status='approved', sector__in=sectors
+        ).values('sector').annotate(count=Count('id'), funding=Sum('funding_goal'))
+        investment_rows = Investment.objects.filter(
+            status='confirmed', project__sector__in=sectors
+        ).values('project__sector').annotate(invested=Sum('amount'), current=Sum('current_value'))
+        
+        projects_by_sector = {row['sector']: row for row in project_rows}
+        investments_by_sector = {row['project__sector']: row for row in investment_rows}
+        
+        for sector in sectors:
+            project_row = projects_by_sector.get(sector, {})
+            investment_row = investments_by_sector.get(sector, {})
+            cls.objects.update_or_create(
+                sector=sector,
+                defaults={
+                    'projects_count': project_row.get('count') or 0,
+                    'funding_goal_total': project_row.get('funding') or Decimal('0'),
+                    'invested_total': investment_row.get('invested') or Decimal('0'),
+                    'current_value_total': investment_row.get('current') or Decimal('0'),
+                }
+            )
+    
+    @classmethod
+    def platform_summary(cls):
+        """
+        Retourne les statistiques par secteur et les totaux de la plateforme
+        en une seule requête.
+        """
+        rows = {stat.sector: stat for stat in cls.objects.all()}
+        
+        sector_stats = []
+        totals = {
+            'total_projects': 0,
+            'total_funding': Decimal('0'),
+            'total_invested': Decimal('0'),
+            'total_current': Decimal('0'),
+        }
+        for sector_code, sector_name in Project.SECTOR_CHOICES:
+            stat = rows.get(sector_code) or cls(sector=sector_code)
+            sector_stats.append({
+                'code': sector_code,
+                'name': sector_name,
+                'count': stat.projects_count,
+                'funding': stat.funding_goal_total,
+                'roi': stat.roi_percentage,
+            })
+            totals['total_projects'] += stat.projects_count
+            totals['total_funding'] += stat.funding_goal_total
+            totals['total_invested'] += stat.invested_total
+            totals['total_current'] += stat.current_value_total
+        
+        # Trier les secteurs par nombre de projets
+        sector_stats.sort(key=lambda x: x['count'], reverse=True)
+        
+        avg_roi = Decimal('0')
+        if totals['total_invested'] > 0:
+            avg_roi = ((totals['total_current'] - totals['total_invested']) / totals['total_invested']) * 100
+        totals['avg_roi'] = avg_roi
+        
+        return sector_stats, totals
+
+
+class ProjectDailyStats(models.Model):
+    """Agrégats quotidiens d'engagement par projet (alimentés par projects.engagement)"""
+    
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name='daily_stats',
+        verbose_name='Projet'
+    )
+    day = models.DateField(verbose_name='Jour')
+    views = models.PositiveIntegerField(default=0, verbose_name='Vues')
+    unique_viewers = models.PositiveIntegerField(default=0, verbose_name='Visiteurs uniques')
+    favorites_added = models.PositiveIntegerField(default=0, verbose_name='Favoris ajoutés')
+    favorites_removed = models.PositiveIntegerField(default=0, verbose_name='Favoris retirés')
+    conversations_started = models.PositiveIntegerField(default=0, verbose_name='Conversations démarrées')
+    investments_declared = models.PositiveIntegerField(default=0, verbose_name='Investissements déclarés')
+    
+    # Compteurs agrégés (utilisés par le tampon d'écriture et la page d'analyse)
+    METRICS = (
+        'views', 'unique_viewers', 'favorites_added', 'favorites_removed',
+        'conversations_started', 'investments_declared',
+    )
+    
+    class Meta:
+        verbose_name = 'Statistiques quotidiennes de projet'
+        verbose_name_plural = 'Statistiques quotidiennes de projets'
+        ordering = ['project', 'day']
+        unique_together = ['project', 'day']
+    
+    def __str__(self):
+        return f"{self.project_id} - {self.day}"
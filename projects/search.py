@@ -0,0 +1,216 @@
+"""
+Recherche plein texte des projets.
+
+- PostgreSQL : colonne ``search_vector`` (tsvector, configuration ``french``)
+  indexée en GIN, classement par ``ts_rank_cd`` et extraits via ``ts_headline``.
+- SQLite : table virtuelle FTS5 ``projects_project_fts`` (rowid = id du projet),
+  classement BM25 et extraits via ``snippet()``.
+- Autres moteurs (ou FTS5 indisponible) : repli sur ``icontains``.
+
+L'index est maintenu par les signaux de ``projects.signals``.
+"""
+import re
+
+from django.db import connections, DatabaseError
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+
+FTS_TABLE = 'projects_project_fts'
+
+# Champs qui alimentent l'index : une sauvegarde limitée à d'autres champs
+# (ex: views_count) ne déclenche pas de réindexation.
+INDEXED_FIELDS = {'title', 'summary', 'description', 'location', 'sector'}
+
+# Nombre maximum de résultats classés renvoyés par une recherche
+SEARCH_RESULTS_LIMIT = 50
+
+# Marqueurs d'extrait (caractères de contrôle, jamais présents dans le texte saisi)
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+
+def _sector_labels():
+    from .models import Project
+    return dict(Project.SECTOR_CHOICES)
+
+
+def _vendor(using='default'):
+    return connections[using].vendor
+
+
+# Alias de connexion dont la table FTS5 a déjà été trouvée
+_fts5_aliases = set()
+
+
+def _fts5_ready(using='default'):
+    """Vérifie que la table FTS5 existe (créée par la migration 0007)"""
+    if using not in _fts5_aliases:
+        if FTS_TABLE not in connections[using].introspection.table_names():
+            return False
+        _fts5_aliases.add(using)
+    return True
+
+
+def _fts5_match_query(query):
+    """Transforme la saisie utilisateur en requête FTS5 sûre (préfixes, ET implicite)"""
+    words = re.findall(r'\w+', query, flags=re.UNICODE)
+    return ' '.join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+
+def render_highlight(snippet):
+    """Échappe un extrait et remplace les marqueurs par des balises <mark>"""
+    if not snippet:
+        return ''
+    html = escape(snippet)
+    return mark_safe(html.replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>'))
+
+
+# ============================================================
+# MAINTENANCE DE L'INDEX
+# ============================================================
+
+def index_project(project, using='default'):
+    """(Ré)indexe un projet"""
+    vendor = _vendor(using)
+    sector_label = _sector_labels().get(project.sector, project.sector)
+
+    with connections[using].cursor() as cursor:
+        if vendor == 'postgresql':
+            cursor.execute(
+                """
+                UPDATE projects_project SET search_vector =
+                    setweight(to_tsvector('french', coalesce(title, '')), 'A') ||
+                    setweight(to_tsvector('french', coalesce(summary, '')), 'B') ||
+                    setweight(to_tsvector('french', coalesce(location, '') || ' ' || %s), 'C') ||
+                    setweight(to_tsvector('french', coalesce(description, '')), 'D')
+                WHERE id = %s
+                """,
+                [sector_label, project.pk],
+            )
+        elif vendor == 'sqlite' and _fts5_ready(using):
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [project.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, summary, description, location, sector) '
+                'VALUES (%s, %s, %s, %s, %s, %s)',
+                [project.pk, project.title, project.summary, project.description,
+                 project.location, sector_label],
+            )
+
+
+def remove_project(project_id, using='default'):
+    """Retire un projet de l'index (PostgreSQL : la ligne disparaît avec le projet)"""
+    if _vendor(using) == 'sqlite' and _fts5_ready(using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [project_id])
+
+
+def rebuild_index(using='default'):
+    """Reconstruit l'index complet à partir de la table des projets"""
+    from .models import Project
+
+    vendor = _vendor(using)
+    if vendor == 'sqlite' and _fts5_ready(using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    elif vendor != 'postgresql':
+        return 0
+
+    count = 0
+    fields = ('id', 'title', 'summary', 'description', 'location', 'sector')
+    for project in Project.objects.using(using).only(*fields).iterator(chunk_size=500):
+        index_project(project, using=using)
+        count += 1
+    return count
+
+
+# ============================================================
+# RECHERCHE
+# ============================================================
+
+def _ranked_ids(queryset, query, limit):
+    """Retourne [(id, extrait)] classés par pertinence, restreints au queryset"""
+    using = queryset.db
+    vendor = _vendor(using)
+    subquery, subquery_params = queryset.order_by().values('pk').query.sql_with_params()
+
+    with connections[using].cursor() as cursor:
+        if vendor == 'postgresql':
+            cursor.execute(
+                f"""
+                SELECT ranked.id, ts_headline(
+                    'french', ranked.summary || ' ' || ranked.description, ranked.q,
+                    'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords=35, MinWords=15, MaxFragments=2'
+                )
+                FROM (
+                    SELECT p.id, p.summary, p.description, q, ts_rank_cd(p.search_vector, q) AS rank
+                    FROM projects_project p, websearch_to_tsquery('french', %s) q
+                    WHERE p.search_vector @@ q AND p.id IN ({subquery})
+                    ORDER BY rank DESC, p.id DESC
+                    LIMIT %s
+                ) ranked
+                ORDER BY ranked.rank DESC, ranked.id DESC
+                """,
+                [query, *subquery_params, limit],
+            )
+        else:
+            match = _fts5_match_query(query)
+            if not match:
+                return []
+            cursor.execute(
+                f"""
+                SELECT rowid, snippet({FTS_TABLE}, -1, char(2), char(3), '…', 16)
+                FROM {FTS_TABLE}
+                WHERE {FTS_TABLE} MATCH %s AND rowid IN ({subquery})
+                ORDER BY bm25({FTS_TABLE}, 10.0, 5.0, 1.0, 2.0, 2.0), rowid DESC
+                LIMIT %s
+                """,
+                [match, *subquery_params, limit],
+            )
+        return cursor.fetchall()
+
+
+def _fallback_search(queryset, query, limit):
+    """Recherche sans index : utilisée hors PostgreSQL/SQLite ou si FTS5 est absent"""
+    labels = [code for code, label in _sector_labels().items() if query.lower() in label.lower()]
+    results = list(queryset.filter(
+        Q(title__icontains=query) |
+        Q(summary__icontains=query) |
+        Q(description__icontains=query) |
+        Q(location__icontains=query) |
+        Q(sector__in=labels)
+    ).order_by('-published_at', '-id')[:limit])
+    for project in results:
+        project.search_highlight = ''
+    return results
+
+
+def search_projects(queryset, query, limit=SEARCH_RESULTS_LIMIT):
+    """
+    Recherche ``query`` parmi les projets de ``queryset`` (filtres déjà appliqués).
+
+    Retourne une liste de projets classés par pertinence, chacun portant un
+    attribut ``search_highlight`` (HTML sûr avec les termes en <mark>).
+    """
+    query = (query or '').strip()
+    if not query:
+        return []
+
+    vendor = _vendor(queryset.db)
+    if vendor not in ('postgresql', 'sqlite') or (vendor == 'sqlite' and not _fts5_ready(queryset.db)):
+        return _fallback_search(queryset, query, limit)
+
+    try:
+        rows = _ranked_ids(queryset, query, limit)
+    except DatabaseError:
+        return _fallback_search(queryset, query, limit)
+
+    projects_by_id = queryset.in_bulk([row[0] for row in rows])
+    results = []
+    for project_id, snippet in rows:
+        project = projects_by_id.get(project_id)
+        if project is not None:
+            project.search_highlight = render_highlight(snippet)
+            results.append(project)
+    return results
@@ -0,0 +1,50 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from core.snapshots import UNCHANGED, stored, track
+from .models import Investment, Project, SectorStatistic
+from . import search
+
+# Champs dont dépend la contribution aux statistiques sectorielles
+PROJECT_STAT_FIELDS = {'status', 'sector', 'funding_goal'}
+INVESTMENT_STAT_FIELDS = {'status', 'amount', 'current_value', 'project'}
+
+track(Project, PROJECT_STAT_FIELDS)
+track(Investment, INVESTMENT_STAT_FIELDS)
+
+
+@receiver(post_save, sender=Project)
+def index_project_on_save(sender, instance, update_fields=None, using='default', **kwargs):
+    """Maintient l'index de recherche à jour après chaque sauvegarde"""
+    if update_fields is not None and not (set(update_fields) & search.INDEXED_FIELDS):
+        return
+    search.index_project(instance, using=using)
+
+
+@receiver(post_delete, sender=Project)
+def remove_project_from_index(sender, instance, using='default', **kwargs):
+    """Retire un projet supprimé de l'index de recherche"""
+    search.remove_project(instance.pk, using=using)
+
+
+@receiver(post_save, sender=Project)
+def update_sector_stats_on_project_save(sender, instance, created, **kwargs):
+    previous = None if created else stored(instance, PROJECT_STAT_FIELDS)
+    if previous is not UNCHANGED:
+        SectorStatistic.record_project_change(previous, instance)
+
+
+@receiver(post_delete, sender=Project)
+def update_sector_stats_on_project_delete(sender, instance, **kwargs):
+    SectorStatistic.record_project_change(instance, None)
+
+
+@receiver(post_save, sender=Investment)
+def update_sector_stats_on_investment_save(sender, instance, created, **kwargs):
+    previous = None if created else stored(instance, INVESTMENT_STAT_FIELDS)
+    if previous is not UNCHANGED:
+        SectorStatistic.record_investment_change(previous, instance)
+
+
+@receiver(post_delete, sender=Investment)
+def update_sector_stats_on_investment_delete(sender, instance, **kwargs):
+    SectorStatistic.record_investment_change(instance, None)
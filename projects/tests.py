@@ -1,3 +1,286 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.contrib.admin.sites import site
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from users.models import User
+
+from .engagement import EngagementBuffer
+from .models import Investment, Project, ProjectDailyStats, ProjectFavorite, SectorStatistic
+from .search import SEARCH_RESULTS_LIMIT, _fallback_search, rebuild_index, search_projects
+from .views import PROJECTS_PER_PAGE
+
+
+@override_settings(VIEW_COUNTER_FLUSH_INTERVAL=60)
+class EngagementBufferTests(TestCase):
+    """Agrégats quotidiens d'engagement écrits en lot"""
+
+    def setUp(self):
+        owner = User.objects.create_user('porteur', 'porteur@example.com', 'pass', user_type='porteur')
+        self.project = Project.objects.create(
+            owner=owner, title='Ferme solaire', summary='Résumé', description='Description',
+            sector='energy', funding_stage='seed', location='Kinshasa',
+            funding_goal=Decimal('10000'), min_investment=Decimal('100'), status='approved',
+        )
+        self.buffer = EngagementBuffer()
+        self.addCleanup(self.buffer.flush)
+
+    def test_increments_are_merged_per_day(self):
+        today = timezone.localdate()
+        self.buffer.add(self.project.pk, today, views=1, unique_viewers=1)
+        self.buffer.add(self.project.pk, today, views=1, favorites_added=1)
+        self.assertEqual(ProjectDailyStats.objects.count(), 0)
+
+        self.buffer.flush()
+        stats = ProjectDailyStats.objects.get(project=self.project, day=today)
+        self.assertEqual((stats.views, stats.unique_viewers, stats.favorites_added), (2, 1, 1))
+
+        self.buffer.add(self.project.pk, today, views=3)
+        self.buffer.flush()
+        stats.refresh_from_db()
+        self.assertEqual(stats.views, 5)
+
+    def test_deleted_project_does_not_block_the_buffer(self):
+        today = timezone.localdate()
+        gone = Project.objects.create(
+            owner=self.project.owner, title='Projet retiré', summary='Résumé', description='Description',
+            sector='energy', funding_stage='seed', location='Goma',
+            funding_goal=Decimal('5000'), min_investment=Decimal('100'), status='approved',
+        )
+        self.buffer.add(gone.pk, today, views=1)
+        self.buffer.add(self.project.pk, today, views=2)
+        gone.delete()
+
+        self.buffer.flush()
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(list(ProjectDailyStats.objects.values_list('project_id', 'views')), [(self.project.pk, 2)])
+
+
+class SectorStatisticTests(TestCase):
+    """Statistiques sectorielles tenues par signaux, égales au recalcul complet"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user('porteur', 'porteur@example.com', 'pass', user_type='porteur')
+        self.investor = User.objects.create_user('investisseur', 'inv@example.com', 'pass', user_type='investisseur')
+        SectorStatistic.rebuild()
+
+    def project(self, title, sector='energy', status='approved', goal='10000'):
+        return Project.objects.create(
+            owner=self.owner, title=title, summary='Résumé', description='Description',
+            sector=sector, funding_stage='seed', location='Kinshasa',
+            funding_goal=Decimal(goal), min_investment=Decimal('100'), status=status,
+        )
+
+    def invest(self, project, amount, status='confirmed'):
+        return Investment.objects.create(
+            investor=self.investor, project=project, amount=Decimal(amount), status=status,
+            investment_date=timezone.localdate(),
+        )
+
+    def assertMatchesRebuild(self):
+        maintained = list(SectorStatistic.objects.values_list(
+            'sector', 'projects_count', 'funding_goal_total', 'invested_total', 'current_value_total',
+        ))
+        SectorStatistic.rebuild()
+        rebuilt = list(SectorStatistic.objects.values_list(
+            'sector', 'projects_count', 'funding_goal_total', 'invested_total', 'current_value_total',
+        ))
+        self.assertEqual(maintained, rebuilt)
+
+    def stat(self, sector):
+        return SectorStatistic.objects.get(sector=sector)
+
+    def test_project_and_investment_writes(self):
+        solar = self.project('Ferme solaire')
+        pending = self.project('Irrigation', sector='agriculture', status='submitted', goal='4000')
+        confirmed = self.invest(solar, '1000')
+        declared = self.invest(solar, '500', status='pending')
+        self.assertEqual((self.stat('energy').projects_count, self.stat('energy').invested_total), (1, 1000))
+        self.assertMatchesRebuild()
+
+        pending.status = 'approved'
+        pending.save()
+        declared.status = 'confirmed'
+        declared.save()
+        confirmed.current_value = Decimal('1300')
+        confirmed.save(update_fields=['current_value'])
+        self.assertMatchesRebuild()
+
+        confirmed.status = 'rejected'
+        confirmed.save()
+        pending.funding_goal = Decimal('6000')
+        pending.save()
+        self.assertMatchesRebuild()
+
+        solar.delete()
+        self.assertEqual(self.stat('energy').projects_count, 0)
+        self.assertMatchesRebuild()
+
+    def test_admin_change_form_moves_project_between_sectors(self):
+        project = self.project('Ferme solaire')
+        self.invest(project, '2000')
+
+        project.sector = 'agriculture'
+        project.status = 'approved'
+        request = RequestFactory().post('/admin/projects/project/')
+        site._registry[Project].save_model(request, project, form=None, change=True)
+
+        self.assertEqual(self.stat('energy').projects_count, 0)
+        self.assertEqual(self.stat('energy').invested_total, 0)
+        self.assertEqual(self.stat('agriculture').invested_total, 2000)
+        self.assertMatchesRebuild()
+
+    def test_unrelated_saves_leave_statistics_alone(self):
+        project = self.project('Ferme solaire')
+        with self.assertNumQueries(1):
+            project.save(update_fields=['views_count'])
+        self.assertMatchesRebuild()
+
+    def test_investment_validation_commits_or_rolls_back_as_a_whole(self):
+        project = self.project('Ferme solaire')
+        investment = self.invest(project, '2500', status='pending')
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(admin)
+        url = reverse('projects:admin_validate_investment', kwargs={'investment_id': investment.pk})
+
+        with mock.patch('projects.views.Notification.objects.create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.post(url, {'action': 'confirm'}, HTTP_HOST='localhost')
+        investment.refresh_from_db()
+        project.refresh_from_db()
+        self.assertEqual((investment.status, project.current_funding), ('pending', 0))
+        self.assertEqual(self.stat('energy').invested_total, 0)
+        self.assertMatchesRebuild()
+
+        self.client.post(url, {'action': 'confirm'}, HTTP_HOST='localhost')
+        investment.refresh_from_db()
+        project.refresh_from_db()
+        self.assertEqual((investment.status, project.current_funding), ('confirmed', 2500))
+        self.assertEqual(self.stat('energy').invested_total, 2500)
+        self.assertMatchesRebuild()
+
+
+class ProjectCatalogueTests(TestCase):
+    """Catalogue paginé par curseur, identique à la liste triée complète"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user('porteur', 'porteur@example.com', 'pass', user_type='porteur')
+        self.investor = User.objects.create_user('investisseur', 'inv@example.com', 'pass', user_type='investisseur')
+        published = timezone.now() - timedelta(days=30)
+        for index in range(30):
+            project = Project.objects.create(
+                owner=self.owner, title=f'Projet {index}', summary='Résumé', description='Description',
+                sector='energy' if index % 3 else 'agriculture', funding_stage='seed' if index % 2 else 'growth',
+                location='Kinshasa', funding_goal=Decimal('10000'), min_investment=Decimal('100'),
+                status='submitted' if index % 7 == 0 else 'approved',
+            )
+            # Dates en partie identiques : l'ordre est départagé par l'id
+            Project.objects.filter(pk=project.pk).update(published_at=published + timedelta(days=index // 4))
+        self.favorites = set(
+            Project.objects.filter(status='approved', title__endswith='5').values_list('pk', flat=True)
+        )
+        for project_id in self.favorites:
+            ProjectFavorite.objects.create(user=self.investor, project_id=project_id)
+        self.client.force_login(self.investor)
+
+    def walk(self, **params):
+        """Parcourt toutes les pages en suivant les curseurs ; retourne (ids, favoris)"""
+        ids, favorites = [], set()
+        query = urlencode(params)
+        while query is not None:
+            response = self.client.get(f"{reverse('projects:list')}?{query}", HTTP_HOST='localhost')
+            page = response.context['projects']
+            self.assertLessEqual(len(page), PROJECTS_PER_PAGE)
+            ids += [project.pk for project in page]
+            favorites |= {project.pk for project in page if project.is_favorite}
+            query = response.context['next_page_query']
+        return ids, favorites
+
+    def expected(self, **filters):
+        return list(
+            Project.objects.filter(status='approved', **filters).order_by('-published_at', '-id')
+            .values_list('pk', flat=True)
+        )
+
+    def test_pages_cover_the_sorted_catalogue_once(self):
+        ids, favorites = self.walk()
+        self.assertEqual(ids, self.expected())
+        self.assertEqual(favorites, self.favorites)
+
+    def test_filters_are_applied_before_paging(self):
+        ids, _ = self.walk(sector='energy', stage='seed')
+        self.assertEqual(ids, self.expected(sector='energy', funding_stage='seed'))
+
+    def test_result_count_matches_a_count_query(self):
+        response = self.client.get(f"{reverse('projects:list')}?sector=energy", HTTP_HOST='localhost')
+        self.assertEqual(response.context['result_count'], len(self.expected(sector='energy')))
+
+
+class ProjectSearchTests(TestCase):
+    """Recherche plein texte : index tenu par signaux, mêmes projets que la recherche sans index"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user('porteur', 'porteur@example.com', 'pass', user_type='porteur')
+        self.in_title = self.project('Centrale solaire', description='Production locale')
+        self.in_description = self.project('Ferme pilote', description='Panneaux solaires sur les toits')
+        self.other = self.project('Irrigation', description='Pompes <b>manuelles</b>', sector='agriculture')
+        self.hidden = self.project('Solaire en attente', status='submitted')
+
+    def project(self, title, description='Description', sector='energy', status='approved'):
+        return Project.objects.create(
+            owner=self.owner, title=title, summary='Résumé', description=description,
+            sector=sector, funding_stage='seed', location='Kinshasa',
+            funding_goal=Decimal('10000'), min_investment=Decimal('100'), status=status,
+        )
+
+    def search(self, query):
+        return search_projects(Project.objects.filter(status='approved'), query)
+
+    def assertMatchesFallback(self, query):
+        ranked = self.search(query)
+        unindexed = _fallback_search(Project.objects.filter(status='approved'), query, SEARCH_RESULTS_LIMIT)
+        self.assertEqual({p.pk for p in ranked}, {p.pk for p in unindexed})
+        return ranked
+
+    def test_ranked_results_match_the_unindexed_search(self):
+        results = self.assertMatchesFallback('solaire')
+        self.assertEqual(results[0], self.in_title)
+        self.assertNotIn(self.hidden, results)
+        self.assertIn('<mark>', results[0].search_highlight)
+
+        self.assertMatchesFallback('Kinshasa')
+        self.assertMatchesFallback('introuvable')
+
+    def test_index_follows_project_changes(self):
+        self.other.title = 'Irrigation goutte a goutte'
+        self.other.save()
+        self.assertEqual(self.assertMatchesFallback('goutte'), [self.other])
+
+        self.hidden.status = 'approved'
+        self.hidden.save(update_fields=['status'])
+        self.assertIn(self.hidden, self.assertMatchesFallback('solaire'))
+
+        self.in_title.delete()
+        self.assertNotIn(self.in_title.title, [p.title for p in self.assertMatchesFallback('solaire')])
+
+    def test_unindexed_fields_do_not_reindex(self):
+        with mock.patch('projects.signals.search.index_project') as index_project:
+            self.other.save(update_fields=['views_count'])
+            index_project.assert_not_called()
+            self.other.save(update_fields=['description'])
+            index_project.assert_called_once()
+
+    def test_highlight_is_escaped(self):
+        highlight = self.search('manuelles')[0].search_highlight
+        self.assertIn('<mark>manuelles</mark>', highlight)
+        self.assertIn('&lt;b&gt;', highlight)
+
+    def test_rebuild_gives_the_same_results(self):
+        before = [p.pk for p in self.search('solaire')]
+        self.assertEqual(rebuild_index(), Project.objects.count())
+        self.assertEqual([p.pk for p in self.search('solaire')], before)
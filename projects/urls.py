@@ -32,6 +32,7 @@ urlpatterns = [
     path('<slug:slug>/', views.project_detail, name='detail'),
     path('<slug:slug>/edit/', views.edit_project, name='edit'),
     path('<slug:slug>/delete/', views.delete_project, name='delete'),
+    path('<slug:slug>/analytics/', views.project_analytics, name='analytics'),
 ]
 
 
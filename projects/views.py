@@ -2,92 +2,107 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
+from django.contrib.auth import get_user_model
 from django.db import transaction
 from django.utils import timezone
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
-from django.db.models import Sum, Count, Avg
+from django.db.models import Sum, Count, Avg, Exists, OuterRef
 from decimal import Decimal
-from .models import Project, ProjectDocument, ProjectFavorite, Investment, ProjectPerformance
+from datetime import timedelta
+from .models import (
+    Project, ProjectDocument, ProjectFavorite, Investment, ProjectPerformance,
+    SectorStatistic, ProjectDailyStats,
+)
 from .forms import ProjectSubmissionForm, ProjectUpdateForm, ProjectValidationForm
 from notifications.models import Notification
 from core.models import ActivityLog
+from core.counters import record_view, viewer_key
+from core.pagination import paginate_keyset
+from core.page_cache import cache_anonymous_page
+from .search import search_projects
+from .engagement import record_engagement, record_project_view
 
+User = get_user_model()
 
+
+# Nombre de projets par page du catalogue
+PROJECTS_PER_PAGE = 12
+
+# Périodes disponibles (en jours) sur la page de statistiques d'un projet
+ANALYTICS_PERIODS = (30, 90)
+
+
+@cache_anonymous_page('projects')
 def project_list(request):
-    """Liste des projets validés avec statistiques globales"""
-    projects = Project.objects.filter(status='approved').select_related('owner')
-    
-    # Statistiques globales de la plateforme
-    total_projects = projects.count()
-    total_funding = projects.aggregate(total=Sum('funding_goal'))['total'] or 0
-    
-    # Calcul du ROI moyen global (basé sur les investissements confirmés)
-    confirmed_investments = Investment.objects.filter(status='confirmed')
-    avg_roi = Decimal('0')
-    if confirmed_investments.exists():
-        total_invested = confirmed_investments.aggregate(total=Sum('amount'))['total'] or 0
-        total_current = confirmed_investments.aggregate(total=Sum('current_value'))['total'] or 0
-        if total_invested > 0:
-            avg_roi = ((total_current - total_invested) / total_invested) * 100
-    
-    # Statistiques par secteur
-    sector_stats = []
-    for sector_code, sector_name in Project.SECTOR_CHOICES:
-        sector_projects = projects.filter(sector=sector_code)
-        sector_count = sector_projects.count()
-        sector_funding = sector_projects.aggregate(total=Sum('funding_goal'))['total'] or 0
-        
-        # ROI moyen du secteur
-        sector_investments = confirmed_investments.filter(project__sector=sector_code)
-        sector_roi = Decimal('0')
-        if sector_investments.exists():
-            sector_invested = sector_investments.aggregate(total=Sum('amount'))['total'] or 0
-            sector_current = sector_investments.aggregate(total=Sum('current_value'))['total'] or 0
-            if sector_invested > 0:
-                sector_roi = ((sector_current - sector_invested) / sector_invested) * 100
-        
-        sector_stats.append({
-            'code': sector_code,
-            'name': sector_name,
-            'count': sector_count,
-            'funding': sector_funding,
-            'roi': sector_roi,
-        })
+    """Catalogue des projets validés, paginé par curseur, avec statistiques globales"""
+    # Statistiques globales et par secteur (table pré-calculée, une seule requête)
+    sector_stats, totals = SectorStatistic.platform_summary()
+    total_projects = totals['total_projects']
+    total_funding = totals['total_funding']
+    avg_roi = totals['avg_roi']
     
-    # Trier les secteurs par nombre de projets
-    sector_stats.sort(key=lambda x: x['count'], reverse=True)
+    # Projection légère : seulement les champs affichés sur les cartes
+    projects = Project.objects.filter(status='approved').only(*Project.CARD_FIELDS)
     
     # Filtres
     sector = request.GET.get('sector')
     if sector:
         projects = projects.filter(sector=sector)
     
-    search = request.GET.get('search')
-    if search:
-        projects = projects.filter(title__icontains=search)
+    stage = request.GET.get('stage')
+    if stage:
+        projects = projects.filter(funding_stage=stage)
     
-    # Si l'utilisateur est un investisseur connecté, récupérer ses favoris
-    user_favorites = []
+    # Favoris de l'investisseur connecté, calculés dans la même requête
     if request.user.is_authenticated and request.user.user_type == 'investisseur':
-        user_favorites = list(
-            ProjectFavorite.objects.filter(user=request.user).values_list('project_id', flat=True)
-        )
+        projects = projects.annotate(is_favorite=Exists(
+            ProjectFavorite.objects.filter(user=request.user, project=OuterRef('pk'))
+        ))
     
-    # Ajouter l'attribut is_favorite à chaque projet
-    projects_list = []
-    for project in projects:
-        project.is_favorite = project.id in user_favorites
-        projects_list.append(project)
+    search = request.GET.get('search', '').strip()
+    if search:
+        # Recherche plein texte : résultats classés par pertinence (pas de pagination par curseur)
+        page = None
+        project_items = search_projects(projects, search)
+    else:
+        page = paginate_keyset(
+            projects,
+            ordering=['-published_at', '-id'],
+            after=request.GET.get('cursor'),
+            per_page=PROJECTS_PER_PAGE,
+        )
+        project_items = page.items
+    
+    # Nombre total de résultats : connu sans COUNT(*) tant qu'on ne filtre que par secteur
+    result_count = None
+    if not stage and not search:
+        if sector:
+            result_count = next((s['count'] for s in sector_stats if s['code'] == sector), 0)
+        else:
+            result_count = total_projects
+    
+    next_page_query = None
+    if page and page.next_cursor:
+        query = request.GET.copy()
+        query['cursor'] = page.next_cursor
+        next_page_query = query.urlencode()
     
     context = {
-        'projects': projects_list,
+        'projects': project_items,
+        'page': page,
+        'result_count': result_count,
+        'next_page_query': next_page_query,
+        'is_first_page': not request.GET.get('cursor'),
         'sectors': Project.SECTOR_CHOICES,
+        'funding_stages': Project.FUNDING_STAGE_CHOICES,
         'total_projects': total_projects,
         'total_funding': total_funding,
         'avg_roi': avg_roi,
         'sector_stats': sector_stats,
         'selected_sector': sector,
+        'selected_stage': stage,
+        'search_query': search,
     }
     return render(request, 'projects/list.html', context)
 
@@ -111,10 +126,9 @@ def project_detail(request, slug):
         # Non connecté : on affiche une version limitée avec modal
         show_signup_modal = True
     
-    # Incrémenter le compteur de vues seulement pour les accès complets
-    if has_full_access:
-        project.views_count += 1
-        project.save(update_fields=['views_count'])
+    # Compter la vue seulement pour les accès complets (dédoublonnée, écrite en différé)
+    if has_full_access and record_view(request, project):
+        record_project_view(project, viewer_key(request))
     
     # Charger les documents seulement si accès complet
     documents = project.documents.all() if has_full_access else []
@@ -274,6 +288,54 @@ def delete_project(request, slug):
     return render(request, 'projects/confirm_delete.html', {'project': project})
 
 
+@login_required
+def project_analytics(request, slug):
+    """Tendances d'engagement d'un projet (30 ou 90 jours) pour son porteur"""
+    project = get_object_or_404(Project, slug=slug)
+    if project.owner != request.user and not request.user.is_staff:
+        messages.error(request, 'Vous n\'avez pas accès aux statistiques de ce projet.')
+        return redirect('projects:my_projects')
+    
+    try:
+        days = int(request.GET.get('days', 30))
+    except ValueError:
+        days = 30
+    if days not in ANALYTICS_PERIODS:
+        days = 30
+    
+    today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    
+    # Une seule requête sur l'index (project, day)
+    rows = {
+        row.day: row
+        for row in ProjectDailyStats.objects.filter(project=project, day__gte=start, day__lte=today)
+    }
+    
+    # Compléter les jours sans activité et calculer les totaux de la période
+    series = {metric: [] for metric in ProjectDailyStats.METRICS}
+    labels = []
+    totals = dict.fromkeys(ProjectDailyStats.METRICS, 0)
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        labels.append(day.strftime('%d/%m'))
+        row = rows.get(day)
+        for metric in ProjectDailyStats.METRICS:
+            value = getattr(row, metric) if row else 0
+            series[metric].append(value)
+            totals[metric] += value
+    
+    context = {
+        'project': project,
+        'days': days,
+        'periods': ANALYTICS_PERIODS,
+        'totals': totals,
+        'chart_labels': labels,
+        'chart_series': series,
+    }
+    return render(request, 'projects/analytics.html', context)
+
+
 # ============================================================================
 # VUES DE VALIDATION ADMIN
 # ============================================================================
@@ -307,9 +369,10 @@ def admin_validate_project(request, slug):
     project = get_object_or_404(Project, slug=slug)
     
     if request.method == 'POST':
+        # is_valid() applique les données du formulaire sur l'instance : mémoriser le statut avant
+        previous_status = project.status
         form = ProjectValidationForm(request.POST, instance=project)
         if form.is_valid():
-            previous_status = project.status
             project = form.save(commit=False)
             
             # Si le projet est validé, définir la date de publication
@@ -342,6 +405,16 @@ def admin_validate_project(request, slug):
                     link=project.get_absolute_url()
                 )
             
+            # Annoncer le nouveau projet à tous les investisseurs (en arrière-plan si nombreux)
+            if project.status == 'approved' and previous_status != 'approved':
+                Notification.bulk_notify(
+                    User.objects.filter(user_type='investisseur', is_active=True),
+                    notification_type='project_published',
+                    title='Nouveau projet publié',
+                    message=f'Le projet "{project.title}" ({project.get_sector_display()}) est maintenant ouvert aux investisseurs.',
+                    link=project.get_absolute_url(),
+                )
+            
             messages.success(
                 request,
                 f'Le projet "{project.title}" a été mis à jour avec le statut : {project.get_status_display()}'
@@ -431,11 +504,13 @@ def toggle_favorite(request, project_id):
         # Décrémenter le compteur
         project.favorites_count = max(0, project.favorites_count - 1)
         project.save(update_fields=['favorites_count'])
+        record_engagement(project, favorites_removed=1)
     else:
         is_favorite = True
         # Incrémenter le compteur
         project.favorites_count += 1
         project.save(update_fields=['favorites_count'])
+        record_engagement(project, favorites_added=1)
     
     return JsonResponse({
         'success': True,
@@ -515,6 +590,7 @@ def declare_investment(request, project_id):
                     notes=notes,
                     status='pending'
                 )
+                record_engagement(project, investments_declared=1)
                 
                 # Notifier l'admin
                 Notification.objects.create(
@@ -727,80 +803,84 @@ def admin_validate_investment(request, investment_id):
         
         previous_status = investment.status
         
-        if action == 'confirm':
-            investment.status = 'confirmed'
-            investment.validated_at = timezone.now()
-            investment.admin_notes = admin_notes
-            investment.save()
-            
-            # Mettre à jour le financement actuel du projet
-            project = investment.project
-            project.current_funding += investment.amount
-            project.save(update_fields=['current_funding'])
-            
-            # Log de l'action
-            ActivityLog.log(
-                user=request.user,
-                action='validate',
-                entity_type='investment',
-                entity_id=investment.id,
-                entity_name=f'{investment.investor.get_full_name()} - {investment.project.title}',
-                description=f'Validation d\'un investissement de ${investment.amount} (Projet: {investment.project.title})',
-                request=request
-            )
-            
-            # Notifier l'investisseur
-            Notification.objects.create(
-                recipient=investment.investor,
-                notification_type='investment_confirmed',
-                title='Investissement confirmé',
-                message=f'Votre investissement de ${investment.amount} dans le projet "{investment.project.title}" a été confirmé par l\'administrateur.',
-                link=f'/projects/investments/'
-            )
-            
-            # Notifier le porteur de projet
-            Notification.objects.create(
-                recipient=investment.project.owner,
-                notification_type='investment_confirmed',
-                title='Nouvel investissement confirmé',
-                message=f'Un investissement de ${investment.amount} dans votre projet "{investment.project.title}" a été confirmé.',
-                link=investment.project.get_absolute_url()
-            )
-            
-            messages.success(
-                request,
-                f'L\'investissement de {investment.investor.get_full_name()} a été confirmé et le financement du projet a été mis à jour.'
-            )
-        
-        elif action == 'reject':
-            investment.status = 'rejected'
-            investment.admin_notes = admin_notes
-            investment.save()
-            
-            # Log de l'action
-            ActivityLog.log(
-                user=request.user,
-                action='reject',
-                entity_type='investment',
-                entity_id=investment.id,
-                entity_name=f'{investment.investor.get_full_name()} - {investment.project.title}',
-                description=f'Rejet d\'un investissement de ${investment.amount} (Projet: {investment.project.title})',
-                request=request
-            )
-            
-            # Notifier l'investisseur
-            Notification.objects.create(
-                recipient=investment.investor,
-                notification_type='investment_rejected',
-                title='Investissement rejeté',
-                message=f'Votre investissement de ${investment.amount} dans le projet "{investment.project.title}" a été rejeté. Raison: {admin_notes if admin_notes else "Non spécifiée"}',
-                link=f'/projects/investments/'
-            )
+        # Statut, financement, statistiques et journal validés ensemble
+        with transaction.atomic():
+            if action == 'confirm':
+                investment.status = 'confirmed'
+                investment.validated_at = timezone.now()
+                investment.admin_notes = admin_notes
+                investment.save()
+                
+                # Mettre à jour le financement actuel du projet
+                project = investment.project
+                project.current_funding += investment.amount
+                project.save(update_fields=['current_funding'])
+                
+                # Log de l'action
+                ActivityLog.log(
+                    user=request.user,
+                    action='validate',
+                    entity_type='investment',
+                    entity_id=investment.id,
+                    entity_name=f'{investment.investor.get_full_name()} - {investment.project.title}',
+                    description=f'Validation d\'un investissement de ${investment.amount} (Projet: {investment.project.title})',
+                    request=request,
+                    sync=True,
+                )
+                
+                # Notifier l'investisseur
+                Notification.objects.create(
+                    recipient=investment.investor,
+                    notification_type='investment_confirmed',
+                    title='Investissement confirmé',
+                    message=f'Votre investissement de ${investment.amount} dans le projet "{investment.project.title}" a été confirmé par l\'administrateur.',
+                    link=f'/projects/investments/'
+                )
+                
+                # Notifier le porteur de projet
+                Notification.objects.create(
+                    recipient=investment.project.owner,
+                    notification_type='investment_confirmed',
+                    title='Nouvel investissement confirmé',
+                    message=f'Un investissement de ${investment.amount} dans votre projet "{investment.project.title}" a été confirmé.',
+                    link=investment.project.get_absolute_url()
+                )
+                
+                messages.success(
+                    request,
+                    f'L\'investissement de {investment.investor.get_full_name()} a été confirmé et le financement du projet a été mis à jour.'
+                )
             
-            messages.warning(
-                request,
-                f'L\'investissement de {investment.investor.get_full_name()} a été rejeté.'
-            )
+            elif action == 'reject':
+                investment.status = 'rejected'
+                investment.admin_notes = admin_notes
+                investment.save()
+                
+                # Log de l'action
+                ActivityLog.log(
+                    user=request.user,
+                    action='reject',
+                    entity_type='investment',
+                    entity_id=investment.id,
+                    entity_name=f'{investment.investor.get_full_name()} - {investment.project.title}',
+                    description=f'Rejet d\'un investissement de ${investment.amount} (Projet: {investment.project.title})',
+                    request=request,
+                    sync=True,
+                )
+                
+                # Notifier l'investisseur
+                Notification.objects.create(
+                    recipient=investment.investor,
+                    notification_type='investment_rejected',
+                    title='Investissement rejeté',
+                    message=f'Votre investissement de ${investment.amount} dans le projet "{investment.project.title}" a été rejeté. Raison: {admin_notes if admin_notes else "Non spécifiée"}',
+                    link=f'/projects/investments/'
+                )
+                
+                messages.warning(
+                    request,
+                    f'L\'investissement de {investment.investor.get_full_name()} a été rejeté.'
+                )
         
         return redirect('projects:admin_pending_investments')
     
@@ -0,0 +1,141 @@
+"""
+Chiffres du tableau de bord utilisateur (DashboardSummary).
+
+Chaque rôle est calculé par agrégation conditionnelle (``Count(filter=Q(...))``)
+en au plus trois requêtes :
+
+- une requête commune sur la ligne de l'utilisateur, dont les colonnes sont des
+  sous-requêtes scalaires (messages, notifications, favoris, projets publiés) ;
+- porteur : une agrégation sur ses projets et les investissements reçus ;
+- investisseur : une agrégation sur ses investissements et une sur les
+  secteurs de ses favoris.
+
+Le résultat est mis en cache par utilisateur et invalidé par les signaux de
+``users.signals`` dès que ses projets, investissements, favoris, messages ou
+notifications changent.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+CACHE_KEY = 'dashboard:summary:{}'
+
+
+def _cache_timeout():
+    return getattr(settings, 'DASHBOARD_SUMMARY_CACHE_TIMEOUT', 5 * 60)
+
+
+def _scalar(queryset, aggregate):
+    """Sous-requête scalaire renvoyant ``aggregate`` calculé sur tout ``queryset``"""
+    return Subquery(
+        queryset.order_by().annotate(_all=Value(1)).values('_all')
+        .annotate(value=aggregate).values('value')
+    )
+
+
+def invalidate_dashboard_summary(*user_ids):
+    """Supprime le résumé en cache des utilisateurs donnés"""
+    keys = [CACHE_KEY.format(user_id) for user_id in user_ids if user_id]
+    if keys:
+        cache.delete_many(keys)
+
+
+class DashboardSummary:
+    """Résumé chiffré du tableau de bord d'un utilisateur"""
+
+    def __init__(self, user):
+        self.user = user
+        self.week_ago = timezone.now() - timedelta(days=7)
+
+    @classmethod
+    def for_user(cls, user):
+        """Retourne le résumé depuis le cache, en le calculant au besoin"""
+        key = CACHE_KEY.format(user.pk)
+        summary = cache.get(key)
+        if summary is None:
+            summary = cls(user).compute()
+            cache.set(key, summary, _cache_timeout())
+        return summary
+
+    def compute(self):
+        """Calcule tous les chiffres applicables au(x) rôle(s) de l'utilisateur"""
+        summary = self._common()
+        if self.user.can_access_porteur_features():
+            summary.update(self._porteur())
+        if self.user.can_access_investisseur_features():
+            summary.update(self._investisseur())
+        return summary
+
+    def _common(self):
+        from messaging.models import ConversationParticipant, Message
+        from notifications.models import Notification
+        from projects.models import Project, ProjectFavorite
+
+        user = self.user
+        received = Message.objects.filter(conversation__participants=user).exclude(sender=user)
+        columns = {
+            'unread_messages': _scalar(
+                ConversationParticipant.objects.filter(user=user), Coalesce(Sum('unread_count'), 0)
+            ),
+            'messages_received_week': _scalar(received, Count('pk', filter=Q(created_at__gte=self.week_ago))),
+            'unread_notifications': _scalar(
+                Notification.objects.filter(recipient=user), Count('pk', filter=Q(is_read=False))
+            ),
+        }
+        if user.can_access_investisseur_features():
+            favorites = ProjectFavorite.objects.filter(user=user)
+            approved = Project.objects.filter(status='approved')
+            columns.update({
+                'favorites_count': _scalar(favorites, Count('pk')),
+                'favorites_week': _scalar(favorites, Count('pk', filter=Q(created_at__gte=self.week_ago))),
+                'available_projects': _scalar(approved, Count('pk')),
+                'new_projects_week': _scalar(approved, Count('pk', filter=Q(created_at__gte=self.week_ago))),
+            })
+
+        User = get_user_model()
+        return User.objects.filter(pk=user.pk).order_by().values(**columns).get()
+
+    def _porteur(self):
+        from projects.models import Project
+
+        # Jointure projets ⟕ investissements : les projets sont comptés en DISTINCT
+        figures = Project.objects.filter(owner=self.user).aggregate(
+            projects_count=Count('pk', distinct=True),
+            approved_count=Count('pk', filter=Q(status='approved'), distinct=True),
+            pending_count=Count('pk', filter=Q(status__in=['submitted', 'under_review']), distinct=True),
+            rejected_count=Count('pk', filter=Q(status='rejected'), distinct=True),
+            revision_count=Count('pk', filter=Q(status='revision_requested'), distinct=True),
+            projects_week=Count('pk', filter=Q(created_at__gte=self.week_ago), distinct=True),
+            total_investments=Count('investments'),
+            investments_week=Count('investments', filter=Q(investments__created_at__gte=self.week_ago)),
+            total_funding_received=Sum('investments__amount', filter=Q(investments__status='confirmed')),
+        )
+        figures['total_funding_received'] = figures['total_funding_received'] or 0
+        return figures
+
+    def _investisseur(self):
+        from projects.models import Investment, ProjectFavorite
+
+        figures = Investment.objects.filter(investor=self.user).aggregate(
+            investments_count=Count('pk'),
+            investments_confirmed=Count('pk', filter=Q(status='confirmed')),
+            investments_pending=Count('pk', filter=Q(status='pending')),
+            total_invested=Sum('amount', filter=Q(status='confirmed')),
+            investments_week=Count('pk', filter=Q(created_at__gte=self.week_ago)),
+        )
+        figures['total_invested'] = figures['total_invested'] or 0
+
+        # Projets par secteur (favoris)
+        figures['favorite_sectors'] = list(
+            ProjectFavorite.objects.filter(user=self.user)
+            .values('project__sector')
+            .annotate(count=Count('id'))
+            .order_by('-count')[:3]
+        )
+        return figures
@@ -290,7 +290,7 @@ class ProfileUpdateForm(forms.ModelForm):
     
     class Meta:
         model = User
-        fields = ['first_name', 'last_name', 'email', 'phone', 'avatar', 'bio']
+        fields = ['first_name', 'last_name', 'email', 'phone', 'avatar', 'bio', 'digest_frequency']
         widgets = {
             'first_name': forms.TextInput(attrs={'class': 'input-field'}),
             'last_name': forms.TextInput(attrs={'class': 'input-field'}),
@@ -298,6 +298,7 @@ class ProfileUpdateForm(forms.ModelForm):
             'phone': forms.TextInput(attrs={'class': 'input-field'}),
             'avatar': forms.FileInput(attrs={'class': 'file-input', 'accept': 'image/*'}),
             'bio': forms.Textarea(attrs={'class': 'input-field', 'rows': 4}),
+            'digest_frequency': forms.Select(attrs={'class': 'input-field'}),
         }
     
     def clean_avatar(self):
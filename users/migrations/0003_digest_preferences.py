@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 06:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_gdpr_consent_user_gdpr_consent_date_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='digest_frequency',
+            field=models.CharField(choices=[('daily', 'Quotidien'), ('weekly', 'Hebdomadaire'), ('never', 'Jamais')], default='daily', max_length=10, verbose_name='Résumé des notifications par email'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='last_digest_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Dernier résumé envoyé le'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+def backfill_last_digest_at(apps, schema_editor):
+    """
+    Les comptes existants partent d'aujourd'hui : sans cela, le premier passage
+    de send_notification_digests enverrait à chacun toutes ses notifications
+    non lues depuis son inscription.
+    """
+    User = apps.get_model('users', 'User')
+    User.objects.filter(last_digest_at__isnull=True).update(last_digest_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_digest_preferences'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_last_digest_at, migrations.RunPython.noop),
+    ]
@@ -38,6 +38,20 @@ class User(AbstractUser):
     gdpr_consent = models.BooleanField(default=False, verbose_name='Consentement RGPD')
     gdpr_consent_date = models.DateTimeField(blank=True, null=True, verbose_name='Date consentement RGPD')
     
+    # Résumé des notifications par email (notifications.digest)
+    DIGEST_FREQUENCY_CHOICES = (
+        ('daily', 'Quotidien'),
+        ('weekly', 'Hebdomadaire'),
+        ('never', 'Jamais'),
+    )
+    digest_frequency = models.CharField(
+        max_length=10,
+        choices=DIGEST_FREQUENCY_CHOICES,
+        default='daily',
+        verbose_name='Résumé des notifications par email'
+    )
+    last_digest_at = models.DateTimeField(blank=True, null=True, verbose_name='Dernier résumé envoyé le')
+    
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Date d\'inscription')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Dernière modification')
     
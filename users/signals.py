@@ -0,0 +1,35 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from messaging.models import Message
+from notifications.models import Notification
+from projects.models import Project, Investment, ProjectFavorite
+from .dashboard import invalidate_dashboard_summary
+
+
+@receiver([post_save, post_delete], sender=Project)
+def invalidate_owner_dashboard(sender, instance, **kwargs):
+    """Un projet modifié change les chiffres de son porteur"""
+    invalidate_dashboard_summary(instance.owner_id)
+
+
+@receiver([post_save, post_delete], sender=Investment)
+def invalidate_investment_dashboards(sender, instance, **kwargs):
+    """Un investissement concerne l'investisseur et le porteur du projet"""
+    invalidate_dashboard_summary(instance.investor_id, instance.project.owner_id)
+
+
+@receiver([post_save, post_delete], sender=ProjectFavorite)
+def invalidate_favorite_dashboard(sender, instance, **kwargs):
+    invalidate_dashboard_summary(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Message)
+def invalidate_participants_dashboards(sender, instance, **kwargs):
+    """Un message (envoyé ou lu) change les compteurs de tous les participants"""
+    participant_ids = instance.conversation.participants.values_list('pk', flat=True)
+    invalidate_dashboard_summary(*participant_ids)
+
+
+@receiver([post_save, post_delete], sender=Notification)
+def invalidate_recipient_dashboard(sender, instance, **kwargs):
+    invalidate_dashboard_summary(instance.recipient_id)
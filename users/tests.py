@@ -1,3 +1,76 @@
+from datetime import date
+from decimal import Decimal
+
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from projects.models import Investment, Project, ProjectFavorite
+from users.dashboard import DashboardSummary, CACHE_KEY
+from users.models import User
+
+
+class DashboardSummaryTests(TestCase):
+    """Budget de requêtes et invalidation du résumé du tableau de bord"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.porteur = User.objects.create_user('porteur', 'porteur@example.com', 'pass', user_type='porteur')
+        cls.investisseur = User.objects.create_user('investisseur', 'inv@example.com', 'pass', user_type='investisseur')
+        cls.project = Project.objects.create(
+            owner=cls.porteur, title='Ferme solaire', summary='Résumé', description='Description',
+            sector='energy', funding_stage='seed', location='Kinshasa',
+            funding_goal=Decimal('10000'), min_investment=Decimal('100'), status='approved',
+        )
+        Project.objects.create(
+            owner=cls.porteur, title='Atelier', summary='Résumé', description='Description',
+            sector='industry', funding_stage='seed', location='Goma',
+            funding_goal=Decimal('5000'), min_investment=Decimal('100'), status='submitted',
+        )
+        Investment.objects.create(
+            investor=cls.investisseur, project=cls.project, amount=Decimal('1500'),
+            status='confirmed', investment_date=date.today(),
+        )
+        Investment.objects.create(
+            investor=cls.investisseur, project=cls.project, amount=Decimal('500'),
+            status='pending', investment_date=date.today(),
+        )
+        ProjectFavorite.objects.create(user=cls.investisseur, project=cls.project)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_porteur_query_budget(self):
+        with self.assertNumQueries(2):
+            summary = DashboardSummary(self.porteur).compute()
+        self.assertEqual(summary['projects_count'], 2)
+        self.assertEqual(summary['approved_count'], 1)
+        self.assertEqual(summary['pending_count'], 1)
+        self.assertEqual(summary['total_investments'], 2)
+        self.assertEqual(summary['total_funding_received'], Decimal('1500'))
+
+    def test_investisseur_query_budget(self):
+        with self.assertNumQueries(3):
+            summary = DashboardSummary(self.investisseur).compute()
+        self.assertEqual(summary['investments_count'], 2)
+        self.assertEqual(summary['investments_confirmed'], 1)
+        self.assertEqual(summary['investments_pending'], 1)
+        self.assertEqual(summary['total_invested'], Decimal('1500'))
+        self.assertEqual(summary['favorites_count'], 1)
+        self.assertEqual(summary['available_projects'], 1)
+        self.assertEqual(summary['favorite_sectors'], [{'project__sector': 'energy', 'count': 1}])
+
+    def test_summary_is_cached(self):
+        DashboardSummary.for_user(self.investisseur)
+        with self.assertNumQueries(0):
+            DashboardSummary.for_user(self.investisseur)
+
+    def test_cache_invalidated_on_change(self):
+        DashboardSummary.for_user(self.investisseur)
+        DashboardSummary.for_user(self.porteur)
+        Investment.objects.create(
+            investor=self.investisseur, project=self.project, amount=Decimal('200'),
+            status='pending', investment_date=date.today(),
+        )
+        self.assertIsNone(cache.get(CACHE_KEY.format(self.investisseur.pk)))
+        self.assertIsNone(cache.get(CACHE_KEY.format(self.porteur.pk)))
+        self.assertEqual(DashboardSummary.for_user(self.investisseur)['investments_count'], 3)
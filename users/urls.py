@@ -36,6 +36,7 @@ urlpatterns = [
     
     # Interface administrateur
     path('admin/dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin/dashboard/refresh/', views.admin_refresh_kpis, name='admin_refresh_kpis'),
     path('admin/users/', views.admin_users, name='admin_users'),
     path('admin/users/create/', views.admin_create_user, name='admin_create_user'),
     path('admin/users/<int:user_id>/', views.admin_user_detail, name='admin_user_detail'),
@@ -3,6 +3,7 @@ from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
+from django.views.decorators.http import require_POST
 from django.urls import reverse
 from django.db.models import Count, Q
 from django.utils import timezone
@@ -10,7 +11,7 @@ from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.template.loader import render_to_string
-from django.core.mail import send_mail
+from core.mail import queue_mail
 from django.conf import settings
 from datetime import timedelta
 from .forms import (
@@ -25,6 +26,10 @@ from .forms import (
 from .models import User, ProjectOwnerProfile, InvestorProfile
 
 
+# Nombre d'instantanés affichés sur les courbes du dashboard administrateur
+KPI_TREND_POINTS = 30
+
+
 def register_choice(request):
     """Page de choix du type de compte"""
     return render(request, 'users/register_choice.html')
@@ -39,7 +44,7 @@ def register_porteur(request):
             # Générer le token de vérification
             token = user.generate_verification_token()
             
-            # Envoyer l'email de vérification
+            # Mettre en file l'email de vérification (envoyé par send_queued_mail)
             verification_url = request.build_absolute_uri(
                 reverse('users:verify_email', kwargs={'token': token})
             )
@@ -48,12 +53,11 @@ def register_porteur(request):
                 'user': user,
                 'verification_url': verification_url,
             })
-            send_mail(
+            queue_mail(
                 subject,
                 message,
                 settings.DEFAULT_FROM_EMAIL,
                 [user.email],
-                fail_silently=False,
                 html_message=message
             )
             
@@ -74,7 +78,7 @@ def register_investisseur(request):
             # Générer le token de vérification
             token = user.generate_verification_token()
             
-            # Envoyer l'email de vérification
+            # Mettre en file l'email de vérification (envoyé par send_queued_mail)
             verification_url = request.build_absolute_uri(
                 reverse('users:verify_email', kwargs={'token': token})
             )
@@ -83,12 +87,11 @@ def register_investisseur(request):
                 'user': user,
                 'verification_url': verification_url,
             })
-            send_mail(
+            queue_mail(
                 subject,
                 message,
                 settings.DEFAULT_FROM_EMAIL,
                 [user.email],
-                fail_silently=False,
                 html_message=message
             )
             
@@ -159,19 +162,18 @@ def password_reset_request(request):
                 reverse('users:password_reset_confirm', kwargs={'uidb64': uid, 'token': token})
             )
             
-            # Envoyer l'email
+            # Mettre en file l'email (envoyé par send_queued_mail)
             subject = 'Réinitialisation de votre mot de passe - InvestLink'
             message = render_to_string('users/password_reset_email.html', {
                 'user': user,
                 'reset_link': reset_link,
             })
             
-            send_mail(
+            queue_mail(
                 subject,
                 message,
                 settings.DEFAULT_FROM_EMAIL,
                 [user.email],
-                fail_silently=False,
             )
             
             messages.success(request, 'Un email de réinitialisation a été envoyé à votre adresse email.')
@@ -257,7 +259,7 @@ def resend_verification(request):
         # Générer un nouveau token
         token = user.generate_verification_token()
         
-        # Envoyer l'email de vérification
+        # Mettre en file l'email de vérification (envoyé par send_queued_mail)
         verification_url = request.build_absolute_uri(
             reverse('users:verify_email', kwargs={'token': token})
         )
@@ -266,12 +268,11 @@ def resend_verification(request):
             'user': user,
             'verification_url': verification_url,
         })
-        send_mail(
+        queue_mail(
             subject,
             message,
             settings.DEFAULT_FROM_EMAIL,
             [user.email],
-            fail_silently=False,
             html_message=message
         )
         
@@ -287,7 +288,7 @@ def export_my_data(request):
     import json
     from django.http import JsonResponse
     from projects.models import Project, Investment
-    from messaging.models import Message, Conversation
+    from messaging.models import Message, Conversation, ConversationParticipant
     from notifications.models import Notification
     
     user = request.user
@@ -338,13 +339,18 @@ def export_my_data(request):
                 'investment_date': str(investment.investment_date),
             })
     
-    # Ajouter les messages
+    # Ajouter les messages (lus si le curseur du destinataire les a dépassés)
+    read_cursors = dict(
+        ConversationParticipant.objects.filter(
+            conversation__participants=user, last_read_message__isnull=False
+        ).exclude(user=user).values_list('conversation_id', 'last_read_message_id')
+    )
     messages_qs = Message.objects.filter(sender=user)
     for msg in messages_qs:
         data['messages'].append({
             'content': msg.content,
             'created_at': str(msg.created_at),
-            'is_read': msg.is_read,
+            'is_read': msg.pk <= read_cursors.get(msg.conversation_id, 0),
         })
     
     # Ajouter les notifications
@@ -397,84 +403,23 @@ def delete_account(request):
 def dashboard(request):
     """Tableau de bord utilisateur"""
     user = request.user
-    from projects.models import Project, ProjectFavorite, Investment
-    from messaging.models import Message, Conversation
-    from notifications.models import Notification
-    from datetime import timedelta
-    from django.utils import timezone
-    from django.db.models import Sum, Count
+    from projects.models import Project, ProjectFavorite
+    from .dashboard import DashboardSummary
     
     context = {
         'user': user,
     }
     
-    # Données communes
-    context['unread_messages'] = Message.objects.filter(
-        conversation__participants=user, 
-        is_read=False
-    ).exclude(sender=user).count()
-    context['unread_notifications'] = Notification.objects.filter(recipient=user, is_read=False).count()
+    # Chiffres du tableau de bord (mis en cache, voir users/dashboard.py)
+    context.update(DashboardSummary.for_user(user))
     
-    # Données porteur de projet
+    # Derniers projets du porteur
     if user.can_access_porteur_features():
-        my_projects = Project.objects.filter(owner=user)
-        context['my_projects'] = my_projects.order_by('-created_at')[:5]
-        context['projects_count'] = my_projects.count()
-        context['approved_count'] = my_projects.filter(status='approved').count()
-        context['pending_count'] = my_projects.filter(status__in=['submitted', 'under_review']).count()
-        context['rejected_count'] = my_projects.filter(status='rejected').count()
-        context['revision_count'] = my_projects.filter(status='revision_requested').count()
-        
-        # Statistiques d'investissement reçus
-        context['total_investments'] = Investment.objects.filter(project__owner=user).count()
-        context['total_funding_received'] = Investment.objects.filter(
-            project__owner=user, 
-            status='confirmed'
-        ).aggregate(Sum('amount'))['amount__sum'] or 0
-        
-        # Activité récente (7 derniers jours)
-        week_ago = timezone.now() - timedelta(days=7)
-        context['projects_week'] = my_projects.filter(created_at__gte=week_ago).count()
-        context['investments_week'] = Investment.objects.filter(
-            project__owner=user,
-            created_at__gte=week_ago
-        ).count()
-        context['messages_received_week'] = Message.objects.filter(
-            conversation__participants=user,
-            created_at__gte=week_ago
-        ).exclude(sender=user).count()
-    
-    # Données investisseur
+        context['my_projects'] = Project.objects.filter(owner=user).order_by('-created_at')[:5]
+    
+    # Derniers favoris de l'investisseur
     if user.can_access_investisseur_features():
         context['favorite_projects'] = ProjectFavorite.objects.filter(user=user).select_related('project')[:5]
-        context['favorites_count'] = ProjectFavorite.objects.filter(user=user).count()
-        context['available_projects'] = Project.objects.filter(status='approved').count()
-        
-        # Mes investissements
-        my_investments = Investment.objects.filter(investor=user)
-        context['investments_count'] = my_investments.count()
-        context['investments_confirmed'] = my_investments.filter(status='confirmed').count()
-        context['investments_pending'] = my_investments.filter(status='pending').count()
-        context['total_invested'] = my_investments.filter(status='confirmed').aggregate(
-            Sum('amount')
-        )['amount__sum'] or 0
-        
-        # Projets par secteur (favoris)
-        context['favorite_sectors'] = ProjectFavorite.objects.filter(user=user).values(
-            'project__sector'
-        ).annotate(count=Count('id')).order_by('-count')[:3]
-        
-        # Activité récente
-        week_ago = timezone.now() - timedelta(days=7)
-        context['favorites_week'] = ProjectFavorite.objects.filter(
-            user=user,
-            created_at__gte=week_ago
-        ).count()
-        context['investments_week'] = my_investments.filter(created_at__gte=week_ago).count()
-        context['new_projects_week'] = Project.objects.filter(
-            status='approved',
-            created_at__gte=week_ago
-        ).count()
     
     return render(request, 'users/dashboard.html', context)
 
@@ -595,60 +540,36 @@ def change_password(request):
 def admin_dashboard(request):
     """Dashboard administrateur avec statistiques globales"""
     from projects.models import Project, Investment
-    from messaging.models import Message, Conversation
-    from notifications.models import Notification
-    from django.db.models import Sum, Avg
-    
-    # Statistiques utilisateurs
-    total_users = User.objects.count()
-    porteurs_count = User.objects.filter(user_type='porteur').count()
-    investisseurs_count = User.objects.filter(user_type='investisseur').count()
-    new_users_week = User.objects.filter(
-        date_joined__gte=timezone.now() - timedelta(days=7)
-    ).count()
-    active_users_month = User.objects.filter(
-        last_login__gte=timezone.now() - timedelta(days=30)
-    ).count()
-    
-    # Statistiques projets
-    total_projects = Project.objects.count()
-    pending_projects = Project.objects.filter(
-        status__in=['submitted', 'under_review', 'revision_requested']
-    ).count()
-    approved_projects = Project.objects.filter(status='approved').count()
-    rejected_projects = Project.objects.filter(status='rejected').count()
-    
-    # Statistiques investissements
-    total_investments = Investment.objects.count()
-    pending_investments = Investment.objects.filter(status='pending').count()
-    confirmed_investments = Investment.objects.filter(status='confirmed').count()
-    rejected_investments = Investment.objects.filter(status='rejected').count()
-    
-    # Montants financiers
-    investment_stats = Investment.objects.filter(status='confirmed').aggregate(
-        total_amount=Sum('amount'),
-        avg_amount=Avg('amount'),
-        total_current_value=Sum('current_value')
+    from messaging.models import Message
+    from core.models import KPISnapshot
+    
+    # Indicateurs : une seule ligne (recalculée par refresh_kpi_snapshot,
+    # tenue à jour par deltas entre deux recalculs)
+    snapshot = KPISnapshot.current()
+    if snapshot is None:
+        snapshot = KPISnapshot.take()
+    
+    # Historique pour les courbes de tendance
+    history = list(
+        KPISnapshot.objects.order_by('-created_at').values(
+            'created_at', 'total_users', 'total_projects', 'total_investments', 'total_messages'
+        )[:KPI_TREND_POINTS]
     )
-    total_invested = investment_stats['total_amount'] or 0
-    avg_investment = investment_stats['avg_amount'] or 0
-    total_current_value = investment_stats['total_current_value'] or 0
+    history.reverse()
+    trend = {
+        'labels': [point['created_at'].strftime('%d/%m %H:%M') for point in history],
+        'users': [point['total_users'] for point in history],
+        'projects': [point['total_projects'] for point in history],
+        'investments': [point['total_investments'] for point in history],
+        'messages': [point['total_messages'] for point in history],
+    }
     
     # Statistiques par secteur
-    projects_by_sector = Project.objects.values('sector').annotate(
-        count=Count('id')
-    ).order_by('-count')[:5]
-    
-    # Statistiques messagerie
-    total_messages = Message.objects.count()
-    total_conversations = Conversation.objects.count()
-    messages_week = Message.objects.filter(
-        created_at__gte=timezone.now() - timedelta(days=7)
-    ).count()
-    
-    # Statistiques notifications
-    total_notifications = Notification.objects.count()
-    unread_notifications = Notification.objects.filter(is_read=False).count()
+    sector_labels = dict(Project.SECTOR_CHOICES)
+    projects_by_sector = [
+        {'sector': item['sector'], 'label': sector_labels.get(item['sector']), 'count': item['count']}
+        for item in snapshot.projects_by_sector
+    ]
     
     # Activité récente (derniers utilisateurs)
     recent_users = User.objects.order_by('-date_joined')[:10]
@@ -667,37 +588,40 @@ def admin_dashboard(request):
     )
     
     context = {
+        'snapshot': snapshot,
+        'trend': trend,
+        
         # Utilisateurs
-        'total_users': total_users,
-        'porteurs_count': porteurs_count,
-        'investisseurs_count': investisseurs_count,
-        'new_users_week': new_users_week,
-        'active_users_month': active_users_month,
+        'total_users': snapshot.total_users,
+        'porteurs_count': snapshot.porteurs_count,
+        'investisseurs_count': snapshot.investisseurs_count,
+        'new_users_week': snapshot.new_users_week,
+        'active_users_month': snapshot.active_users_month,
         
         # Projets
-        'total_projects': total_projects,
-        'pending_projects': pending_projects,
-        'approved_projects': approved_projects,
-        'rejected_projects': rejected_projects,
+        'total_projects': snapshot.total_projects,
+        'pending_projects': snapshot.pending_projects,
+        'approved_projects': snapshot.approved_projects,
+        'rejected_projects': snapshot.rejected_projects,
         'projects_by_sector': projects_by_sector,
         
         # Investissements
-        'total_investments': total_investments,
-        'pending_investments': pending_investments,
-        'confirmed_investments': confirmed_investments,
-        'rejected_investments': rejected_investments,
-        'total_invested': total_invested,
-        'avg_investment': avg_investment,
-        'total_current_value': total_current_value,
+        'total_investments': snapshot.total_investments,
+        'pending_investments': snapshot.pending_investments,
+        'confirmed_investments': snapshot.confirmed_investments,
+        'rejected_investments': snapshot.rejected_investments,
+        'total_invested': snapshot.total_invested,
+        'avg_investment': snapshot.avg_investment,
+        'total_current_value': snapshot.total_current_value,
         
         # Messagerie
-        'total_messages': total_messages,
-        'total_conversations': total_conversations,
-        'messages_week': messages_week,
+        'total_messages': snapshot.total_messages,
+        'total_conversations': snapshot.total_conversations,
+        'messages_week': snapshot.messages_week,
         
         # Notifications
-        'total_notifications': total_notifications,
-        'unread_notifications': unread_notifications,
+        'total_notifications': snapshot.total_notifications,
+        'unread_notifications': snapshot.unread_notifications,
         
         # Activité récente
         'recent_users': recent_users,
@@ -709,6 +633,19 @@ def admin_dashboard(request):
     return render(request, 'users/admin_dashboard.html', context)
 
 
+@staff_member_required
+@require_POST
+def admin_refresh_kpis(request):
+    """Recalcule immédiatement l'instantané des indicateurs"""
+    from core.models import KPISnapshot
+    from core.kpi import kpi_buffer
+    
+    kpi_buffer.flush()
+    KPISnapshot.take()
+    messages.success(request, 'Indicateurs recalculés.')
+    return redirect('users:admin_dashboard')
+
+
 @staff_member_required
 def admin_users(request):
     """Gestion des utilisateurs"""